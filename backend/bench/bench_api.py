@@ -0,0 +1,368 @@
+"""
+Per-stage and end-to-end latency benchmark for the detection API
+
+``--mode stages`` drives the pipeline stages in-process: embedding (unique
+texts, so the cache is bypassed), KNN retrieval against the seeded index and
+TTS time-to-first-byte / total against the fake TTS server. ``--mode http``
+drives ``/api/analyze`` with growing transcripts, ``/api/post-call-analysis``
+and ``/api/analyze-stream`` over HTTP (plus ``/api/analyze-batch`` with
+``--endpoints analyze_batch``; conversations/sec is requests/sec times
+``--batch-size``).
+
+Every run reports requests/sec and p50/p95/p99 per stage and concurrency
+level and is written to ``bench/results/``; ``--compare`` flags regressions
+against an earlier result file.
+
+Seed Redis first (see synthetic.py), then from backend/:
+    python bench/bench_api.py --mode stages --concurrency 1 8 32 --duration 10 --start-tts
+    python bench/bench_api.py --mode http --start-server --concurrency 8 32 --duration 20
+    python bench/bench_api.py --mode http --start-server --compare bench/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from synthetic import growing_conversation
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) >= 2 else 0.0
+
+
+def summarize(stage, concurrency, latencies, errors, duration):
+    return {
+        "stage": stage,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "errors": errors,
+    }
+
+
+def measured_rows(name, concurrency, latencies, errors, duration):
+    """Summaries for every stage an operation reported (one row if all requests failed)"""
+    rows = [summarize(stage, concurrency, values, errors, duration) for stage, values in latencies.items()]
+    rows = rows or [summarize(name, concurrency, [], errors, duration)]
+    for row in rows:
+        print_row(row)
+    return rows
+
+
+async def run_load(operation, concurrency, duration, seed=7):
+    """
+    Call ``operation`` from ``concurrency`` concurrent users for ``duration`` seconds
+
+    ``operation(rng, state)`` returns a dict of stage -> seconds for one
+    request (e.g. ttfb and total); ``state`` is private to each user.
+
+    Returns:
+        Tuple of (stage -> latencies, error count)
+    """
+    latencies = {}
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def user(index):
+        nonlocal errors
+        rng = random.Random(seed + index)
+        state = {}
+        while time.monotonic() < deadline:
+            try:
+                timings = await operation(rng, state)
+            except Exception:
+                errors += 1
+                continue
+            for stage, seconds in timings.items():
+                latencies.setdefault(stage, []).append(seconds)
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def next_transcript(rng, state, turns=12):
+    """Next growing transcript for a simulated call (a new call starts when one ends)"""
+    if not state.get("call"):
+        state["call"] = growing_conversation(rng, turns)
+    return state["call"].pop(0)
+
+
+# ---------------------------------------------------------------- stages mode
+
+async def stage_operations(integration):
+    """Build the in-process stage operations"""
+    counter = 0
+    sample = [text for _, text in growing_conversation(random.Random(1), 12)]
+    embeddings = await integration.aencode_many(sample)
+
+    async def embed(rng, state):
+        nonlocal counter
+        counter += 1
+        _, text = next_transcript(rng, state)
+        started = time.perf_counter()
+        await integration.aencode(f"{text} #{counter}")
+        return {"embed": time.perf_counter() - started}
+
+    async def knn(rng, state):
+        started = time.perf_counter()
+        result = await integration.asearch(rng.choice(embeddings), top_k=3)
+        if result.error is not None:
+            raise RuntimeError(result.error)
+        return {"knn": time.perf_counter() - started}
+
+    async def tts(rng, state):
+        started = time.perf_counter()
+        first = None
+        async for _ in integration.tts_client.stream(integration._general_warning_text()):
+            if first is None:
+                first = time.perf_counter() - started
+        return {"tts_ttfb": first or 0.0, "tts_total": time.perf_counter() - started}
+
+    return {"embed": embed, "knn": knn, "tts": tts}
+
+
+async def bench_stages(args):
+    sys.path.insert(0, SRC_DIR)
+    from reasoning import ElevenLabsRedisIntegration
+
+    integration = ElevenLabsRedisIntegration()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(integration.encode_executor, integration.warm_up)
+    await integration.astart()
+
+    rows = []
+    try:
+        operations = await stage_operations(integration)
+        for name in args.stages:
+            for concurrency in args.concurrency:
+                latencies, errors = await run_load(operations[name], concurrency, args.duration)
+                rows.extend(measured_rows(name, concurrency, latencies, errors, args.duration))
+    finally:
+        await integration.aclose()
+    return rows
+
+
+# ------------------------------------------------------------------ http mode
+
+def http_operations(client, base_url, batch_size=100):
+    async def analyze(rng, state):
+        _, transcript = next_transcript(rng, state)
+        started = time.perf_counter()
+        response = await client.post(
+            f"{base_url}/api/analyze",
+            json={"conversation": transcript, "include_context": False},
+        )
+        response.raise_for_status()
+        return {"analyze": time.perf_counter() - started}
+
+    async def post_call(rng, state):
+        transcript = growing_conversation(rng, 12)[-1][1]
+        started = time.perf_counter()
+        response = await client.post(
+            f"{base_url}/api/post-call-analysis",
+            json={"conversation": transcript, "include_context": False},
+        )
+        response.raise_for_status()
+        return {"post_call": time.perf_counter() - started}
+
+    async def stream(rng, state):
+        _, transcript = next_transcript(rng, state)
+        started = time.perf_counter()
+        first = None
+        async with client.stream(
+            "POST", f"{base_url}/api/analyze-stream", json={"conversation": transcript}
+        ) as response:
+            response.raise_for_status()
+            async for _ in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - started
+        return {"stream_ttfb": first or 0.0, "stream_total": time.perf_counter() - started}
+
+    async def analyze_batch(rng, state):
+        transcripts = [growing_conversation(rng, 12)[-1][1] for _ in range(batch_size)]
+        started = time.perf_counter()
+        response = await client.post(
+            f"{base_url}/api/analyze-batch",
+            json={"conversations": transcripts, "include_context": False},
+        )
+        response.raise_for_status()
+        return {"analyze_batch": time.perf_counter() - started}
+
+    return {"analyze": analyze, "post_call": post_call, "stream": stream, "analyze_batch": analyze_batch}
+
+
+async def wait_ready(base_url, timeout=180):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("API did not become ready")
+
+
+async def bench_http(args):
+    await wait_ready(args.base_url)
+    rows = []
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        operations = http_operations(client, args.base_url, args.batch_size)
+        for name in args.endpoints:
+            for concurrency in args.concurrency:
+                latencies, errors = await run_load(operations[name], concurrency, args.duration)
+                rows.extend(measured_rows(name, concurrency, latencies, errors, args.duration))
+    return rows
+
+
+# -------------------------------------------------------------- processes
+
+def start_process(command, env=None):
+    return subprocess.Popen(
+        command,
+        cwd=SRC_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def server_env(args):
+    """Environment pointing the API at the fake TTS server"""
+    return {
+        "ELEVENLABS_API_URL": f"http://127.0.0.1:{args.tts_port}",
+        "ELEVENLABS_API_KEY": os.getenv("ELEVENLABS_API_KEY", "bench"),
+        "ELEVENLABS_VOICE_ID": os.getenv("ELEVENLABS_VOICE_ID", "bench-voice"),
+        "ELEVENLABS_MODEL_ID": os.getenv("ELEVENLABS_MODEL_ID", "bench-model"),
+        # Measure synthesis, not cache hits
+        "AUDIO_CACHE_BACKEND": "disk" if args.audio_cache else "none",
+    }
+
+
+# ---------------------------------------------------------------- results
+
+def print_row(row):
+    print(
+        f"{row['stage']:>13} {row['concurrency']:>4} {row['rps']:>9.1f} {row['p50_ms']:>8.1f} "
+        f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>6}"
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(mode, args, rows):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"{mode}-{timestamp}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "mode": mode,
+            "timestamp": timestamp,
+            "git_revision": git_revision(),
+            "duration": args.duration,
+            "results": rows,
+        }, f, indent=2)
+    return path
+
+
+def compare(baseline_path, rows, tolerance):
+    """
+    Compare with an earlier result file
+
+    Returns:
+        Number of regressions (p95 up or RPS down by more than ``tolerance``)
+    """
+    with open(baseline_path) as f:
+        baseline = {(row["stage"], row["concurrency"]): row for row in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\nvs {baseline_path} (tolerance {tolerance:.0%})")
+    for row in rows:
+        base = baseline.get((row["stage"], row["concurrency"]))
+        if base is None or not base["requests"]:
+            continue
+        p95_change = row["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_change = row["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        regressions += regressed
+        print(
+            f"{row['stage']:>13} {row['concurrency']:>4}  p95 {p95_change:+7.1%}  rps {rps_change:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["stages", "http"], default="http")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--stages", nargs="+", default=["embed", "knn", "tts"], choices=["embed", "knn", "tts"])
+    parser.add_argument("--endpoints", nargs="+", default=["analyze", "post_call", "stream"],
+                        choices=["analyze", "post_call", "stream", "analyze_batch"])
+    parser.add_argument("--batch-size", type=int, default=100, help="conversations per analyze_batch request")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5055")
+    parser.add_argument("--start-server", action="store_true", help="start the fake TTS and the API (http mode)")
+    parser.add_argument("--start-tts", action="store_true", help="start the fake TTS server")
+    parser.add_argument("--tts-port", type=int, default=5056)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=150)
+    parser.add_argument("--audio-cache", action="store_true", help="keep the audio cache enabled")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    processes = []
+    if args.start_tts or args.start_server:
+        processes.append(start_process([
+            sys.executable, os.path.join(BENCH_DIR, "fake_tts.py"),
+            "--port", str(args.tts_port), "--first-byte-ms", str(args.tts_first_byte_ms),
+        ]))
+        os.environ.update(server_env(args))
+    if args.start_server and args.mode == "http":
+        port = args.base_url.rsplit(":", 1)[-1]
+        processes.append(start_process(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", port],
+            env=server_env(args),
+        ))
+
+    print(f"{'stage':>13} {'conc':>4} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    try:
+        time.sleep(1.0 if processes else 0)
+        rows = asyncio.run(bench_stages(args) if args.mode == "stages" else bench_http(args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print(f"\nResults written to {save_results(args.mode, args, rows)}")
+    if args.compare:
+        regressions = compare(args.compare, rows, args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
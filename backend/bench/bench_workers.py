@@ -0,0 +1,152 @@
+"""
+Throughput and memory vs. number of API workers
+
+For each worker count, starts ``serve.py`` (shared embedding process), waits
+for every worker to be ready, drives ``/api/analyze`` at a fixed concurrency
+and reports requests/sec, latency percentiles and the resident memory of the
+whole process tree.
+
+Usage (from backend/):
+    python bench/bench_workers.py --workers 1 2 4 --concurrency 64 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+UTTERANCES = [
+    "Hello, this is your grandson. I'm in jail and need money for bail.",
+    "Please go to the store and buy gift cards right now.",
+    "This is the IRS, you owe back taxes and will be arrested today.",
+    "Your computer has a virus, I need remote access to fix it.",
+    "Hi mom, just calling to say I'll be home for dinner.",
+    "Can you verify your account password for me?",
+]
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants (Linux /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+async def wait_ready(client, base_url, workers, timeout=180):
+    """Poll /ready until enough distinct successes suggest every worker is warm"""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get(f"{base_url}/ready")
+            streak = streak + 1 if response.status_code == 200 else 0
+        except httpx.HTTPError:
+            streak = 0
+        if streak >= workers * 4:
+            return
+        await asyncio.sleep(0.1)
+    raise TimeoutError("API did not become ready")
+
+
+async def drive(base_url, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    
+    async def user(client):
+        nonlocal errors
+        history = []
+        while time.monotonic() < deadline:
+            history.append(random.choice(UTTERANCES))
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{base_url}/api/analyze",
+                    json={"conversation": "\n".join(history[-20:]), "include_context": False},
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+    
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) >= 2 else 0.0
+
+
+async def bench(workers, port, concurrency, duration):
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--stateless-only"],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            await wait_ready(client, base_url, workers)
+        latencies, errors = await drive(base_url, concurrency, duration)
+        rss = tree_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    
+    return {
+        "workers": workers,
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "errors": errors,
+        "rss_mb": rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+    
+    print(f"{'workers':>7} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} {'rss MB':>8}")
+    for workers in args.workers:
+        row = asyncio.run(bench(workers, args.port, args.concurrency, args.duration))
+        print(f"{row['workers']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>6} {row['rss_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
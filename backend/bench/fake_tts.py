@@ -0,0 +1,81 @@
+"""
+Stand-in for the ElevenLabs text-to-speech API
+
+Serves ``POST /v1/text-to-speech/{voice_id}/stream`` (and the non-streaming
+route) with chunked fake MP3 data after a configurable time to first byte,
+so the API can be benchmarked without calling ElevenLabs. Point the API at
+it with ``ELEVENLABS_API_URL=http://127.0.0.1:<port>``.
+
+Usage (from backend/):
+    python bench/fake_tts.py --port 5056 --first-byte-ms 150 --chunk-ms 20 --chunks 12
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# MPEG-1 Layer III frame header, so clients sniffing the stream see audio
+FRAME_HEADER = b"\xff\xfb\x90\x64"
+
+
+def create_app(first_byte_ms=150, chunk_ms=20, chunks=12, chunk_bytes=4096, jitter=0.2):
+    """
+    Build the fake TTS app
+
+    Args:
+        first_byte_ms: Delay before the first audio chunk
+        chunk_ms: Delay between subsequent chunks
+        chunks: Chunks per response (scaled up for long texts)
+        chunk_bytes: Size of each chunk
+        jitter: Random +/- fraction applied to every delay
+    """
+    app = FastAPI(title="Fake TTS")
+    app.state.requests = 0
+    payload = (FRAME_HEADER + bytes(chunk_bytes))[:chunk_bytes]
+
+    def delay(ms):
+        return ms / 1000 * random.uniform(1 - jitter, 1 + jitter)
+
+    async def audio(text):
+        # Roughly one extra chunk per 40 characters of text
+        count = max(chunks, len(text) // 40)
+        await asyncio.sleep(delay(first_byte_ms))
+        for i in range(count):
+            if i:
+                await asyncio.sleep(delay(chunk_ms))
+            yield payload
+
+    async def synthesize(voice_id: str, request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        return StreamingResponse(audio(body.get("text", "")), media_type="audio/mpeg")
+
+    app.add_api_route("/v1/text-to-speech/{voice_id}/stream", synthesize, methods=["POST"])
+    app.add_api_route("/v1/text-to-speech/{voice_id}", synthesize, methods=["POST"])
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--first-byte-ms", type=float, default=150)
+    parser.add_argument("--chunk-ms", type=float, default=20)
+    parser.add_argument("--chunks", type=int, default=12)
+    parser.add_argument("--chunk-bytes", type=int, default=4096)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    args = parser.parse_args()
+
+    app = create_app(args.first_byte_ms, args.chunk_ms, args.chunks, args.chunk_bytes, args.jitter)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
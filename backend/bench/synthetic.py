@@ -0,0 +1,145 @@
+"""
+Synthetic scam corpus and call transcripts for benchmarks
+
+``seed`` loads a reproducible corpus of tagged scam cases into Redis through
+the regular ingest path (use a local Redis Stack, e.g.
+``docker run -p 6379:6379 redis/redis-stack-server`` with ``REDIS_HOST=localhost
+REDIS_PORT=6379``). The conversation generator builds transcripts that grow
+one utterance at a time, the way the frontend sends them.
+
+Usage (from backend/):
+    python bench/synthetic.py seed --cases 2000
+    python bench/synthetic.py conversations --count 3 --turns 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+SCAM_TYPES = {
+    "Grandparent Scam": [
+        "Grandma, it's me, I'm in jail and need money for bail right now.",
+        "Please don't tell mom and dad, just send the money today.",
+        "My lawyer says you can pay with gift cards from the store.",
+        "I was in a car accident and they won't let me leave until I pay.",
+    ],
+    "IRS Impersonation": [
+        "This is the IRS, you owe back taxes and a warrant has been issued.",
+        "If you do not pay today, officers will arrest you at your home.",
+        "You must settle the balance with a wire transfer immediately.",
+        "Stay on the line, do not hang up or the penalty will double.",
+    ],
+    "Tech Support Scam": [
+        "We detected a virus on your computer, your files are at risk.",
+        "I need you to install this remote access tool so I can fix it.",
+        "There is a one-time fee for the security license, payable by card.",
+        "Do not turn off your computer while I connect to it.",
+    ],
+    "Bank Fraud Alert Scam": [
+        "This is your bank's fraud department, your account was compromised.",
+        "To protect your money, verify your password and PIN with me.",
+        "We need to move your savings to a safe account today.",
+        "Read me the code we just sent to your phone.",
+    ],
+    "Romance Scam": [
+        "I love you so much, I just need help paying for my flight to see you.",
+        "My bank account is frozen overseas, could you send me some money?",
+        "Please keep our relationship private for now.",
+        "I promise I'll pay you back as soon as I arrive.",
+    ],
+}
+
+BENIGN_UTTERANCES = [
+    "Hi, just calling to see how your day is going.",
+    "Are we still on for dinner on Sunday?",
+    "The kids had a great time at the park today.",
+    "Did you watch the game last night?",
+    "I picked up the groceries you asked for.",
+    "Let me know when you get home safely.",
+]
+
+LANGUAGES = ["en", "es", "fr"]
+REGIONS = ["us", "ca", "uk", "au"]
+
+
+def scam_corpus(count, seed=7):
+    """
+    Generate tagged scam cases
+
+    Yields:
+        Case dictionaries in the format accepted by ingest.iter_cases
+    """
+    rng = random.Random(seed)
+    names = list(SCAM_TYPES)
+    for i in range(count):
+        scam_type = names[i % len(names)]
+        lines = rng.sample(SCAM_TYPES[scam_type], k=3)
+        yield {
+            "case_id": f"bench-{i}",
+            "scam_type": scam_type,
+            "summary": lines[0],
+            "description": " ".join(lines[1:]) + f" Variant {i}.",
+            "category": scam_type,
+            "language": rng.choice(LANGUAGES),
+            "region": rng.choice(REGIONS),
+        }
+
+
+def growing_conversation(rng, turns, scam_ratio=0.5):
+    """
+    Build one call as a list of transcripts, each one utterance longer
+
+    Scam calls start with small talk and drift into a scam script.
+
+    Returns:
+        List of (utterance, full transcript so far)
+    """
+    scripted = rng.random() < scam_ratio
+    script = SCAM_TYPES[rng.choice(list(SCAM_TYPES))] if scripted else []
+    history = []
+    transcript = []
+    for turn in range(turns):
+        # The caller (even turns) switches to the script after the opening line
+        if scripted and turn >= 2 and turn % 2 == 0 and rng.random() < 0.8:
+            utterance = rng.choice(script)
+        else:
+            utterance = rng.choice(BENIGN_UTTERANCES)
+        history.append(f"{'Caller' if turn % 2 == 0 else 'User'}: {utterance}")
+        transcript.append((utterance, "\n".join(history)))
+    return transcript
+
+
+def seed_redis(cases, encode_batch_size=64):
+    """Embed and store the synthetic corpus with the regular ingest path"""
+    sys.path.insert(0, SRC_DIR)
+    from ingest import ingest_cases
+    from reasoning import ElevenLabsRedisIntegration
+
+    integration = ElevenLabsRedisIntegration()
+    return ingest_cases(integration, scam_corpus(cases), encode_batch_size=encode_batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed = commands.add_parser("seed", help="load the synthetic corpus into Redis")
+    seed.add_argument("--cases", type=int, default=2000)
+    seed.add_argument("--encode-batch-size", type=int, default=64)
+    sample = commands.add_parser("conversations", help="print sample growing transcripts")
+    sample.add_argument("--count", type=int, default=3)
+    sample.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        print(json.dumps(seed_redis(args.cases, args.encode_batch_size), indent=2))
+    else:
+        rng = random.Random(7)
+        for _ in range(args.count):
+            print(growing_conversation(rng, args.turns)[-1][1], end="\n\n")
+
+
+if __name__ == "__main__":
+    main()
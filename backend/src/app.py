@@ -1,10 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional, Union
 import os
+import time
+import asyncio
 from reasoning import ElevenLabsRedisIntegration
+import loading_redis
+import metrics
+from detection import build_detection
+from windowed_scoring import SCORING_MAX_WINDOWS, merge_results
+from sessions import SessionStore
+from ingest import ingest_cases
+import json
 import base64
+from urllib.parse import quote
 
 app = FastAPI(title="Real-Time Fraud Detection API")
 
@@ -15,20 +27,161 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Response-Text"],
 )
 
 # Initialize the integration
 integration = ElevenLabsRedisIntegration()
 
+# Rolling per-call state for the session API
+session_store = SessionStore()
+
+# Background tasks started with the app (kept referenced so they are not collected)
+background_tasks = set()
+
+# Component stats exposed on /metrics (gauges, plus _total counters for monotonic values)
+metrics.register_collector(
+    "embedding_cache", integration.embedding_cache.stats, counters=("hits", "misses", "redis_hits", "evictions")
+)
+metrics.register_collector("embedding_batcher", integration.embedding_batcher.stats, counters=("batches", "items"))
+metrics.register_collector(
+    "audio_cache",
+    lambda: integration.audio_cache.stats() if integration.audio_cache else None,
+    counters=("hits", "misses"),
+)
+metrics.register_collector("local_index", lambda: integration.local_index.stats() if integration.local_index else None)
+metrics.register_collector(
+    "prefilter",
+    integration.prefilter.stats,
+    counters=("turns", "keyword_triggered", "cadence_triggered", "short_circuited"),
+)
+metrics.register_collector("redis_pool", loading_redis.pool_stats)
+metrics.register_collector("redis_breaker", lambda: {"open": loading_redis.redis_breaker.state != "closed"})
+metrics.register_collector("sessions", lambda: {"active": len(session_store)})
+
+
+class RequestMetricsMiddleware:
+    """
+    Request count and latency per route template (to response headers) plus in-flight gauge
+
+    Plain ASGI rather than ``@app.middleware("http")``: it only wraps ``send``,
+    so streamed bodies pass straight through without an extra task per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        in_flight = metrics.http_in_flight.labels()
+        in_flight.inc()
+        started = time.perf_counter()
+        response = {"status": 500, "seconds": None}
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["seconds"] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            in_flight.dec()
+            if metrics.METRICS_ENABLED:
+                labels = (scope["method"], getattr(scope.get("route"), "path", "unmatched"), str(response["status"]))
+                metrics.http_requests.labels(*labels).inc()
+                seconds = response["seconds"]
+                metrics.http_seconds.labels(*labels).observe(
+                    seconds if seconds is not None else time.perf_counter() - started
+                )
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
+# Upper bound on conversations per /api/analyze-batch request
+ANALYZE_BATCH_MAX_CONVERSATIONS = int(os.getenv("ANALYZE_BATCH_MAX_CONVERSATIONS", 500))
+
+# Live analysis channel: server heartbeat, idle cut-off and alert threshold (risk score 0-100)
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", 15))
+LIVE_IDLE_TIMEOUT_SECONDS = float(os.getenv("LIVE_IDLE_TIMEOUT_SECONDS", 120))
+LIVE_ALERT_RISK_SCORE = int(os.getenv("LIVE_ALERT_RISK_SCORE", 70))
+
+# Tag filters applied inside the vector search, e.g. {"language": "en", "region": ["us", "ca"]}
+RetrievalFilters = Optional[Dict[str, Union[str, List[str]]]]
+
 
 class AnalyzeRequest(BaseModel):
     conversation: str
+    include_context: bool = True
+    filters: RetrievalFilters = None
+
+
+class AnalyzeBatchRequest(BaseModel):
+    conversations: List[str]
+    include_context: bool = False
+    filters: RetrievalFilters = None
+
+
+class SessionRequest(BaseModel):
+    filters: RetrievalFilters = None
+
+
+class UtteranceRequest(BaseModel):
+    text: str
+    include_context: bool = True
+
+
+class ScamCase(BaseModel):
+    case_id: str
+    scam_type: str
+    summary: str
+    description: str
+    category: Optional[str] = None
+    language: Optional[str] = None
+    region: Optional[str] = None
+
+
+class BulkIngestRequest(BaseModel):
+    cases: List[ScamCase]
+    encode_batch_size: int = 64
 
 
 class PostCallAnalysisRequest(BaseModel):
     conversation: str
     pattern: Optional[str] = None
     confidence: Optional[int] = 0
+    include_context: bool = True
+    filters: RetrievalFilters = None
+
+
+@app.on_event("startup")
+async def startup():
+    """Start model warm-up, the local index mirror and audio pre-rendering"""
+    # Load the embedding model in the background so the server accepts
+    # traffic immediately; /ready reports when it has finished
+    if os.getenv("EMBEDDING_WARMUP", "background").lower() != "lazy":
+        loop = asyncio.get_running_loop()
+        warm_up = loop.run_in_executor(integration.encode_executor, integration.warm_up)
+        background_tasks.add(warm_up)
+        warm_up.add_done_callback(background_tasks.discard)
+    
+    await integration.astart()
+    
+    if os.getenv("AUDIO_CACHE_WARMUP", "false").lower() in ("1", "true", "yes"):
+        task = asyncio.create_task(integration.awarm_audio_cache())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close async Redis and TTS connections"""
+    await integration.aclose()
 
 
 @app.get("/health")
@@ -37,10 +190,43 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the embedding model is loaded"""
+    if not integration.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "embedding_backend": integration.embedding_model.name}
+
+
+@app.get("/api/stats")
+async def stats():
+    """Runtime counters for caches and live sessions"""
+    return {
+        "embedding_cache": integration.embedding_cache.stats(),
+        "embedding_batcher": integration.embedding_batcher.stats(),
+        "audio_cache": integration.audio_cache.stats() if integration.audio_cache else None,
+        "local_index": integration.local_index.stats() if integration.local_index else None,
+        "prefilter": integration.prefilter.stats(),
+        "redis": {
+            "pools": loading_redis.pool_stats(),
+            "circuit_breaker": loading_redis.redis_breaker.stats(),
+        },
+        "sessions": {"active": len(session_store)},
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms, request metrics and component gauges (Prometheus text format)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/analyze")
 async def analyze_conversation(request_data: AnalyzeRequest):
     """
     Analyze conversation for fraud detection in real-time
+    Long conversations are scored over at most SCORING_MAX_WINDOWS windows:
+    the first window plus the most recent ones (use a session to score every window)
     Returns: detection result with risk score and pattern
     """
     try:
@@ -49,70 +235,285 @@ async def analyze_conversation(request_data: AnalyzeRequest):
         if not conversation_text:
             raise HTTPException(status_code=400, detail="No conversation text provided")
         
-        # Get Redis context for RAG
-        redis_context = integration.get_redis_context(conversation_text, top_k=3)
+        # Get Redis context for RAG; long conversations are scored per window
+        retrieval, risk = await integration.ascore_conversation(
+            conversation_text, top_k=3, filters=request_data.filters, max_windows=SCORING_MAX_WINDOWS
+        )
         
         # Generate response (includes text analysis)
-        response = integration.generate_response(conversation_text, redis_context)
-        
-        # Determine if scam detected based on context
-        scam_detected = redis_context and "Scam Type:" in redis_context
-        risk_score = 0
-        detected_pattern = None
-        
-        if scam_detected:
-            # Extract scam type from context
-            lines = redis_context.split('\n')
-            for line in lines:
-                if line.startswith("Scam Type:"):
-                    detected_pattern = line.replace("Scam Type:", "").strip()
-                    break
-            
-            # Calculate risk score based on similarity
-            if "Similarity Score:" in redis_context:
-                for line in lines:
-                    if "Similarity Score:" in line:
-                        try:
-                            score_str = line.split("Similarity Score:")[1].strip()
-                            similarity = float(score_str)
-                            # Convert similarity (0-1) to risk score (0-100)
-                            # Higher similarity = higher risk
-                            risk_score = int(similarity * 100)
-                            break
-                        except:
-                            pass
-            
-            # Default risk score if similarity not found
-            if risk_score == 0:
-                risk_score = 75  # High risk if scam type detected
-        
-        # Extract matched phrases from conversation
-        matched_phrases = []
-        if detected_pattern:
-            # Simple keyword extraction for matched phrases
-            common_scam_keywords = [
-                'urgent', 'immediately', 'verify', 'password', 'gift card',
-                'wire transfer', 'jail', 'bail', 'IRS', 'tax', 'arrest',
-                'virus', 'computer', 'remote access', 'payment', 'account'
-            ]
-            conversation_lower = conversation_text.lower()
-            for keyword in common_scam_keywords:
-                if keyword in conversation_lower:
-                    matched_phrases.append(keyword)
-        
-        return {
-            "scam_detected": scam_detected,
-            "risk_score": risk_score,
-            "pattern": detected_pattern or "Unknown",
-            "matched_phrases": matched_phrases,
-            "response_text": response.get("text", ""),
-            "context_used": redis_context
-        }
+        response = await integration.agenerate_response(conversation_text, retrieval)
+        
+        matched_phrases, _ = integration.prefilter.match(conversation_text)
+        return build_detection(
+            conversation_text,
+            retrieval,
+            response.get("text", ""),
+            matched_phrases=matched_phrases,
+            include_context=request_data.include_context,
+            risk=risk,
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/analyze-batch")
+async def analyze_batch(request_data: AnalyzeBatchRequest):
+    """
+    Analyze many conversations in one request (no audio)
+    Every window of every conversation is scored; all windows are encoded in batched model calls and searched in pipelined
+    Redis round-trips
+    Returns: one detection result per conversation, in request order
+    """
+    conversations = request_data.conversations
+    if not conversations:
+        raise HTTPException(status_code=400, detail="No conversations provided")
+    if len(conversations) > ANALYZE_BATCH_MAX_CONVERSATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {ANALYZE_BATCH_MAX_CONVERSATIONS} conversations per request",
+        )
+    
+    try:
+        analyzed = await integration.aanalyze_batch(conversations, top_k=3, filters=request_data.filters)
+        
+        results = []
+        for conversation_text, (retrieval, risk, response_text) in zip(conversations, analyzed):
+            matched_phrases, _ = integration.prefilter.match(conversation_text)
+            results.append(build_detection(
+                conversation_text,
+                retrieval,
+                response_text,
+                matched_phrases=matched_phrases,
+                include_context=request_data.include_context,
+                risk=risk,
+            ))
+        return {"results": results}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/sessions")
+async def create_session(request_data: Optional[SessionRequest] = None):
+    """
+    Open a call session for incremental analysis
+    Returns: session id to use with the utterances endpoint
+    """
+    session = session_store.create(filters=request_data.filters if request_data else None)
+    return {"session_id": session.session_id, "ttl_seconds": session_store.ttl_seconds}
+
+
+@app.post("/api/sessions/{session_id}/utterances")
+async def append_utterance(session_id: str, request_data: UtteranceRequest):
+    """
+    Append an utterance to a call session and analyze the updated call
+    Only the current window is embedded, so per-turn cost stays constant;
+    turns without scam phrases skip embedding and search until the
+    prefilter cadence comes round
+    Returns: detection result with risk score and pattern
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    text = request_data.text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="No utterance text provided")
+    
+    try:
+        semantic_stage, result = await analyze_utterance(session, text, request_data.include_context)
+        return {"session_id": session_id, "turn": session.turns, "semantic_stage": semantic_stage, **result}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def analyze_utterance(session, text, include_context=True):
+    """
+    Append an utterance to a call session and update its detection
+    
+    Returns:
+        Tuple of (whether the semantic stage ran, detection result)
+    """
+    async with session.lock:
+        # Words of skipped turns must be embedded before their window is frozen
+        stale_text = session.stale_window_text(text)
+        if stale_text is not None:
+            session.update_open_embedding(await integration.aencode(stale_text))
+        
+        window_text = session.append(text)
+        phrases, weight = integration.prefilter.match(text)
+        session.add_matched_phrases(phrases)
+        
+        if not integration.prefilter.should_search(weight, session.turns_since_search):
+            # Keyword stage found nothing new: keep the previous verdict
+            result = dict(session.last_result)
+            if result["scam_detected"]:
+                result["matched_phrases"] = list(session.matched_phrases)
+            return False, result
+        
+        session.update_open_embedding(await integration.aencode(window_text))
+        
+        # The open window and the call-level aggregate are searched in one round-trip
+        queries = [session.open_embedding]
+        if session.aggregate is not None:
+            queries.append(session.query_vector())
+        results = await integration.asearch_many(queries, top_k=3, filters=session.filters)
+        session.mark_searched()
+        session.open_result = results[0]
+        session.risk.update(results[:1], provisional=True)
+        
+        retrieval = merge_results(results, top_k=3)
+        response = await integration.agenerate_response(window_text, retrieval)
+        
+        result = build_detection(
+            window_text,
+            retrieval,
+            response.get("text", ""),
+            matched_phrases=list(session.matched_phrases),
+            include_context=include_context,
+            risk=session.risk,
+        )
+        session.last_matches = retrieval
+        session.last_result = result
+    
+    return True, result
+
+
+@app.delete("/api/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Close a call session and release its state"""
+    if session_store.delete(session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"status": "closed", "session_id": session_id}
+
+
+@app.websocket("/ws/calls")
+async def live_analysis(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Live analysis channel, one per call
+    
+    Client frames (JSON):
+        {"type": "utterance", "text": "..."} - a finalized utterance, or an
+            audio-derived segment (``start``/``end`` are accepted and ignored)
+        {"type": "filters", "filters": {...}} - retrieval tag filters for the call
+        {"type": "ping"}
+    
+    Server frames:
+        {"type": "session", ...} once; {"type": "update", ...} only when the
+        risk score, pattern, detection or matched phrases change;
+        {"type": "heartbeat"} every LIVE_HEARTBEAT_SECONDS; {"type": "error"}
+    
+    Passing ``?session_id=`` reattaches to an existing call session (e.g. after
+    a reconnect); otherwise a session is created and closed with the socket.
+    """
+    await websocket.accept()
+    session = session_store.get(session_id) if session_id else None
+    owns_session = session is None
+    if session is None:
+        session = session_store.create()
+    
+    send_lock = asyncio.Lock()
+    last_received = time.monotonic()
+    
+    async def send(message):
+        async with send_lock:
+            await websocket.send_text(json.dumps(message))
+    
+    async def heartbeat():
+        # Keeps proxies from dropping an idle socket and the session from expiring
+        try:
+            while True:
+                await asyncio.sleep(LIVE_HEARTBEAT_SECONDS)
+                if time.monotonic() - last_received > LIVE_IDLE_TIMEOUT_SECONDS:
+                    await websocket.close(code=1001)
+                    return
+                session_store.get(session.session_id)
+                await send({"type": "heartbeat", "turn": session.turns})
+        except Exception:
+            # Socket already gone; the receive loop cleans up
+            return
+    
+    await send({
+        "type": "session",
+        "session_id": session.session_id,
+        "turn": session.turns,
+        "heartbeat_seconds": LIVE_HEARTBEAT_SECONDS,
+        "alert_risk_score": LIVE_ALERT_RISK_SCORE,
+    })
+    heartbeat_task = asyncio.create_task(heartbeat())
+    last_sent = None
+    alerted = False
+    
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await send({"type": "error", "message": "Frames must be JSON objects"})
+                continue
+            last_received = time.monotonic()
+            kind = message.get("type", "utterance")
+            
+            if kind == "ping":
+                await send({"type": "pong"})
+                continue
+            if kind == "filters":
+                # Same validation as the filters of the HTTP routes
+                try:
+                    filters = SessionRequest(filters=message.get("filters")).filters
+                except ValidationError as e:
+                    await send({"type": "error", "message": f"Invalid filters: {e.errors()[0]['msg']}"})
+                    continue
+                async with session.lock:
+                    session.filters = filters
+                continue
+            
+            text = message.get("text")
+            if not isinstance(text, str) or not text.strip():
+                continue
+            text = text.strip()
+            session_store.get(session.session_id)
+            try:
+                semantic_stage, result = await analyze_utterance(session, text, include_context=False)
+            except Exception as e:
+                await send({"type": "error", "turn": session.turns, "message": str(e)})
+                continue
+            
+            state = (result["risk_score"], result["pattern"], result["scam_detected"], tuple(result["matched_phrases"]))
+            if state == last_sent:
+                continue
+            last_sent = state
+            
+            update = {
+                "type": "update",
+                "turn": session.turns,
+                "semantic_stage": semantic_stage,
+                "scam_detected": result["scam_detected"],
+                "risk_score": result["risk_score"],
+                "pattern": result["pattern"],
+                "matched_phrases": result["matched_phrases"],
+                "alert": False,
+            }
+            if not alerted and result["scam_detected"] and result["risk_score"] >= LIVE_ALERT_RISK_SCORE:
+                # The warning text is sent once, with the alert
+                alerted = True
+                update["alert"] = True
+                update["response_text"] = result["response_text"]
+            await send(update)
+    
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away, or the heartbeat closed an idle socket
+        pass
+    finally:
+        heartbeat_task.cancel()
+        if owns_session:
+            session_store.delete(session.session_id)
+
+
 @app.post("/api/post-call-analysis")
 async def post_call_analysis(request_data: PostCallAnalysisRequest):
     """
@@ -128,34 +529,38 @@ async def post_call_analysis(request_data: PostCallAnalysisRequest):
             raise HTTPException(status_code=400, detail="No conversation text provided")
         
         # Get Redis context for RAG
-        redis_context = integration.get_redis_context(conversation_text, top_k=3)
+        retrieval = await integration.aretrieve(conversation_text, top_k=3, filters=request_data.filters)
         
         # Generate response with audio
-        result = integration.generate_audio_bytes(conversation_text, redis_context)
+        result = await integration.agenerate_audio_bytes(conversation_text, retrieval)
         
         # Encode audio bytes to base64 for transmission
         audio_base64 = None
         if result.get("success") and result.get("audio_bytes"):
             audio_base64 = base64.b64encode(result["audio_bytes"]).decode('utf-8')
         
-        return {
+        response = {
             "explanation": result.get("text", ""),
             "audio_base64": audio_base64,
-            "context_used": redis_context,
             "pattern": pattern,
             "confidence": confidence,
             "success": result.get("success", False)
         }
+        if request_data.include_context:
+            response["context_used"] = retrieval.format()
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/analyze-stream")
-async def analyze_stream(request_data: AnalyzeRequest):
+async def analyze_stream(request_data: AnalyzeRequest, format: str = "stream"):
     """
-    Analyze conversation and return audio stream URL or data
-    For real-time audio playback
+    Analyze conversation and stream the warning audio for real-time playback
+    Audio chunks are forwarded as the TTS service produces them; the warning
+    text is returned URL-encoded in the X-Response-Text header.
+    Pass ?format=json for the buffered base64 payload.
     """
     try:
         conversation_text = request_data.conversation
@@ -164,29 +569,67 @@ async def analyze_stream(request_data: AnalyzeRequest):
             raise HTTPException(status_code=400, detail="No conversation text provided")
         
         # Get Redis context
-        redis_context = integration.get_redis_context(conversation_text, top_k=3)
+        retrieval = await integration.aretrieve(conversation_text, top_k=3, filters=request_data.filters)
+        
+        if format == "json":
+            # Buffered fallback: generate audio bytes and base64-encode once
+            result = await integration.agenerate_audio_bytes(conversation_text, retrieval)
+            
+            if result.get("success") and result.get("audio_bytes"):
+                audio_base64 = base64.b64encode(result["audio_bytes"]).decode('utf-8')
+                return {
+                    "audio_base64": audio_base64,
+                    "text": result.get("text", ""),
+                    "success": True
+                }
+            else:
+                return {
+                    "error": "Failed to generate audio",
+                    "text": result.get("text", ""),
+                    "success": False
+                }
         
-        # Generate audio bytes
-        result = integration.generate_audio_bytes(conversation_text, redis_context)
+        result = await integration.astream_audio(conversation_text, retrieval)
         
-        if result.get("success") and result.get("audio_bytes"):
-            audio_base64 = base64.b64encode(result["audio_bytes"]).decode('utf-8')
-            return {
-                "audio_base64": audio_base64,
-                "text": result.get("text", ""),
-                "success": True
-            }
-        else:
-            return {
-                "error": "Failed to generate audio",
-                "text": result.get("text", ""),
-                "success": False
-            }
+        if not result.get("success"):
+            return JSONResponse(
+                status_code=502,
+                content={
+                    "error": "Failed to generate audio",
+                    "text": result.get("text", ""),
+                    "success": False
+                },
+            )
+        
+        return StreamingResponse(
+            result["audio_stream"],
+            media_type="audio/mpeg",
+            headers={"X-Response-Text": quote(result.get("text", ""))},
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/scam-cases/bulk")
+async def bulk_ingest(request_data: BulkIngestRequest):
+    """
+    Add or update many scam cases in the knowledge base
+    Unchanged cases (same content hash) are skipped
+    Returns: counts and throughput
+    """
+    try:
+        cases = [case.model_dump() for case in request_data.cases]
+        return await run_in_threadpool(
+            ingest_cases,
+            integration,
+            cases,
+            encode_batch_size=request_data.encode_batch_size,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv('PORT', 5000))
@@ -0,0 +1,252 @@
+"""
+Content-addressed cache for synthesized warning audio
+
+Keys are a hash of (text, voice_id, model_id), so identical warnings for the
+same voice are synthesized once and then served without calling the TTS API.
+Two backends are available: a directory on local disk and Redis.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+
+def audio_cache_key(text, voice_id, model_id):
+    """Content hash identifying a synthesized clip"""
+    digest = hashlib.sha256(f"{voice_id}\0{model_id}\0{text}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskAudioCache:
+    """Audio clips stored as files, evicted least recently used by total size"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        """
+        Args:
+            directory: Directory holding the cached clips
+            max_bytes: Total size after which the least recently used clips are evicted
+        """
+        self.directory = directory or os.getenv("AUDIO_CACHE_DIR", ".audio_cache")
+        self.max_bytes = max_bytes or int(os.getenv("AUDIO_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        os.makedirs(self.directory, exist_ok=True)
+        
+        # key -> (last_access, size), rebuilt from the directory on startup;
+        # get/put run on worker threads, so the index is only touched under the lock
+        self._lock = threading.Lock()
+        self._index = {}
+        self._total_bytes = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".mp3"):
+                stat = os.stat(os.path.join(self.directory, name))
+                self._index[name[:-4]] = (stat.st_mtime, stat.st_size)
+                self._total_bytes += stat.st_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key):
+        """Return cached audio bytes, or None on a miss"""
+        with self._lock:
+            if key not in self._index:
+                return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+        except FileNotFoundError:
+            # Evicted by another thread between the index check and the read
+            with self._lock:
+                self._forget(key)
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index[key] = (now, len(data))
+        return data
+
+    def put(self, key, data):
+        """Store audio bytes and evict old clips if over the size budget"""
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        
+        with self._lock:
+            self._forget(key)
+            self._index[key] = (time.time(), len(data))
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _forget(self, key):
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._forget(key)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key, data):
+        await asyncio.to_thread(self.put, key, data)
+
+    def size(self):
+        with self._lock:
+            return {"entries": len(self._index), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+class RedisAudioCache:
+    """Audio clips stored in Redis, evicted least recently used by entry count"""
+
+    def __init__(self, redis_client, async_redis_client, max_entries=None, key_prefix="audio:"):
+        """
+        Args:
+            redis_client: Sync binary Redis client
+            async_redis_client: Async binary Redis client
+            max_entries: Number of clips kept before the least recently used are evicted
+            key_prefix: Key prefix for clips; access times live in ``<prefix>lru``
+        """
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.max_entries = max_entries or int(os.getenv("AUDIO_CACHE_MAX_ENTRIES", 512))
+        self.key_prefix = key_prefix
+        self.lru_key = f"{key_prefix}lru"
+        
+        # Clip count as of the last write, so stats() never blocks on Redis
+        self._entries = None
+        try:
+            self._entries = self.redis_client.zcard(self.lru_key)
+        except Exception as e:
+            print(f"Error reading audio cache size: {e}")
+
+    def get(self, key):
+        data = self.redis_client.get(self.key_prefix + key)
+        if data is not None:
+            self.redis_client.zadd(self.lru_key, {key: time.time()})
+        return data
+
+    def put(self, key, data):
+        pipe = self.redis_client.pipeline()
+        pipe.set(self.key_prefix + key, memoryview(data))
+        pipe.zadd(self.lru_key, {key: time.time()})
+        pipe.zcard(self.lru_key)
+        _, _, count = pipe.execute()
+        self._entries = count
+        
+        excess = count - self.max_entries
+        if excess > 0:
+            evicted = self.redis_client.zpopmin(self.lru_key, excess)
+            if evicted:
+                self.redis_client.delete(*(self.key_prefix + self._decode(k) for k, _ in evicted))
+                self._entries = count - len(evicted)
+
+    async def aget(self, key):
+        data = await self.async_redis_client.get(self.key_prefix + key)
+        if data is not None:
+            await self.async_redis_client.zadd(self.lru_key, {key: time.time()})
+        return data
+
+    async def aput(self, key, data):
+        pipe = self.async_redis_client.pipeline()
+        pipe.set(self.key_prefix + key, memoryview(data))
+        pipe.zadd(self.lru_key, {key: time.time()})
+        pipe.zcard(self.lru_key)
+        _, _, count = await pipe.execute()
+        self._entries = count
+        
+        excess = count - self.max_entries
+        if excess > 0:
+            evicted = await self.async_redis_client.zpopmin(self.lru_key, excess)
+            if evicted:
+                await self.async_redis_client.delete(*(self.key_prefix + self._decode(k) for k, _ in evicted))
+                self._entries = count - len(evicted)
+
+    @staticmethod
+    def _decode(value):
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def size(self):
+        """Entry count as of this process's last write (other processes may have added more)"""
+        return {"entries": self._entries, "max_entries": self.max_entries}
+
+
+class AudioCache:
+    """Front for an audio cache backend with hit/miss counters"""
+
+    def __init__(self, backend, voice_id, model_id):
+        """
+        Args:
+            backend: DiskAudioCache or RedisAudioCache
+            voice_id: TTS voice the clips are rendered with
+            model_id: TTS model the clips are rendered with
+        """
+        self.backend = backend
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return audio_cache_key(text, self.voice_id, self.model_id)
+
+    def _record(self, data):
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def get(self, text):
+        try:
+            return self._record(self.backend.get(self.key(text)))
+        except Exception as e:
+            print(f"Error reading audio cache: {e}")
+            return self._record(None)
+
+    async def acontains(self, text):
+        """Check for a cached clip without touching the hit/miss counters"""
+        try:
+            return await self.backend.aget(self.key(text)) is not None
+        except Exception as e:
+            print(f"Error reading audio cache: {e}")
+            return False
+
+    def put(self, text, data):
+        try:
+            self.backend.put(self.key(text), data)
+        except Exception as e:
+            print(f"Error writing audio cache: {e}")
+
+    async def aget(self, text):
+        try:
+            return self._record(await self.backend.aget(self.key(text)))
+        except Exception as e:
+            print(f"Error reading audio cache: {e}")
+            return self._record(None)
+
+    async def aput(self, text, data):
+        try:
+            await self.backend.aput(self.key(text), data)
+        except Exception as e:
+            print(f"Error writing audio cache: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            **self.backend.size(),
+        }
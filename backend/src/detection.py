@@ -0,0 +1,66 @@
+"""
+Scoring helpers that turn retrieved scam matches into a detection result
+"""
+
+
+def score_retrieval(retrieval):
+    """
+    Determine whether a scam was detected based on the retrieved matches
+    
+    Args:
+        retrieval: RetrievalResult from the vector search
+    
+    Returns:
+        Tuple of (scam_detected, risk_score, detected_pattern)
+    """
+    top = retrieval.top
+    if top is None:
+        return False, 0, None
+    
+    return True, _risk_percent(top.score), top.scam_type
+
+
+def _risk_percent(score):
+    # Convert cosine similarity (0-1) to risk score (0-100)
+    # Higher similarity = higher risk
+    return int(round(min(1.0, max(0.0, score)) * 100))
+
+
+def build_detection(conversation_text, retrieval, response_text, matched_phrases=None, include_context=True, risk=None):
+    """
+    Build the detection payload returned by the analysis endpoints
+    
+    Args:
+        conversation_text: The conversation that was analyzed
+        retrieval: RetrievalResult from the vector search
+        response_text: The generated warning text
+        matched_phrases: Phrases found by the keyword prefilter
+        include_context: Whether to render the formatted context into the payload
+        risk: WindowedRiskScore aggregated over conversation windows; when it
+            has a pattern it takes precedence over the single-query score
+    
+    Returns:
+        Dictionary with detection result, risk score and pattern
+    """
+    if risk is not None and risk.pattern is not None:
+        scam_detected, risk_score, detected_pattern = True, _risk_percent(risk.risk), risk.pattern
+    else:
+        scam_detected, risk_score, detected_pattern = score_retrieval(retrieval)
+    
+    # Extract matched phrases from conversation
+    if not detected_pattern or matched_phrases is None:
+        matched_phrases = []
+    
+    result = {
+        "scam_detected": scam_detected,
+        "risk_score": risk_score,
+        "pattern": detected_pattern or "Unknown",
+        "matched_phrases": matched_phrases,
+        "response_text": response_text,
+    }
+    if risk is not None:
+        # Windows left out by a cap on long conversations
+        result["truncated"] = risk.windows_skipped > 0
+    if include_context:
+        result["context_used"] = retrieval.format()
+    return result
@@ -0,0 +1,178 @@
+"""
+Dynamic micro-batching for embedding requests
+
+Concurrent callers enqueue single texts; a background task collects them for
+up to ``max_wait_ms`` or ``max_batch_size`` items, runs one batched encode on
+the executor and resolves each caller's future.
+"""
+import asyncio
+import os
+import time
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """Collects single-text encode requests into batched model calls"""
+
+    def __init__(self, encode_batch, executor, max_batch_size=None, max_wait_ms=None, max_concurrent_batches=None):
+        """
+        Args:
+            encode_batch: Callable taking a list of texts and returning a 2D array
+            executor: Executor the batched encode runs on
+            max_batch_size: Maximum number of texts per batch
+            max_wait_ms: Maximum time to wait for a batch to fill
+            max_concurrent_batches: Batches allowed to run at once (defaults to
+                the executor's worker count)
+        """
+        self.encode_batch = encode_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBED_BATCH_MAX_SIZE", 32))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", 5))) / 1000
+        self.max_concurrent_batches = max_concurrent_batches or getattr(executor, "_max_workers", 1)
+        
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.total_queue_wait = 0.0
+        self.histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.histogram["+Inf"] = 0
+
+    def _ensure_worker(self):
+        # Bound lazily to the running event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def encode(self, text):
+        """
+        Encode a single text as part of the next batch
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Embedding as a numpy array
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def encode_many(self, texts):
+        """
+        Encode several texts through the shared batches
+        
+        The texts are queued together, so they fill batches alongside other
+        callers' requests and count towards the same concurrency limit.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            List of embeddings, in input order
+        """
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = []
+        enqueued = time.perf_counter()
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future, enqueued))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        """Wait for the first request, then fill the batch until full or the window closes"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            asyncio.get_running_loop().create_task(self._encode(batch))
+
+    async def _encode(self, batch):
+        try:
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+            self._record(batch, started)
+            
+            loop = asyncio.get_running_loop()
+            try:
+                embeddings = await loop.run_in_executor(self.executor, self.encode_batch, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            
+            for (_, future, _), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            self._slots.release()
+
+    def _record(self, batch, started):
+        size = len(batch)
+        self.batches += 1
+        self.items += size
+        self.max_observed_batch = max(self.max_observed_batch, size)
+        self.total_queue_wait += sum(started - enqueued for _, _, enqueued in batch)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.histogram[bucket] += 1
+                break
+        else:
+            self.histogram["+Inf"] += 1
+
+    def stats(self):
+        """Batch size distribution and queueing counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "mean_queue_wait_ms": self.total_queue_wait / self.items * 1000 if self.items else 0.0,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size_histogram": {str(bucket): count for bucket, count in self.histogram.items()},
+        }
+
+    async def aclose(self):
+        """Stop the background batching task"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,224 @@
+"""
+Bounded embedding cache keyed by a hash of the normalized text
+
+Entries live in an in-process LRU with a TTL. An optional shared tier stores
+embeddings in Redis as raw float32 bytes so that replicas and retries reuse
+each other's work.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """LRU/TTL cache of text embeddings with an optional Redis tier"""
+
+    def __init__(
+        self,
+        namespace,
+        max_entries=None,
+        ttl_seconds=None,
+        redis_client=None,
+        async_redis_client=None,
+        redis_ttl_seconds=None,
+        key_prefix="emb:",
+    ):
+        """
+        Args:
+            namespace: Embedding model name, so different models never share entries
+            max_entries: Maximum number of in-process entries
+            ttl_seconds: Lifetime of an in-process entry
+            redis_client: Sync Redis client for the shared tier (optional)
+            async_redis_client: Async Redis client for the shared tier (optional)
+            redis_ttl_seconds: Lifetime of a shared-tier entry
+            key_prefix: Key prefix for shared-tier entries
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", 600))
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.redis_ttl_seconds = redis_ttl_seconds or int(os.getenv("EMBEDDING_CACHE_REDIS_TTL_SECONDS", 3600))
+        self.key_prefix = key_prefix
+        
+        self._entries = OrderedDict()  # key -> (expires_at, embedding)
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text):
+        """Collapse whitespace and case (the MiniLM tokenizer is uncased)"""
+        return " ".join(text.split()).lower()
+
+    def key(self, text):
+        """Content hash of the normalized text within this cache's namespace"""
+        digest = hashlib.sha256(f"{self.namespace}\0{self.normalize(text)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, embedding = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return embedding
+
+    def _put_local(self, key, embedding):
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return embedding
+
+    def _record(self, embedding, from_redis=False):
+        if embedding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if from_redis:
+                self.redis_hits += 1
+
+    def get(self, text):
+        """
+        Look up an embedding, falling back to the sync Redis tier
+        
+        Returns:
+            Cached float32 embedding, or None on a miss
+        """
+        key = self.key(text)
+        embedding = self._get_local(key)
+        if embedding is not None or self.redis_client is None:
+            self._record(embedding)
+            return embedding
+        
+        try:
+            raw = self.redis_client.get(self.key_prefix + key)
+        except Exception as e:
+            print(f"Error reading embedding cache from Redis: {e}")
+            raw = None
+        if raw is not None:
+            embedding = self._put_local(key, np.frombuffer(raw, dtype=np.float32))
+        self._record(embedding, from_redis=raw is not None)
+        return embedding
+
+    async def aget(self, text):
+        """Async variant of get using the async Redis tier"""
+        key = self.key(text)
+        embedding = self._get_local(key)
+        if embedding is not None or self.async_redis_client is None:
+            self._record(embedding)
+            return embedding
+        
+        try:
+            raw = await self.async_redis_client.get(self.key_prefix + key)
+        except Exception as e:
+            print(f"Error reading embedding cache from Redis: {e}")
+            raw = None
+        if raw is not None:
+            embedding = self._put_local(key, np.frombuffer(raw, dtype=np.float32))
+        self._record(embedding, from_redis=raw is not None)
+        return embedding
+
+    async def aget_many(self, texts):
+        """
+        Look up several embeddings; shared-tier misses are fetched with one MGET
+        
+        Returns:
+            List of cached float32 embeddings or None, in input order
+        """
+        keys = [self.key(text) for text in texts]
+        embeddings = [self._get_local(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        raws = [None] * len(missing)
+        if missing and self.async_redis_client is not None:
+            try:
+                raws = await self.async_redis_client.mget([self.key_prefix + keys[i] for i in missing])
+            except Exception as e:
+                print(f"Error reading embedding cache from Redis: {e}")
+        from_redis = set()
+        for i, raw in zip(missing, raws):
+            if raw is not None:
+                embeddings[i] = self._put_local(keys[i], np.frombuffer(raw, dtype=np.float32))
+                from_redis.add(i)
+        
+        for i, embedding in enumerate(embeddings):
+            self._record(embedding, from_redis=i in from_redis)
+        return embeddings
+
+    async def aput_many(self, texts, embeddings):
+        """
+        Store several embeddings; the shared tier is written in one pipeline
+        
+        Returns:
+            The cached (read-only float32) embeddings
+        """
+        keys = [self.key(text) for text in texts]
+        embeddings = [self._put_local(key, embedding) for key, embedding in zip(keys, embeddings)]
+        if self.async_redis_client is not None and keys:
+            try:
+                pipe = self.async_redis_client.pipeline(transaction=False)
+                for key, embedding in zip(keys, embeddings):
+                    pipe.set(self.key_prefix + key, embedding.tobytes(), ex=self.redis_ttl_seconds)
+                await pipe.execute()
+            except Exception as e:
+                print(f"Error writing embedding cache to Redis: {e}")
+        return embeddings
+
+    def put(self, text, embedding):
+        """
+        Store an embedding in the local tier and the sync Redis tier
+        
+        Returns:
+            The cached (read-only float32) embedding
+        """
+        key = self.key(text)
+        embedding = self._put_local(key, embedding)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(self.key_prefix + key, embedding.tobytes(), ex=self.redis_ttl_seconds)
+            except Exception as e:
+                print(f"Error writing embedding cache to Redis: {e}")
+        return embedding
+
+    async def aput(self, text, embedding):
+        """Async variant of put using the async Redis tier"""
+        key = self.key(text)
+        embedding = self._put_local(key, embedding)
+        if self.async_redis_client is not None:
+            try:
+                await self.async_redis_client.set(self.key_prefix + key, embedding.tobytes(), ex=self.redis_ttl_seconds)
+            except Exception as e:
+                print(f"Error writing embedding cache to Redis: {e}")
+        return embedding
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "shared_tier": self.redis_client is not None or self.async_redis_client is not None,
+        }
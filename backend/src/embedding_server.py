@@ -0,0 +1,89 @@
+"""
+Dedicated embedding process shared by all API workers
+
+The model is loaded once in this process and served over a Unix domain
+socket; API workers started with ``EMBEDDING_BACKEND=remote`` hold no model
+weights at all. Requests from different workers are coalesced into batched
+encodes by an EmbeddingBatcher.
+
+Wire format (both directions): 4-byte big-endian length + JSON header.
+Requests carry ``{"texts": [...]}``; responses carry ``{"shape": [n, dim]}``
+followed by ``n * dim`` float32 values, or ``{"error": "..."}``.
+
+Usage:
+    python embedding_server.py --socket /tmp/fraud-embedding.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from embedding_batcher import EmbeddingBatcher
+from embeddings import create_embedding_backend
+
+DEFAULT_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/fraud-embedding.sock")
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def _frame(header, body=b""):
+    header_bytes = json.dumps(header).encode("utf-8")
+    return [struct.pack(">I", len(header_bytes)), header_bytes, body]
+
+
+async def serve(socket_path, threads):
+    backend = create_embedding_backend(MODEL_NAME)
+    print(f"Loading embedding backend '{backend.name}'...")
+    backend.load()
+    # Reported for empty requests, where there is no vector to infer it from
+    dim = np.asarray(backend.encode([""], batch_size=1)).shape[-1]
+    
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="embedding")
+    batcher = EmbeddingBatcher(
+        encode_batch=lambda texts: backend.encode(texts, batch_size=len(texts)),
+        executor=executor,
+    )
+    
+    async def handle(reader, writer):
+        try:
+            while True:
+                size = struct.unpack(">I", await reader.readexactly(4))[0]
+                request = json.loads(await reader.readexactly(size))
+                texts = request.get("texts", [])
+                if not texts:
+                    writer.writelines(_frame({"shape": [0, dim]}))
+                    await writer.drain()
+                    continue
+                try:
+                    vectors = await asyncio.gather(*(batcher.encode(text) for text in texts))
+                    embeddings = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+                    writer.writelines(_frame({"shape": list(embeddings.shape)}, embeddings.tobytes()))
+                except Exception as e:
+                    writer.writelines(_frame({"error": str(e)}))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+    
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    print(f"Embedding server listening on {socket_path}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to local API workers")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EMBEDDING_SERVER_THREADS", 1)), help="encode threads")
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket, args.threads))
+
+
+if __name__ == "__main__":
+    main()
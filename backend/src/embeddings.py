@@ -0,0 +1,239 @@
+"""
+Pluggable sentence-embedding backends
+
+Backends are created without loading any weights; the model is loaded on the
+first ``load``/``encode`` call so that importing the API does not pull in
+torch. Select a backend with ``EMBEDDING_BACKEND``:
+
+- ``sentence-transformers`` (default): the PyTorch SentenceTransformer model
+- ``onnx``: ONNX Runtime with a (optionally int8-quantized) export of the same
+  model, e.g. the ``onnx/model_qint8_avx512.onnx`` file published in the
+  ``sentence-transformers/all-MiniLM-L6-v2`` repository
+- ``remote``: a shared ``embedding_server.py`` process over a Unix socket, so
+  multiple API workers use a single copy of the weights
+"""
+import json
+import os
+import socket
+import struct
+import threading
+
+import numpy as np
+
+
+class SentenceTransformerBackend:
+    """PyTorch SentenceTransformer model, imported and loaded on first use"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self
+
+    def encode(self, sentences, batch_size=32):
+        """Same contract as SentenceTransformer.encode for str or list input"""
+        self.load()
+        return self._model.encode(sentences, batch_size=batch_size)
+
+
+class OnnxEmbeddingBackend:
+    """
+    MiniLM exported to ONNX, run with ONNX Runtime
+
+    Mean pooling and L2 normalization match the SentenceTransformer pipeline
+    for all-MiniLM-L6-v2, so embeddings are interchangeable with the ones
+    already stored in Redis.
+    """
+
+    def __init__(self, model_name, model_dir, model_file="onnx/model.onnx", max_length=256, num_threads=None):
+        """
+        Args:
+            model_name: Name of the model the export was made from
+            model_dir: Directory containing tokenizer.json and the ONNX file
+            model_file: ONNX file relative to model_dir (use a *_qint8*.onnx file for int8)
+            max_length: Token limit applied by truncation
+            num_threads: Intra-op threads for ONNX Runtime
+        """
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self.model_file = model_file
+        self.max_length = max_length
+        self.num_threads = num_threads
+        self.name = f"{model_name}:onnx:{os.path.basename(model_file)}"
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._session is not None
+
+    def load(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import onnxruntime as ort
+                    from tokenizers import Tokenizer
+                    
+                    tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+                    tokenizer.enable_truncation(max_length=self.max_length)
+                    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+                    
+                    options = ort.SessionOptions()
+                    if self.num_threads:
+                        options.intra_op_num_threads = self.num_threads
+                    session = ort.InferenceSession(
+                        os.path.join(self.model_dir, self.model_file),
+                        sess_options=options,
+                        providers=["CPUExecutionProvider"],
+                    )
+                    self._input_names = {i.name for i in session.get_inputs()}
+                    self._tokenizer = tokenizer
+                    self._session = session
+        return self
+
+    def encode(self, sentences, batch_size=32):
+        """Same contract as SentenceTransformer.encode for str or list input"""
+        self.load()
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            
+            token_embeddings = self._session.run(None, feeds)[0]
+            
+            # Mean pooling over non-padding tokens, then L2 normalization
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+        
+        embeddings = np.vstack(outputs) if outputs else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class RemoteEmbeddingBackend:
+    """Client for embedding_server.py; one socket per calling thread"""
+
+    def __init__(self, model_name, socket_path, timeout=30.0):
+        """
+        Args:
+            model_name: Model served by the embedding server
+            socket_path: Unix socket the server listens on
+            timeout: Socket timeout in seconds
+        """
+        self.model_name = model_name
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.name = model_name
+        self._local = threading.local()
+
+    @property
+    def loaded(self):
+        return getattr(self._local, "sock", None) is not None
+
+    def _connect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def load(self):
+        self._connect()
+        return self
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Embedding server closed the connection")
+            received += n
+        return buffer
+
+    def _request(self, texts):
+        sock = self._connect()
+        payload = json.dumps({"texts": texts}).encode("utf-8")
+        sock.sendall(struct.pack(">I", len(payload)) + payload)
+        
+        size = struct.unpack(">I", self._recv_exact(sock, 4))[0]
+        header = json.loads(bytes(self._recv_exact(sock, size)))
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        rows, dim = header["shape"]
+        body = self._recv_exact(sock, rows * dim * 4)
+        return np.frombuffer(body, dtype=np.float32).reshape(rows, dim)
+
+    def encode(self, sentences, batch_size=32):
+        """Same contract as SentenceTransformer.encode for str or list input"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        try:
+            embeddings = self._request(texts)
+        except (ConnectionError, OSError):
+            # Reconnect once (server restart or stale connection)
+            self._disconnect()
+            embeddings = self._request(texts)
+        return embeddings[0] if single else embeddings
+
+
+def create_embedding_backend(model_name):
+    """
+    Create the embedding backend selected by EMBEDDING_BACKEND (no weights are loaded)
+    
+    Args:
+        model_name: Sentence-transformers model name
+    
+    Returns:
+        Backend object with ``name``, ``load()`` and ``encode()``
+    """
+    backend = os.getenv("EMBEDDING_BACKEND", "sentence-transformers").lower()
+    if backend == "remote":
+        return RemoteEmbeddingBackend(
+            model_name,
+            os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/fraud-embedding.sock"),
+        )
+    if backend == "onnx":
+        model_dir = os.getenv("EMBEDDING_ONNX_PATH")
+        if not model_dir:
+            raise ValueError("EMBEDDING_ONNX_PATH must point to the exported model directory when EMBEDDING_BACKEND=onnx")
+        threads = os.getenv("EMBEDDING_ONNX_THREADS")
+        return OnnxEmbeddingBackend(
+            model_name,
+            model_dir,
+            model_file=os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx"),
+            num_threads=int(threads) if threads else None,
+        )
+    return SentenceTransformerBackend(model_name)
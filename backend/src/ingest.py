@@ -0,0 +1,258 @@
+"""
+Bulk ingestion of scam cases into the Redis knowledge base
+
+Cases are streamed from a JSONL or CSV file, embedded in batches and written
+with pipelined HSETs. Each hash stores a content hash, so re-running an
+ingest skips unchanged cases and an interrupted load can simply be resumed.
+
+Usage:
+    python ingest.py cases.jsonl --chunk-size 1000 --encode-batch-size 64
+    python ingest.py --keywords phrases.json
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+import loading_redis
+from prefilter import KEYWORDS_KEY
+from retrieval import FILTER_FIELDS
+
+CASE_FIELDS = ("scam_type", "summary", "description")
+
+
+def scam_case_text(scam_type, summary, description):
+    """Text that is embedded for a scam case"""
+    return f"{scam_type}: {summary} {description}"
+
+
+def scam_case_hash(scam_type, summary, description, tags=None):
+    """
+    Content hash used to skip cases that are already stored unchanged
+    
+    Tags only take part when set, so hashes of untagged cases are unchanged.
+    """
+    content = f"{scam_type}\0{summary}\0{description}"
+    if tags and any(tags):
+        content += "\0" + "\0".join(tag or "" for tag in tags)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def case_tags(case):
+    """Optional (category, language, region) tags of a case"""
+    return tuple(case.get(field) or "" for field in FILTER_FIELDS)
+
+
+def scam_case_fields(scam_type, summary, description, embedding, tags=None):
+    """
+    Hash fields stored for a scam case
+    
+    ``category`` defaults to the scam type so category filters work for
+    cases ingested without explicit tags.
+    """
+    category, language, region = tags or ("", "", "")
+    fields = {
+        "scam_type": scam_type.encode("utf-8"),
+        "description": description.encode("utf-8"),
+        "summary": summary.encode("utf-8"),
+        "content_hash": scam_case_hash(scam_type, summary, description, tags).encode("utf-8"),
+        "category": (category or scam_type).encode("utf-8"),
+        "embedding": embedding,
+    }
+    if language:
+        fields["language"] = language.encode("utf-8")
+    if region:
+        fields["region"] = region.encode("utf-8")
+    return fields
+
+
+def iter_cases(path):
+    """
+    Stream scam cases from a JSONL or CSV file
+    
+    Each record needs ``case_id`` (or ``id``), ``scam_type``, ``summary`` and
+    ``description``; ``category``, ``language`` and ``region`` tags are optional.
+    
+    Yields:
+        Dictionaries with the case fields
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        
+        for record in records:
+            case_id = record.get("case_id") or record.get("id")
+            if case_id is None:
+                continue
+            case = {"case_id": str(case_id)}
+            for field in CASE_FIELDS + FILTER_FIELDS:
+                case[field] = record.get(field) or ""
+            yield case
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+
+def _write_checkpoint(path, processed):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(processed))
+    os.replace(tmp_path, path)
+
+
+def ingest_cases(integration, cases, chunk_size=1000, encode_batch_size=64, checkpoint_path=None, redis_client=None):
+    """
+    Embed and store scam cases in chunks
+    
+    Args:
+        integration: ElevenLabsRedisIntegration providing the embedding model
+        cases: Iterable of case dictionaries (see iter_cases)
+        chunk_size: Number of cases per pipelined write
+        encode_batch_size: Batch size passed to the embedding model
+        checkpoint_path: File recording how many input records were processed
+        redis_client: Binary Redis client (defaults to the long-timeout bulk connection)
+    
+    Returns:
+        Dictionary with counts and throughput
+    """
+    client = redis_client or loading_redis.r_bulk
+    integration.ensure_index()
+    skip = _read_checkpoint(checkpoint_path)
+    processed = 0
+    written = 0
+    unchanged = 0
+    started = time.perf_counter()
+    
+    for chunk in _chunks(cases, chunk_size):
+        if processed + len(chunk) <= skip:
+            processed += len(chunk)
+            continue
+        
+        # Fetch stored content hashes in one round-trip
+        keys = [f"scam:{case['case_id']}" for case in chunk]
+        hashes = [
+            scam_case_hash(case["scam_type"], case["summary"], case["description"], case_tags(case))
+            for case in chunk
+        ]
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, "content_hash")
+        stored = pipe.execute()
+        
+        pending = [
+            (key, case, content_hash)
+            for key, case, content_hash, existing in zip(keys, chunk, hashes, stored)
+            if existing is None or existing.decode("utf-8") != content_hash
+        ]
+        unchanged += len(chunk) - len(pending)
+        
+        if pending:
+            texts = [scam_case_text(case["scam_type"], case["summary"], case["description"]) for _, case, _ in pending]
+            embeddings = integration.embedding_model.encode(texts, batch_size=encode_batch_size)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            
+            pipe = client.pipeline(transaction=False)
+            for (key, case, _), embedding in zip(pending, embeddings):
+                pipe.hset(key, mapping=scam_case_fields(
+                    case["scam_type"],
+                    case["summary"],
+                    case["description"],
+                    embedding.tobytes(),
+                    case_tags(case),
+                ))
+            pipe.execute()
+            written += len(pending)
+        
+        processed += len(chunk)
+        _write_checkpoint(checkpoint_path, processed)
+        
+        elapsed = time.perf_counter() - started
+        print(f"Processed {processed} cases ({written} written, {unchanged} unchanged) - {processed / elapsed:.1f} cases/sec")
+    
+    if written:
+        # Let local index mirrors pick up the change
+        client.incr(integration.index_version_key)
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "processed": processed,
+        "written": written,
+        "unchanged": unchanged,
+        "resumed_from": skip,
+        "seconds": round(elapsed, 3),
+        "cases_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def load_keywords(path, redis_client=None):
+    """
+    Store weighted prefilter phrases in the knowledge base
+    
+    The file is a JSON object of phrase -> weight (or a list of phrases,
+    weighted 1.0).
+    
+    Returns:
+        Number of phrases written
+    """
+    client = redis_client or loading_redis.r_bulk
+    with open(path, encoding="utf-8") as f:
+        phrases = json.load(f)
+    if isinstance(phrases, list):
+        phrases = {phrase: 1.0 for phrase in phrases}
+    if phrases:
+        client.hset(KEYWORDS_KEY, mapping={phrase: float(weight) for phrase, weight in phrases.items()})
+    return len(phrases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load scam cases into the Redis knowledge base")
+    parser.add_argument("path", nargs="?", help="JSONL or CSV file of scam cases")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="cases per pipelined write")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="embedding batch size")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file for resuming an interrupted load")
+    parser.add_argument("--keywords", default=None, help="JSON file of prefilter phrase weights")
+    args = parser.parse_args()
+    
+    if args.keywords:
+        print(f"Stored {load_keywords(args.keywords)} prefilter phrases")
+    if not args.path:
+        return
+    
+    from reasoning import ElevenLabsRedisIntegration
+    integration = ElevenLabsRedisIntegration()
+    
+    result = ingest_cases(
+        integration,
+        iter_cases(args.path),
+        chunk_size=args.chunk_size,
+        encode_batch_size=args.encode_batch_size,
+        checkpoint_path=args.checkpoint,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,197 @@
 import json
+import time
+import threading
 import redis
+import redis.asyncio as aioredis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.exceptions import ConnectionError, TimeoutError
 import os
 import dotenv
 
 
 dotenv.load_dotenv()
 
-# Redis connection for text data (with decode_responses for text fields)
-r = redis.Redis(
-    host=os.getenv("REDIS_HOST"),
-    port=13542,
-    decode_responses=True,
-    username="default",
-    password=os.getenv("REDIS_PASSWORD"),
+# Connection settings; every client below shares a bounded pool built from these
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 13542))
+REDIS_USERNAME = os.getenv("REDIS_USERNAME", "default")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2.0))  # wait for a free connection
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))  # per command
+REDIS_BULK_SOCKET_TIMEOUT = float(os.getenv("REDIS_BULK_SOCKET_TIMEOUT", 30.0))  # ingest pipelines, FT.CREATE/FT.INFO
+REDIS_BULK_MAX_CONNECTIONS = int(os.getenv("REDIS_BULK_MAX_CONNECTIONS", 4))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 1.0))
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", 2))
+REDIS_BACKOFF_BASE = float(os.getenv("REDIS_BACKOFF_BASE", 0.05))
+REDIS_BACKOFF_CAP = float(os.getenv("REDIS_BACKOFF_CAP", 0.5))
+
+
+def _connection_kwargs(decode_responses, retry, socket_timeout=REDIS_SOCKET_TIMEOUT):
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "username": REDIS_USERNAME,
+        "password": REDIS_PASSWORD,
+        "decode_responses": decode_responses,
+        "socket_timeout": socket_timeout,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "retry": retry,
+        "retry_on_error": [ConnectionError, TimeoutError],
+        "health_check_interval": 30,
+    }
+
+
+def _retry():
+    return Retry(ExponentialBackoff(cap=REDIS_BACKOFF_CAP, base=REDIS_BACKOFF_BASE), REDIS_RETRIES)
+
+
+def _async_retry():
+    return AsyncRetry(ExponentialBackoff(cap=REDIS_BACKOFF_CAP, base=REDIS_BACKOFF_BASE), REDIS_RETRIES)
+
+
+# Blocking pools: callers wait up to REDIS_POOL_TIMEOUT for a connection
+# instead of opening unbounded new ones when Redis slows down
+text_pool = redis.BlockingConnectionPool(
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(True, _retry()),
+)
+binary_pool = redis.BlockingConnectionPool(
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(False, _retry()),
+)
+async_binary_pool = aioredis.BlockingConnectionPool(
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(False, _async_retry()),
 )
+# Separate pool for bulk loads and index administration: large pipelines and
+# FT.CREATE/FT.INFO need more than the request-path timeout, and must not
+# hold request-path connections while they run
+bulk_binary_pool = redis.BlockingConnectionPool(
+    max_connections=REDIS_BULK_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(False, _retry(), socket_timeout=REDIS_BULK_SOCKET_TIMEOUT),
+)
+async_bulk_binary_pool = aioredis.BlockingConnectionPool(
+    max_connections=REDIS_BULK_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(False, _async_retry(), socket_timeout=REDIS_BULK_SOCKET_TIMEOUT),
+)
+
+# Redis connection for text data (with decode_responses for text fields)
+r = redis.Redis(connection_pool=text_pool)
 
 # Redis connection for binary data (embeddings) - without decode_responses
-r_binary = redis.Redis(
-    host=os.getenv("REDIS_HOST"),
-    port=13542,
-    decode_responses=False,  # Keep binary for embeddings
-    username="default",
-    password=os.getenv("REDIS_PASSWORD"),
-)
+r_binary = redis.Redis(connection_pool=binary_pool)
+
+# Async binary connection used by the API request handlers
+ar_binary = aioredis.Redis(connection_pool=async_binary_pool)
+
+# Binary connection for ingestion and index administration (long timeout)
+r_bulk = redis.Redis(connection_pool=bulk_binary_pool)
+
+# Async variant for offline jobs (rescore.py) that must not share the request-path pool
+ar_bulk = aioredis.Redis(connection_pool=async_bulk_binary_pool)
+
+
+class CircuitBreaker:
+    """
+    Short-circuits calls to a degraded dependency
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow`` returns False for ``reset_timeout`` seconds. It then lets a
+    single trial call through (half-open); success closes it again. A trial
+    that never reports back (e.g. its request was cancelled) expires after
+    another ``reset_timeout``, so the breaker cannot stay open for good.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or int(os.getenv("REDIS_BREAKER_FAILURES", 5))
+        self.reset_timeout = reset_timeout or float(os.getenv("REDIS_BREAKER_RESET_SECONDS", 10))
+        self.failures = 0
+        self.opened_at = None
+        self.short_circuited = 0
+        self._trial_started = None  # monotonic time the half-open trial was let through
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Return True if a call may be attempted"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open":
+                now = time.monotonic()
+                if self._trial_started is None or now - self._trial_started >= self.reset_timeout:
+                    self._trial_started = now
+                    return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_started = None
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "short_circuited": self.short_circuited,
+        }
 
 
+# Shared breaker guarding retrieval on the request path
+redis_breaker = CircuitBreaker()
 
 
+def _pool_usage(pool):
+    """Created / in-use connection counts across redis-py pool implementations"""
+    if hasattr(pool, "_in_use_connections"):
+        in_use = len(pool._in_use_connections)
+        created = in_use + len(pool._available_connections)
+    else:
+        created = len(getattr(pool, "_connections", []))
+        queue = getattr(getattr(pool, "pool", None), "queue", None)
+        if queue is None:
+            queue = getattr(getattr(pool, "pool", None), "_queue", [])
+        idle = sum(1 for connection in list(queue) if connection is not None)
+        in_use = created - idle
+    return {
+        "max_connections": pool.max_connections,
+        "created": created,
+        "in_use": in_use,
+        "utilization": in_use / pool.max_connections if pool.max_connections else 0.0,
+    }
 
 
+def pool_stats():
+    """Connection pool utilization for every shared pool"""
+    return {
+        "text": _pool_usage(text_pool),
+        "binary": _pool_usage(binary_pool),
+        "async_binary": _pool_usage(async_binary_pool),
+        "bulk_binary": _pool_usage(bulk_binary_pool),
+        "async_bulk_binary": _pool_usage(async_bulk_binary_pool),
+    }
@@ -0,0 +1,245 @@
+"""
+In-process mirror of the scam-pattern vector index
+
+The scam knowledge base is small and changes rarely, so it can be searched
+with a brute-force matrix product instead of a network KNN round-trip. The
+mirror is loaded from the ``scam:*`` hashes and reloaded whenever the version
+counter bumped by ``add_scam_case`` changes.
+"""
+import asyncio
+import os
+
+import numpy as np
+
+from retrieval import FILTER_FIELDS, ScamMatch
+
+INDEX_FIELDS = ("scam_type", "summary", "description", "embedding") + FILTER_FIELDS
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else (value or "")
+
+
+class _Snapshot:
+    """Immutable view of the loaded index, swapped atomically on reload"""
+    __slots__ = ("ids", "scam_types", "summaries", "descriptions", "matrix", "tags", "version")
+
+    def __init__(self, ids, scam_types, summaries, descriptions, matrix, tags, version):
+        self.ids = ids
+        self.scam_types = scam_types
+        self.summaries = summaries
+        self.descriptions = descriptions
+        self.matrix = matrix
+        self.tags = tags  # field -> lowercase tag value -> row indices
+        self.version = version
+
+    def filter_mask(self, filters):
+        """Rows matching every filtered field (any of its values), like a TAG query"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, values in filters.items():
+            rows = np.zeros(len(self.ids), dtype=bool)
+            postings = self.tags.get(field, {})
+            for value in values:
+                rows[postings.get(value, [])] = True
+            mask &= rows
+        return mask
+
+
+class LocalVectorIndex:
+    """Normalized float32 embedding matrix searched by cosine similarity"""
+
+    def __init__(
+        self,
+        redis_client,
+        async_redis_client,
+        embedding_dim,
+        key_prefix="scam:",
+        version_key="scam_index:version",
+        refresh_interval=None,
+    ):
+        """
+        Args:
+            redis_client: Sync binary Redis client
+            async_redis_client: Async binary Redis client
+            embedding_dim: Dimension of the stored embeddings
+            key_prefix: Prefix of the scam case hashes
+            version_key: Counter bumped whenever the knowledge base changes
+            refresh_interval: Seconds between version checks
+        """
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.embedding_dim = embedding_dim
+        self.key_prefix = key_prefix
+        self.version_key = version_key
+        self.refresh_interval = refresh_interval or float(os.getenv("LOCAL_INDEX_REFRESH_SECONDS", 5))
+        self._snapshot = None
+        self._sync_task = None
+        self._load_lock = None
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def __len__(self):
+        return len(self._snapshot.ids) if self._snapshot else 0
+
+    def _build(self, keys, rows, version):
+        ids, scam_types, summaries, descriptions, vectors = [], [], [], [], []
+        tags = {field: {} for field in FILTER_FIELDS}
+        for key, (scam_type, summary, description, embedding, *tag_values) in zip(keys, rows):
+            if not embedding:
+                continue
+            vector = np.frombuffer(embedding, dtype=np.float32)
+            if vector.shape[0] != self.embedding_dim:
+                continue
+            key = _decode(key)
+            ids.append(key[len(self.key_prefix):] if key.startswith(self.key_prefix) else key)
+            scam_types.append(_decode(scam_type))
+            summaries.append(_decode(summary))
+            descriptions.append(_decode(description))
+            for field, value in zip(FILTER_FIELDS, tag_values):
+                # TAG fields are comma separated and case-insensitive
+                for tag in _decode(value).split(","):
+                    if tag.strip():
+                        tags[field].setdefault(tag.strip().lower(), []).append(len(ids) - 1)
+            vectors.append(vector)
+        
+        if vectors:
+            matrix = np.vstack(vectors)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms > 0, norms, 1)
+        else:
+            matrix = np.empty((0, self.embedding_dim), dtype=np.float32)
+        matrix.setflags(write=False)
+        
+        self._snapshot = _Snapshot(ids, scam_types, summaries, descriptions, matrix, tags, version)
+        print(f"Local vector index loaded {len(ids)} scam cases (version {version})")
+
+    def load(self):
+        """Load all scam cases from Redis"""
+        version = self.redis_client.get(self.version_key)
+        keys = list(self.redis_client.scan_iter(match=f"{self.key_prefix}*", count=1000))
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, INDEX_FIELDS)
+        rows = pipe.execute() if keys else []
+        self._build(keys, rows, version)
+
+    async def aload(self):
+        """Async variant of load"""
+        version = await self.async_redis_client.get(self.version_key)
+        keys = [key async for key in self.async_redis_client.scan_iter(match=f"{self.key_prefix}*", count=1000)]
+        pipe = self.async_redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, INDEX_FIELDS)
+        rows = await pipe.execute() if keys else []
+        self._build(keys, rows, version)
+
+    def ensure_loaded(self):
+        if self._snapshot is None:
+            self.load()
+
+    async def aensure_loaded(self):
+        """Async variant of ensure_loaded; concurrent callers share one load"""
+        if self._snapshot is not None:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._snapshot is None:
+                await self.aload()
+
+    def bump_version(self):
+        """Signal other replicas that the knowledge base changed"""
+        return self.redis_client.incr(self.version_key)
+
+    async def arefresh(self):
+        """
+        Reload the mirror if the version counter changed
+        
+        Returns:
+            True if the index was reloaded
+        """
+        version = await self.async_redis_client.get(self.version_key)
+        if self._snapshot is not None and version == self._snapshot.version:
+            return False
+        await self.aload()
+        return True
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.arefresh()
+            except Exception as e:
+                # Keep serving the last loaded snapshot while Redis is unavailable
+                print(f"Error refreshing local vector index: {e}")
+
+    async def astart(self):
+        """Load the index and keep it in sync in the background"""
+        try:
+            await self.aload()
+        except Exception as e:
+            print(f"Error loading local vector index: {e}")
+        if self._sync_task is None:
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def astop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def search(self, query_embedding, top_k=3, filters=None):
+        """
+        Brute-force cosine search over the mirror
+        
+        Args:
+            query_embedding: Embedding of the text to search for
+            top_k: Number of similar cases to retrieve
+            filters: Normalized tag filters (see retrieval.normalize_filters)
+        
+        Returns:
+            List of ScamMatch ordered like the RediSearch query; ``score`` is
+            the cosine similarity, as in results converted from RediSearch
+        """
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot.ids:
+            return []
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        similarities = snapshot.matrix @ query
+        if filters:
+            similarities = np.where(snapshot.filter_mask(filters), similarities, -np.inf)
+        
+        k = min(top_k, int(np.isfinite(similarities).sum()))
+        if k == 0:
+            return []
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best])]
+        
+        return [
+            ScamMatch(
+                id=snapshot.ids[i],
+                scam_type=snapshot.scam_types[i],
+                summary=snapshot.summaries[i],
+                description=snapshot.descriptions[i],
+                score=min(1.0, max(0.0, float(similarities[i]))),
+            )
+            for i in best
+        ]
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "entries": len(snapshot.ids) if snapshot else 0,
+            "version": _decode(snapshot.version) if snapshot else None,
+            "refresh_interval": self.refresh_interval,
+        }
@@ -1,40 +1,158 @@
 import time
-import asyncio
-from fastapi import FastAPI, BackgroundTasks, Request
-from pydantic import BaseModel
+import os
+import json
+import hashlib
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from typing import Dict, Any
 
+from reasoning import ElevenLabsRedisIntegration
+import loading_redis
+import metrics
+from detection import build_detection
+from webhook_queue import RedisStreamQueue, MemoryQueue, WebhookWorkerPool, QueueFull
+
 app = FastAPI()
 
-# Dummy handle_transcript function
+integration = ElevenLabsRedisIntegration()
+
+# redis: durable Redis Stream shared by every process; memory: local stand-in
+if os.getenv("WEBHOOK_QUEUE_BACKEND", "redis").lower() == "memory":
+    queue = MemoryQueue()
+else:
+    queue = RedisStreamQueue(loading_redis.ar_binary)
+
+
+def extract_transcript(transcript_data: Dict[str, Any]) -> str:
+    """
+    Get the conversation text from a webhook payload
+
+    Accepts ``{"transcript": "..."}`` as well as the ElevenLabs post-call
+    format, where ``data.transcript`` is a list of ``{"role", "message"}`` turns.
+    """
+    transcript = transcript_data.get("transcript")
+    if transcript is None and isinstance(transcript_data.get("data"), dict):
+        transcript = transcript_data["data"].get("transcript")
+    if isinstance(transcript, list):
+        return "\n".join(
+            f"{turn.get('role', 'unknown')}: {turn.get('message') or ''}"
+            for turn in transcript if isinstance(turn, dict)
+        )
+    return transcript or ""
+
+
+def idempotency_key(request: Request, body: bytes, transcript_data: Dict[str, Any]) -> str:
+    """Idempotency-Key header, else the conversation id, else a hash of the body"""
+    key = request.headers.get("idempotency-key")
+    if not key and isinstance(transcript_data.get("data"), dict):
+        key = transcript_data["data"].get("conversation_id")
+    return key or hashlib.sha256(body).hexdigest()
+
+
 async def handle_transcript(transcript_data: Dict[str, Any]):
     """
-    Simulates processing of the transcript.
-    This runs in the background.
+    Score a queued transcript: windowed retrieval and risk, no TTS
+    Runs on the worker pool; an exception leaves the message pending so it is redelivered.
     """
+    conversation_text = extract_transcript(transcript_data)
     print(f"[{time.strftime('%X')}] Started processing transcript...")
-    # Simulate a long running process
-    await asyncio.sleep(5) 
-    print(f"[{time.strftime('%X')}] Processed transcript: {transcript_data.get('transcript', 'No transcript provided')}")
-    print(f"[{time.strftime('%X')}] Finished processing.")
+    if not conversation_text:
+        return {"scam_detected": False, "error": "No transcript provided"}
+
+    retrieval, risk = await integration.ascore_conversation(conversation_text, top_k=3)
+    if retrieval.error is not None:
+        # Retry later instead of storing a fallback score for the call
+        raise RuntimeError(retrieval.error)
+
+    matched_phrases, _ = integration.prefilter.match(conversation_text)
+    result = build_detection(
+        conversation_text,
+        retrieval,
+        integration._generate_response_text(conversation_text, retrieval),
+        matched_phrases=matched_phrases,
+        include_context=False,
+        risk=risk,
+    )
+    print(f"[{time.strftime('%X')}] Finished processing: {result['pattern']} ({result['risk_score']}%)")
+    return result
+
+
+worker_pool = WebhookWorkerPool(queue, handle_transcript)
+
+
+@app.on_event("startup")
+async def startup():
+    """Start the worker pool"""
+    await integration.astart()
+    await worker_pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the workers; unfinished messages are redelivered on the next start"""
+    await worker_pool.stop()
+    await integration.aclose()
+
 
 @app.post("/webhook")
-async def receive_transcript(request: Request, background_tasks: BackgroundTasks):
-    """
-    Receives a transcript request, immediately responds to the client,
-    and processes the transcript in the background.
-    """
+async def receive_transcript(request: Request):
+    body = await request.body()
     try:
-        data = await request.json()
+        data = json.loads(body)
     except Exception:
         data = {}
-
+    if not isinstance(data, dict):
+        data = {}
     print(f"[{time.strftime('%X')}] Received webhook request.")
-    
-    # Add the processing task to the background
-    background_tasks.add_task(handle_transcript, data)
-    
-    return {"status": "received", "message": "Transcript processing started in background"}
+
+    key = idempotency_key(request, body, data)
+    try:
+        status, message_id = await queue.enqueue(data, key)
+    except QueueFull:
+        return JSONResponse(
+            status_code=429,
+            content={"status": "rejected", "message": "Transcript queue is full, retry later"},
+            headers={"Retry-After": os.getenv("WEBHOOK_RETRY_AFTER_SECONDS", "5")},
+        )
+    except Exception as e:
+        # Queue unavailable: let the sender retry rather than dropping the transcript
+        print(f"Error queueing webhook: {e}")
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
+
+    if message_id is None:
+        return {"status": "duplicate", "idempotency_key": key, "state": status}
+    return JSONResponse(
+        status_code=202,
+        content={"status": "received", "idempotency_key": key, "message": "Transcript queued for processing"},
+    )
+
+
+@app.get("/webhook/stats")
+async def webhook_stats():
+    """Queue depth, lag and worker counters"""
+    return await worker_pool.stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms plus webhook queue gauges and counters (Prometheus text format)"""
+    return PlainTextResponse(
+        metrics.render(
+            {"webhook": await worker_pool.stats()},
+            counters={"webhook": ("processed", "failed", "redelivered", "dead_lettered")},
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/webhook/{key}")
+async def webhook_status(key: str):
+    """Processing status and detection result for an idempotency key"""
+    status = await queue.status(key)
+    if status is None:
+        return JSONResponse(status_code=404, content={"status": "unknown"})
+    return status
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,256 @@
+"""
+Low-overhead hot-path metrics with Prometheus text exposition
+
+Stage timings go into fixed-bucket histograms: an observation is one
+``perf_counter`` pair, a bisect and two increments, cheap enough to leave on
+in production. Counters are not locked; increments from executor threads may
+race rarely, which is acceptable for monitoring data.
+
+Component stats (caches, Redis pools, sessions, ...) are not tracked twice:
+collectors registered with ``register_collector`` turn their existing
+``stats()`` dictionaries into gauges (and ``_total`` counters for the
+monotonic values) when ``/metrics`` is scraped.
+
+Set ``OTEL_TRACING=true`` (with ``opentelemetry-api`` installed and an SDK
+configured) to also emit one span per stage.
+"""
+import os
+import re
+import time
+from bisect import bisect_left
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds; covers a cached embedding (~10 us) up to a slow TTS clip
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_tracer = None
+if os.getenv("OTEL_TRACING", "false").lower() in ("1", "true", "yes"):
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("fraud-detection")
+    except ImportError:
+        print("OTEL_TRACING is set but opentelemetry-api is not installed; spans disabled")
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _ValueChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        _metrics.append(self)
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        names = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, values + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+stage_seconds = Histogram("fraud_stage_seconds", "Time spent per pipeline stage", ("stage",))
+stage_errors = Counter("fraud_stage_errors_total", "Errors per pipeline stage", ("stage",))
+http_seconds = Histogram("fraud_http_request_seconds", "Time to response headers per route", ("method", "route", "status"))
+http_requests = Counter("fraud_http_requests_total", "Requests handled per route", ("method", "route", "status"))
+http_in_flight = Gauge("fraud_http_requests_in_flight", "Requests currently being handled")
+tts_in_flight = Gauge("fraud_tts_requests_in_flight", "Text-to-speech requests currently streaming")
+
+
+class stage:
+    """
+    Time a block of code as a pipeline stage (usable around awaits)
+
+    Exceptions escaping the block are counted in ``fraud_stage_errors_total``.
+    """
+
+    __slots__ = ("name", "started", "_span")
+
+    def __init__(self, name):
+        self.name = name
+        self._span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self._span = _tracer.start_as_current_span(self.name)
+            self._span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS_ENABLED:
+            stage_seconds.labels(self.name).observe(time.perf_counter() - self.started)
+            if exc_type is not None:
+                stage_errors.labels(self.name).inc()
+        if self._span is not None:
+            self._span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def observe(stage_name, seconds):
+    """Record a duration measured by the caller (e.g. time to first byte)"""
+    if METRICS_ENABLED:
+        stage_seconds.labels(stage_name).observe(seconds)
+
+
+def record_error(stage_name):
+    """Count an error that was handled inside a stage (fallback returned)"""
+    if METRICS_ENABLED:
+        stage_errors.labels(stage_name).inc()
+
+
+def register_collector(prefix, stats, labels=None, counters=()):
+    """
+    Expose a component's ``stats()`` dictionary as metrics on every scrape
+
+    Numeric (and boolean) values become ``fraud_<prefix>_<key>`` gauges;
+    nested dictionaries extend the name, other values are skipped. Keys listed
+    in ``counters`` only ever grow and are exported as counters named
+    ``fraud_<prefix>_<key>_total``.
+
+    Args:
+        prefix: Metric name prefix, e.g. "embedding_cache"
+        stats: Callable returning the stats dictionary (or None)
+        labels: Optional constant labels, e.g. {"pool": "text"}
+        counters: Top-level keys holding monotonic counts, e.g. ("hits", "misses")
+    """
+    _collectors.append((prefix, stats, labels or {}, frozenset(counters)))
+
+
+def _flatten(prefix, values, counters=frozenset()):
+    for key, value in values.items():
+        name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif key in counters and isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{name}_total", value, "counter"
+        elif isinstance(value, bool):
+            yield name, int(value), "gauge"
+        elif isinstance(value, (int, float)):
+            yield name, value, "gauge"
+
+
+def render(extra=None, counters=None):
+    """
+    All metrics in the Prometheus text exposition format
+
+    Args:
+        extra: Optional {prefix: stats dictionary} gathered by the caller,
+            e.g. from async sources, exposed like registered collectors
+        counters: Optional {prefix: keys} naming the monotonic values in ``extra``
+    """
+    lines = []
+    for metric in _metrics:
+        if metric._children:
+            lines.extend(metric.render())
+
+    collectors = list(_collectors)
+    for prefix, values in (extra or {}).items():
+        collectors.append((prefix, lambda values=values: values, {}, frozenset((counters or {}).get(prefix, ()))))
+
+    samples = {}
+    for prefix, stats, labels, counter_keys in collectors:
+        try:
+            values = stats()
+        except Exception as e:
+            print(f"Error collecting {prefix} metrics: {e}")
+            continue
+        for name, value, kind in _flatten(f"fraud_{prefix}", values or {}, counter_keys):
+            samples.setdefault((name, kind), []).append((labels, value))
+    for (name, kind), values in samples.items():
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in values:
+            lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
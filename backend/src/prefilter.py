@@ -0,0 +1,144 @@
+"""
+Cheap first-stage keyword filter in front of vector retrieval
+
+All scam phrases are compiled into a single case-insensitive regex, so a turn
+is scanned in one pass regardless of how many phrases the knowledge base
+holds. Session turns only go to the semantic stage (embedding + KNN) when
+the matched phrase weight reaches a threshold or when enough turns have
+passed since the last semantic check.
+"""
+import os
+import re
+import threading
+
+# Used until phrases are loaded from the knowledge base (phrase -> weight)
+DEFAULT_SCAM_PHRASES = {
+    'urgent': 1.0, 'immediately': 1.0, 'verify': 1.0, 'password': 1.0, 'gift card': 1.0,
+    'wire transfer': 1.0, 'jail': 1.0, 'bail': 1.0, 'IRS': 1.0, 'tax': 1.0, 'arrest': 1.0,
+    'virus': 1.0, 'computer': 1.0, 'remote access': 1.0, 'payment': 1.0, 'account': 1.0,
+}
+
+# Redis hash holding the knowledge-base phrases (field: phrase, value: weight)
+KEYWORDS_KEY = "scam_keywords"
+
+
+class PhraseMatcher:
+    """Single compiled regex over a weighted phrase list"""
+
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases: Mapping of phrase -> weight
+        """
+        self.weights = {}
+        self._canonical = {}
+        for phrase, weight in phrases.items():
+            phrase = " ".join(str(phrase).split())
+            if phrase:
+                self._canonical[phrase.lower()] = phrase
+                self.weights[phrase] = float(weight)
+
+        # Longest first so overlapping phrases prefer the more specific match
+        alternatives = sorted(self._canonical, key=len, reverse=True)
+        pattern = "|".join(re.escape(phrase).replace(r"\ ", r"\s+") for phrase in alternatives)
+        # Simple plurals ("gift cards", "taxes") count as the phrase itself
+        self._regex = re.compile(rf"\b({pattern})(?:e?s)?\b", re.IGNORECASE) if alternatives else None
+
+    def __len__(self):
+        return len(self.weights)
+
+    def match(self, text):
+        """
+        Find the phrases that occur in a piece of text
+
+        Returns:
+            Tuple of (matched phrases in order of first occurrence, total weight)
+        """
+        if self._regex is None or not text:
+            return [], 0.0
+
+        matched = {}
+        for found in self._regex.finditer(text):
+            phrase = self._canonical.get(" ".join(found.group(1).lower().split()))
+            if phrase is not None and phrase not in matched:
+                matched[phrase] = self.weights[phrase]
+        return list(matched), float(sum(matched.values()))
+
+
+class KeywordPrefilter:
+    """Decides per turn whether the semantic stage needs to run"""
+
+    def __init__(self, phrases=None, min_weight=None, semantic_every=None):
+        """
+        Args:
+            phrases: Mapping of phrase -> weight (defaults to DEFAULT_SCAM_PHRASES)
+            min_weight: Matched weight in a turn that triggers the semantic stage
+            semantic_every: Run the semantic stage at least every N turns
+        """
+        self.min_weight = min_weight or float(os.getenv("PREFILTER_MIN_WEIGHT", 1.0))
+        self.semantic_every = semantic_every or int(os.getenv("PREFILTER_SEMANTIC_EVERY", 4))
+        self.matcher = PhraseMatcher(phrases or DEFAULT_SCAM_PHRASES)
+        self.source = "default"
+
+        self.turns = 0
+        self.keyword_triggered = 0
+        self.cadence_triggered = 0
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    def set_phrases(self, phrases, source="knowledge_base"):
+        """Swap in a new phrase list (the compiled matcher is replaced atomically)"""
+        self.matcher = PhraseMatcher(phrases)
+        self.source = source
+
+    def match(self, text):
+        return self.matcher.match(text)
+
+    def should_search(self, weight, turns_since_search):
+        """
+        Record a turn and decide whether it goes to the semantic stage
+
+        Args:
+            weight: Total phrase weight matched in the turn
+            turns_since_search: Turns since the session last ran retrieval
+                (None if it never has)
+
+        Returns:
+            True if the turn should be embedded and searched
+        """
+        with self._lock:
+            self.turns += 1
+            if weight >= self.min_weight:
+                self.keyword_triggered += 1
+                return True
+            if turns_since_search is None or turns_since_search >= self.semantic_every:
+                self.cadence_triggered += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def stats(self):
+        return {
+            "phrases": len(self.matcher),
+            "source": self.source,
+            "turns": self.turns,
+            "keyword_triggered": self.keyword_triggered,
+            "cadence_triggered": self.cadence_triggered,
+            "short_circuited": self.short_circuited,
+            "short_circuit_ratio": self.short_circuited / self.turns if self.turns else 0.0,
+        }
+
+
+def parse_phrase_weights(raw):
+    """Decode a Redis HGETALL reply of phrase -> weight"""
+    phrases = {}
+    for phrase, weight in raw.items():
+        if isinstance(phrase, bytes):
+            phrase = phrase.decode("utf-8")
+        if isinstance(weight, bytes):
+            weight = weight.decode("utf-8")
+        try:
+            phrases[phrase] = float(weight)
+        except ValueError:
+            phrases[phrase] = 1.0
+    return phrases
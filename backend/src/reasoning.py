@@ -1,12 +1,25 @@
 import os 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import loading_redis
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from redis.commands.search.field import TextField, VectorField
+from redis.commands.search.field import TagField, TextField, VectorField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
+from redis.commands.search.result import Result
 from elevenlabs import generate
 from elevenlabs import stream
+from tts_client import AsyncTTSClient
+from embedding_cache import EmbeddingCache
+from embedding_batcher import EmbeddingBatcher
+from retrieval import FILTER_FIELDS, MATCH_FIELDS, RetrievalResult, ScamMatch, normalize_filters, tag_filter_query
+from windowed_scoring import WindowedRiskScore, count_windows, merge_results, sliding_windows
+from audio_cache import AudioCache, DiskAudioCache, RedisAudioCache
+from local_index import LocalVectorIndex
+from prefilter import KEYWORDS_KEY, KeywordPrefilter, parse_phrase_weights
+from ingest import scam_case_fields, scam_case_text
+from embeddings import create_embedding_backend
+import metrics
 import dotenv
 
 dotenv.load_dotenv()
@@ -14,6 +27,15 @@ dotenv.load_dotenv()
 # Get Redis connections
 r = loading_redis.r  # For text fields
 r_binary = loading_redis.r_binary  # For binary embeddings
+ar_binary = loading_redis.ar_binary  # Async binary connection for the API hot path
+r_bulk = loading_redis.r_bulk  # Long-timeout binary connection for index administration
+redis_breaker = loading_redis.redis_breaker  # Short-circuits retrieval when Redis is degraded
+
+# Default minimum cosine similarity for retrieved scam cases
+RETRIEVAL_MIN_SIMILARITY = float(os.getenv("RETRIEVAL_MIN_SIMILARITY", 0.5))
+
+# Windows per encode call / pipelined search when scoring many conversations
+ANALYZE_BATCH_CHUNK_SIZE = int(os.getenv("ANALYZE_BATCH_CHUNK_SIZE", 128))
 
 
 class ElevenLabsRedisIntegration:
@@ -21,26 +43,120 @@ class ElevenLabsRedisIntegration:
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.voice_id = os.getenv("ELEVENLABS_VOICE_ID")  
         self.model_id = os.getenv("ELEVENLABS_MODEL_ID")  
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        # Weights are loaded on first use or by warm_up(), not at construction
+        self.embedding_model = create_embedding_backend(self.embedding_model_name)
+        self.ready = False
+        self._index_ready = False
         self.index_name = "scam_index"
         self.embedding_dim = 384  # all-MiniLM-L6-v2 dimension
+        self.index_version_key = f"{self.index_name}:version"
+        
+        # redis: KNN on RediSearch; local: in-process mirror only;
+        # local_fallback: RediSearch, served from the mirror when Redis fails
+        self.retrieval_backend = os.getenv("RETRIEVAL_BACKEND", "redis").lower()
+        self.local_index = None
+        if self.retrieval_backend in ("local", "local_fallback"):
+            self.local_index = LocalVectorIndex(
+                r_binary,
+                ar_binary,
+                embedding_dim=self.embedding_dim,
+                version_key=self.index_version_key,
+            )
+        
+        # Bounded pool for CPU-bound encoding so async callers never block the event loop
+        self.encode_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("EMBEDDING_MAX_WORKERS", 2)),
+            thread_name_prefix="embedding",
+        )
+        # Concurrent single-text requests are coalesced into batched encodes
+        self.embedding_batcher = EmbeddingBatcher(
+            encode_batch=self._encode_batch,
+            executor=self.encode_executor,
+        )
+        self.tts_client = AsyncTTSClient(
+            api_key=self.api_key,
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+        )
         
-        # Ensure Redis index exists
-        self._setup_redis_index()
+        # Skip the model for text that was embedded recently (retries, post-call
+        # analysis of an already analyzed conversation); the Redis tier is shared
+        shared_cache = os.getenv("EMBEDDING_CACHE_REDIS", "false").lower() in ("1", "true", "yes")
+        self.embedding_cache = EmbeddingCache(
+            namespace=self.embedding_model.name,
+            redis_client=r_binary if shared_cache else None,
+            async_redis_client=ar_binary if shared_cache else None,
+        )
+        
+        # Warning audio is nearly fixed per scam type, so clips are cached by content
+        self.audio_cache = self._create_audio_cache()
+        
+        # Keyword stage that decides when session turns need the vector search
+        self.prefilter = KeywordPrefilter()
+    
+    def _create_audio_cache(self):
+        """Create the audio cache selected by AUDIO_CACHE_BACKEND (disk, redis or none)"""
+        backend = os.getenv("AUDIO_CACHE_BACKEND", "disk").lower()
+        if backend == "disk":
+            return AudioCache(DiskAudioCache(), self.voice_id, self.model_id)
+        if backend == "redis":
+            return AudioCache(RedisAudioCache(r_binary, ar_binary), self.voice_id, self.model_id)
+        return None
+    
+    def warm_up(self):
+        """
+        Load the embedding model, run one encode and make sure the Redis index exists
+        
+        Called in the background at startup so the server can accept traffic
+        before the model is loaded; ``ready`` turns True once it finishes.
+        """
+        self.embedding_model.load()
+        self.embedding_model.encode("warm up")
+        try:
+            self.ensure_index()
+        except Exception as e:
+            # Retrieval reports Redis errors per request; the model itself is usable
+            print(f"Error setting up Redis index: {e}")
+        self.ready = True
+        print(f"Embedding backend '{self.embedding_model.name}' ready")
+    
+    def ensure_index(self):
+        """Create the Redis index on first use instead of at construction"""
+        if not self._index_ready:
+            self._setup_redis_index()
+            self._index_ready = True
     
     def _setup_redis_index(self):
         """Create Redis index for vector search if it doesn't exist"""
         try:
-            # Check if index exists (use binary connection for consistency)
-            r_binary.ft(self.index_name).info()
+            # Check if index exists (FT.INFO can be slow on a large index)
+            info = r_bulk.ft(self.index_name).info()
             print(f"Redis index '{self.index_name}' already exists")
         except Exception:
+            info = None
+        
+        if info is not None:
+            # Indexes created before tag filtering existed get the TAG fields added
+            existing = set()
+            for attribute in info.get("attributes", []):
+                values = [value.decode('utf-8') if isinstance(value, bytes) else value for value in attribute]
+                if "attribute" in values:
+                    existing.add(values[values.index("attribute") + 1])
+            missing = [TagField(field) for field in FILTER_FIELDS if field not in existing]
+            if missing:
+                r_bulk.ft(self.index_name).alter_schema_add(missing)
+                print(f"Added tag fields to Redis index '{self.index_name}'")
+        else:
             # Create index with vector field
             print(f"Creating Redis index '{self.index_name}'...")
             schema = (
                 TextField("scam_type"),
                 TextField("description"),
                 TextField("summary"),
+                TagField("category"),
+                TagField("language"),
+                TagField("region"),
                 VectorField("embedding", "HNSW", {
                     "TYPE": "FLOAT32",
                     "DIM": self.embedding_dim,
@@ -48,7 +164,7 @@ class ElevenLabsRedisIntegration:
                 })
             )
             
-            r_binary.ft(self.index_name).create_index(
+            r_bulk.ft(self.index_name).create_index(
                 schema,
                 definition=IndexDefinition(
                     prefix=["scam:"],
@@ -57,67 +173,451 @@ class ElevenLabsRedisIntegration:
             )
             print(f"Redis index '{self.index_name}' created successfully")
     
-    def get_redis_context(self, query_text, top_k=3, threshold=0.5):
+    def _build_knn_query(self, top_k, threshold=0.0, filters=None, fields=MATCH_FIELDS):
         """
-        Retrieve context from Redis using RAG vector similarity search
+        Build the vector query for the scam index
+        
+        With a threshold the search is a VECTOR_RANGE query, so Redis drops
+        matches below the similarity threshold instead of returning them;
+        tag filters are applied inside the vector search and only the
+        requested fields are returned.
+        
+        Args:
+            top_k: Number of similar cases to retrieve
+            threshold: Minimum cosine similarity (0-1); 0 runs a plain KNN
+            filters: Normalized tag filters (see retrieval.normalize_filters)
+            fields: Fields to return with each match
+        
+        Returns:
+            Query using the ``$vec`` (and ``$radius``) parameters
+        """
+        prefilter = tag_filter_query(filters)
+        if threshold > 0:
+            base_query = "@embedding:[VECTOR_RANGE $radius $vec]=>{$YIELD_DISTANCE_AS: distance}"
+            if prefilter != "*":
+                base_query = f"{prefilter} {base_query}"
+        else:
+            base_query = f"{prefilter}=>[KNN {top_k} @embedding $vec AS distance]"
+            if prefilter != "*":
+                base_query = f"({prefilter})=>[KNN {top_k} @embedding $vec AS distance]"
+        return (
+            Query(base_query)
+            .return_fields(*fields, "distance")
+            .sort_by("distance")
+            .paging(0, top_k)
+            .dialect(2)
+        )
+    
+    def _query_params(self, query_embedding, threshold=0.0):
+        """Parameters for _build_knn_query; COSINE distance = 1 - similarity"""
+        params = {"vec": np.asarray(query_embedding, dtype=np.float32).tobytes()}
+        if threshold > 0:
+            params["radius"] = 1.0 - threshold
+        return params
+    
+    def _to_result(self, matches, threshold):
+        """
+        Keep the matches at or above the threshold as a typed retrieval result
+        
+        Redis already applies the threshold; this covers the local index.
+        
+        Args:
+            matches: ScamMatch list from the vector search
+            threshold: Minimum similarity score (0-1)
+        
+        Returns:
+            RetrievalResult with the matches above the threshold
+        """
+        return RetrievalResult([match for match in matches if match.score >= threshold])
+    
+    def retrieve(self, query_text, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None):
+        """
+        Retrieve similar scam cases using vector similarity search
         
         Args:
             query_text: The conversation text to search for similar scam cases
             top_k: Number of similar cases to retrieve
             threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters, e.g. {"language": "en", "region": ["us", "ca"]}
         
         Returns:
-            Formatted context string with relevant scam cases
+            RetrievalResult with relevant scam cases
         """
         try:
             # Generate query embedding
-            query_embedding = self.embedding_model.encode(query_text)
-            
-            # Convert to bytes for Redis
-            query_bytes = np.array(query_embedding, dtype=np.float32).tobytes()
-            
-            # Create vector similarity query
-            base_query = f"*=>[KNN {top_k} @embedding $vec AS score]"
-            query = (
-                Query(base_query)
-                .return_fields("scam_type", "description", "summary", "score")
-                .sort_by("score")
-                .paging(0, top_k)
-                .dialect(2)
-            )
-            
+            query_embedding = self.encode(query_text)
+        except Exception as e:
+            print(f"Error retrieving context from Redis: {e}")
+            return RetrievalResult(error=str(e))
+        
+        return self.search(query_embedding, top_k=top_k, threshold=threshold, filters=filters)
+    
+    def search(self, query_embedding, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None, fields=MATCH_FIELDS):
+        """
+        Retrieve similar scam cases for an already computed query embedding
+        
+        Args:
+            query_embedding: Embedding of the text to search for
+            top_k: Number of similar cases to retrieve
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+            fields: Fields returned with each match
+        
+        Returns:
+            RetrievalResult with relevant scam cases
+        """
+        filters = normalize_filters(filters)
+        if self.retrieval_backend == "local":
+            self.local_index.ensure_loaded()
+            return self._to_result(self.local_index.search(query_embedding, top_k, filters), threshold)
+        
+        # Skip the network call entirely while Redis is known to be degraded
+        if not redis_breaker.allow():
+            return self._fallback_result(query_embedding, top_k, threshold, filters, "Redis circuit breaker open")
+        
+        try:
             # Execute search using binary connection (since embeddings are binary)
-            results = r_binary.ft(self.index_name).search(
-                query,
-                query_params={"vec": query_bytes}
-            )
+            with metrics.stage("knn"):
+                results = r_binary.ft(self.index_name).search(
+                    self._build_knn_query(top_k, threshold, filters, fields),
+                    query_params=self._query_params(query_embedding, threshold)
+                )
+            redis_breaker.record_success()
             
-            # Format results as context
-            # Decode text fields from bytes if needed
-            context_parts = []
-            for doc in results.docs:
-                score = float(doc.score)
-                if score >= threshold:
-                    # Handle both string and bytes responses
-                    scam_type = doc.scam_type.decode('utf-8') if isinstance(doc.scam_type, bytes) else doc.scam_type
-                    summary = doc.summary.decode('utf-8') if isinstance(doc.summary, bytes) else doc.summary
-                    description = doc.description.decode('utf-8') if isinstance(doc.description, bytes) else doc.description
-                    
-                    context_parts.append(
-                        f"Scam Type: {scam_type}\n"
-                        f"Summary: {summary}\n"
-                        f"Description: {description}\n"
-                        f"Similarity Score: {score:.2f}"
-                    )
+            return self._to_result([ScamMatch.from_doc(doc) for doc in results.docs], threshold)
+                
+        except Exception as e:
+            redis_breaker.record_failure()
+            metrics.record_error("knn")
+            print(f"Error retrieving context from Redis: {e}")
+            return self._fallback_result(query_embedding, top_k, threshold, filters, str(e))
+    
+    async def _aensure_local_index(self):
+        """Load the local mirror on first use, like search(); returns an error message on failure"""
+        try:
+            await self.local_index.aensure_loaded()
+        except Exception as e:
+            metrics.record_error("knn")
+            print(f"Error loading local vector index: {e}")
+            return str(e)
+        return None
+    
+    def _fallback_result(self, query_embedding, top_k, threshold, filters, error):
+        """Serve from the local mirror when Redis is unavailable, else report the error"""
+        if self.local_index is not None and self.local_index.loaded:
+            return self._to_result(self.local_index.search(query_embedding, top_k, filters), threshold)
+        return RetrievalResult(error=error)
+    
+    def get_redis_context(self, query_text, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None):
+        """
+        Retrieve context from Redis using RAG vector similarity search
+        
+        Args:
+            query_text: The conversation text to search for similar scam cases
+            top_k: Number of similar cases to retrieve
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+        
+        Returns:
+            Formatted context string with relevant scam cases
+        """
+        result = self.retrieve(query_text, top_k=top_k, threshold=threshold, filters=filters)
+        with metrics.stage("format_context"):
+            return result.format()
+    
+    def encode(self, text):
+        """
+        Encode text, reusing a cached embedding when available
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Embedding as a float32 numpy array
+        """
+        embedding = self.embedding_cache.get(text)
+        if embedding is None:
+            with metrics.stage("embed"):
+                embedding = self.embedding_model.encode(text)
+            embedding = self.embedding_cache.put(text, embedding)
+        return embedding
+    
+    async def aencode(self, text):
+        """
+        Encode text on the bounded embedding executor without blocking the event loop
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Embedding as a float32 numpy array
+        """
+        embedding = await self.embedding_cache.aget(text)
+        if embedding is None:
+            with metrics.stage("embed"):
+                embedding = await self.embedding_batcher.encode(text)
+            embedding = await self.embedding_cache.aput(text, embedding)
+        return embedding
+    
+    def _encode_batch(self, texts):
+        """Run one batched model call (executed on the embedding executor)"""
+        return self.embedding_model.encode(texts, batch_size=len(texts))
+    
+    async def aretrieve(self, query_text, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None):
+        """
+        Async variant of retrieve for use inside request handlers
+        
+        Args:
+            query_text: The conversation text to search for similar scam cases
+            top_k: Number of similar cases to retrieve
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+        
+        Returns:
+            RetrievalResult with relevant scam cases
+        """
+        try:
+            query_embedding = await self.aencode(query_text)
+        except Exception as e:
+            print(f"Error retrieving context from Redis: {e}")
+            return RetrievalResult(error=str(e))
+        
+        return await self.asearch(query_embedding, top_k=top_k, threshold=threshold, filters=filters)
+    
+    async def aget_redis_context(self, query_text, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None):
+        """
+        Async variant of get_redis_context
+        
+        Returns:
+            Formatted context string with relevant scam cases
+        """
+        result = await self.aretrieve(query_text, top_k=top_k, threshold=threshold, filters=filters)
+        with metrics.stage("format_context"):
+            return result.format()
+    
+    async def asearch(self, query_embedding, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None, fields=MATCH_FIELDS):
+        """
+        Retrieve similar scam cases for an already computed query embedding
+        
+        Args:
+            query_embedding: Embedding of the text to search for
+            top_k: Number of similar cases to retrieve
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+            fields: Fields returned with each match
+        
+        Returns:
+            RetrievalResult with relevant scam cases
+        """
+        filters = normalize_filters(filters)
+        if self.retrieval_backend == "local":
+            error = await self._aensure_local_index()
+            if error is not None:
+                return RetrievalResult(error=error)
+            return self._to_result(self.local_index.search(query_embedding, top_k, filters), threshold)
+        
+        # Skip the network call entirely while Redis is known to be degraded
+        if not redis_breaker.allow():
+            return self._fallback_result(query_embedding, top_k, threshold, filters, "Redis circuit breaker open")
+        
+        try:
+            with metrics.stage("knn"):
+                results = await ar_binary.ft(self.index_name).search(
+                    self._build_knn_query(top_k, threshold, filters, fields),
+                    query_params=self._query_params(query_embedding, threshold)
+                )
+            redis_breaker.record_success()
             
-            if context_parts:
-                return "\n\n---\n\n".join(context_parts)
-            else:
-                return "No similar scam cases found above the similarity threshold."
+            return self._to_result([ScamMatch.from_doc(doc) for doc in results.docs], threshold)
                 
         except Exception as e:
+            redis_breaker.record_failure()
+            metrics.record_error("knn")
+            print(f"Error retrieving context from Redis: {e}")
+            # Serve from the local mirror while Redis is unavailable
+            return self._fallback_result(query_embedding, top_k, threshold, filters, str(e))
+    
+    async def aencode_many(self, texts):
+        """
+        Encode several texts, sending the cache misses through the shared batcher
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            List of float32 numpy arrays, in input order
+        """
+        embeddings = await self.embedding_cache.aget_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            with metrics.stage("embed_batch"):
+                encoded = await self.embedding_batcher.encode_many(missing_texts)
+            encoded = await self.embedding_cache.aput_many(missing_texts, encoded)
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+        return embeddings
+    
+    async def asearch_many(self, query_embeddings, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None, fields=MATCH_FIELDS,
+                           redis_client=None, breaker=redis_breaker):
+        """
+        Run one vector search per query embedding in a single pipelined round-trip
+        
+        Args:
+            query_embeddings: Embeddings to search for
+            top_k: Number of similar cases to retrieve per query
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+            fields: Fields returned with each match
+            redis_client: Async binary client (defaults to the request-path connection)
+            breaker: Circuit breaker guarding the search, or None for offline jobs
+        
+        Returns:
+            List of RetrievalResult, in query order
+        """
+        if not query_embeddings:
+            return []
+        filters = normalize_filters(filters)
+        if self.retrieval_backend == "local":
+            error = await self._aensure_local_index()
+            if error is not None:
+                return [RetrievalResult(error=error) for _ in query_embeddings]
+            return [
+                self._to_result(self.local_index.search(embedding, top_k, filters), threshold)
+                for embedding in query_embeddings
+            ]
+        
+        if breaker is not None and not breaker.allow():
+            return [
+                self._fallback_result(embedding, top_k, threshold, filters, "Redis circuit breaker open")
+                for embedding in query_embeddings
+            ]
+        
+        client = redis_client or ar_binary
+        try:
+            query_args = self._build_knn_query(top_k, threshold, filters, fields).get_args()
+            search = client.ft(self.index_name)
+            pipe = client.pipeline(transaction=False)
+            for embedding in query_embeddings:
+                pipe.execute_command(
+                    "FT.SEARCH", self.index_name, *query_args,
+                    *search.get_params_args(self._query_params(embedding, threshold)),
+                )
+            with metrics.stage("knn_pipeline"):
+                replies = await pipe.execute()
+            if breaker is not None:
+                breaker.record_success()
+            
+            return [
+                self._to_result([ScamMatch.from_doc(doc) for doc in Result(reply, True).docs], threshold)
+                for reply in replies
+            ]
+        
+        except Exception as e:
+            if breaker is not None:
+                breaker.record_failure()
+            metrics.record_error("knn")
             print(f"Error retrieving context from Redis: {e}")
-            return ""
+            return [self._fallback_result(embedding, top_k, threshold, filters, str(e)) for embedding in query_embeddings]
+    
+    async def ascore_conversation(self, conversation_text, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None, max_windows=None):
+        """
+        Score a conversation of any length over overlapping windows
+        
+        Each window is embedded in one batch and searched in one pipelined
+        call; the window matches are aggregated with WindowedRiskScore.
+        
+        Args:
+            conversation_text: The conversation to analyze
+            top_k: Number of similar cases to retrieve per window
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+            max_windows: Cap on scored windows (first plus most recent); None scores every window
+        
+        Returns:
+            Tuple of (merged RetrievalResult, WindowedRiskScore)
+        """
+        scored = await self.ascore_conversations(
+            [conversation_text], top_k=top_k, threshold=threshold, filters=filters, max_windows=max_windows
+        )
+        return scored[0]
+    
+    async def ascore_conversations(self, conversation_texts, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None, chunk_size=None, max_windows=None):
+        """
+        Score many conversations with batched encoding and pipelined searches
+        
+        The windows of all conversations are embedded ``chunk_size`` at a time
+        in one model call each, and every chunk is searched in one pipelined
+        round-trip while the next chunk is being encoded.
+        
+        Args:
+            conversation_texts: Conversations to analyze
+            top_k: Number of similar cases to retrieve per window
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+            chunk_size: Windows per encode call and per pipeline
+            max_windows: Cap on scored windows per conversation; None scores every
+                window, otherwise ``windows_skipped`` on the score counts the rest
+        
+        Returns:
+            List of (merged RetrievalResult, WindowedRiskScore), in input order
+        """
+        chunk_size = chunk_size or ANALYZE_BATCH_CHUNK_SIZE
+        windows = [sliding_windows(text, max_windows=max_windows) for text in conversation_texts]
+        flat = [window for conversation_windows in windows for window in conversation_windows]
+        
+        results = []
+        searching = None
+        for start in range(0, len(flat), chunk_size):
+            chunk = flat[start:start + chunk_size]
+            try:
+                embeddings = await self.aencode_many(chunk)
+            except Exception as e:
+                print(f"Error retrieving context from Redis: {e}")
+                embeddings, failed = None, [RetrievalResult(error=str(e)) for _ in chunk]
+            if searching is not None:
+                results.extend(await searching)
+                searching = None
+            if embeddings is None:
+                results.extend(failed)
+            else:
+                searching = asyncio.ensure_future(
+                    self.asearch_many(embeddings, top_k=top_k, threshold=threshold, filters=filters)
+                )
+        if searching is not None:
+            results.extend(await searching)
+        
+        scored = []
+        offset = 0
+        for text, conversation_windows in zip(conversation_texts, windows):
+            window_results = results[offset:offset + len(conversation_windows)]
+            offset += len(conversation_windows)
+            score = WindowedRiskScore()
+            score.update(window_results)
+            if max_windows is not None:
+                score.windows_skipped = count_windows(text) - len(conversation_windows)
+            scored.append((merge_results(window_results, top_k), score))
+        return scored
+    
+    async def aanalyze_batch(self, conversation_texts, top_k=3, threshold=RETRIEVAL_MIN_SIMILARITY, filters=None):
+        """
+        Score many conversations and build their warning text, without TTS
+        
+        Args:
+            conversation_texts: Conversations to analyze
+            top_k: Number of similar cases to retrieve per window
+            threshold: Minimum similarity score (0-1)
+            filters: Optional tag filters (category, language, region)
+        
+        Returns:
+            List of (RetrievalResult, WindowedRiskScore, response text), in input order
+        """
+        scored = await self.ascore_conversations(conversation_texts, top_k=top_k, threshold=threshold, filters=filters)
+        analyzed = []
+        with metrics.stage("response_text"):
+            for text, (retrieval, score) in zip(conversation_texts, scored):
+                analyzed.append((retrieval, score, self._generate_response_text(text, retrieval)))
+        return analyzed
     
     def _generate_response_text(self, conversation, redis_context):
         """
@@ -125,32 +625,32 @@ class ElevenLabsRedisIntegration:
         
         Args:
             conversation: The conversation text/history
-            redis_context: The retrieved context from Redis
+            redis_context: RetrievalResult, or a formatted context string
         
         Returns:
             Response text string
         """
+        # Typed results: the best match comes first, no re-parsing needed
+        if isinstance(redis_context, RetrievalResult):
+            top = redis_context.top
+            scam_type = top.scam_type if top else None
+            if scam_type:
+                return self._scam_warning_text(scam_type)
+            return self._general_warning_text()
+        
         # Analyze the conversation and Redis context to generate intelligent response
         if redis_context and "Scam Type:" in redis_context:
             # Extract the most relevant scam type (first one, highest similarity)
             lines = redis_context.split('\n')
             scam_type = None
-            description = None
             
-            for i, line in enumerate(lines):
+            for line in lines:
                 if line.startswith("Scam Type:"):
                     scam_type = line.replace("Scam Type:", "").strip()
-                elif line.startswith("Description:") and not description:
-                    description = line.replace("Description:", "").strip()
-                    if scam_type:
-                        break
+                    break
             
             if scam_type:
-                response_text = f"""Warning: This conversation matches the pattern of a {scam_type}.
-
-Based on similar cases in our database, this is a fraudulent call. The caller is using known scam tactics including urgency, emotional manipulation, and requests for immediate payment.
-
-You should hang up immediately. Do not provide any personal information, payment details, or gift card numbers. Legitimate organizations never demand immediate payment over the phone."""
+                response_text = self._scam_warning_text(scam_type)
             else:
                 response_text = f"""Warning: This conversation shows signs of a potential scam.
 
@@ -158,8 +658,21 @@ You should hang up immediately. Do not provide any personal information, payment
 
 You should be cautious. Hang up immediately and do not provide any personal information or payment details."""
         else:
-            # General warning if no specific match found
-            response_text = """Warning: This conversation shows suspicious patterns that may indicate a scam.
+            response_text = self._general_warning_text()
+        
+        return response_text
+    
+    def _scam_warning_text(self, scam_type):
+        """Warning text for a conversation matching a known scam type"""
+        return f"""Warning: This conversation matches the pattern of a {scam_type}.
+
+Based on similar cases in our database, this is a fraudulent call. The caller is using known scam tactics including urgency, emotional manipulation, and requests for immediate payment.
+
+You should hang up immediately. Do not provide any personal information, payment details, or gift card numbers. Legitimate organizations never demand immediate payment over the phone."""
+    
+    def _general_warning_text(self):
+        """General warning if no specific match found"""
+        return """Warning: This conversation shows suspicious patterns that may indicate a scam.
 
 Be cautious of:
 - Urgent requests for money
@@ -168,8 +681,6 @@ Be cautious of:
 - Requests for personal information
 
 If you're unsure, hang up and verify the caller's identity through official channels."""
-        
-        return response_text
     
     def generate_response(self, conversation, redis_context):
         """
@@ -183,7 +694,8 @@ If you're unsure, hang up and verify the caller's identity through official chan
             Dictionary with response text and audio stream
         """
         # Generate response text using RAG context
-        response_text = self._generate_response_text(conversation, redis_context)
+        with metrics.stage("response_text"):
+            response_text = self._generate_response_text(conversation, redis_context)
         
         try:
             # Generate audio stream using ElevenLabs SDK
@@ -208,6 +720,29 @@ If you're unsure, hang up and verify the caller's identity through official chan
                 "success": False
             }
     
+    async def agenerate_response(self, conversation, redis_context):
+        """
+        Async variant of generate_response using the non-blocking TTS client
+        
+        The returned audio stream is an async iterator; no request is sent to
+        the TTS service until it is consumed.
+        
+        Args:
+            conversation: The conversation text/history
+            redis_context: The retrieved context from Redis
+        
+        Returns:
+            Dictionary with response text and async audio stream
+        """
+        with metrics.stage("response_text"):
+            response_text = self._generate_response_text(conversation, redis_context)
+        
+        return {
+            "text": response_text,
+            "audio_stream": self.tts_client.stream(response_text),
+            "success": True
+        }
+    
     def generate_and_play_audio(self, conversation, redis_context):
         """
         Generate response and play audio stream locally
@@ -238,11 +773,17 @@ If you're unsure, hang up and verify the caller's identity through official chan
         Returns:
             Dictionary with text and audio bytes
         """
+        if self.audio_cache is not None:
+            response_text = self._generate_response_text(conversation, redis_context)
+            cached = self.audio_cache.get(response_text)
+            if cached is not None:
+                return {"text": response_text, "audio_bytes": cached, "success": True}
+        
         result = self.generate_response(conversation, redis_context)
         
         if result.get("success") and result.get("audio_stream"):
-            # Collect audio chunks as bytes
-            audio_bytes = b""
+            # Collect audio chunks into one growable buffer (no per-chunk copies)
+            audio_bytes = bytearray()
             for chunk in result["audio_stream"]:
                 if isinstance(chunk, bytes):
                     audio_bytes += chunk
@@ -250,9 +791,197 @@ If you're unsure, hang up and verify the caller's identity through official chan
             result["audio_bytes"] = audio_bytes
             # Remove stream from result (can't serialize)
             del result["audio_stream"]
+            
+            if self.audio_cache is not None and audio_bytes:
+                self.audio_cache.put(result["text"], audio_bytes)
         
         return result
     
+    async def agenerate_audio_bytes(self, conversation, redis_context):
+        """
+        Async variant of generate_audio_bytes
+        
+        Args:
+            conversation: The conversation text/history
+            redis_context: The retrieved context from Redis
+        
+        Returns:
+            Dictionary with text and audio bytes
+        """
+        with metrics.stage("response_text"):
+            response_text = self._generate_response_text(conversation, redis_context)
+        
+        if self.audio_cache is not None:
+            cached = await self.audio_cache.aget(response_text)
+            if cached is not None:
+                return {"text": response_text, "audio_bytes": cached, "success": True}
+        
+        try:
+            audio_bytes = await self.tts_client.synthesize(response_text)
+            if self.audio_cache is not None and audio_bytes:
+                await self.audio_cache.aput(response_text, audio_bytes)
+            return {
+                "text": response_text,
+                "audio_bytes": audio_bytes,
+                "success": True
+            }
+        except Exception as e:
+            print(f"Error calling ElevenLabs API: {e}")
+            return {
+                "error": str(e),
+                "text": response_text,
+                "success": False
+            }
+    
+    async def astream_audio(self, conversation, redis_context):
+        """
+        Generate the response and stream its audio as it is synthesized
+        
+        The first chunk is fetched before returning so TTS failures surface
+        before a streaming response has started.
+        
+        Args:
+            conversation: The conversation text/history
+            redis_context: The retrieved context from Redis
+        
+        Returns:
+            Dictionary with response text and an async iterator of audio chunks
+        """
+        with metrics.stage("response_text"):
+            response_text = self._generate_response_text(conversation, redis_context)
+        
+        if self.audio_cache is not None:
+            cached = await self.audio_cache.aget(response_text)
+            if cached is not None:
+                return {
+                    "text": response_text,
+                    "audio_stream": self._relay_audio(response_text, bytes(cached), None),
+                    "success": True
+                }
+        
+        audio_stream = self.tts_client.stream(response_text)
+        try:
+            first_chunk = await audio_stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = b""
+        except Exception as e:
+            print(f"Error calling ElevenLabs API: {e}")
+            await audio_stream.aclose()
+            return {
+                "error": str(e),
+                "text": response_text,
+                "success": False
+            }
+        
+        return {
+            "text": response_text,
+            "audio_stream": self._relay_audio(response_text, first_chunk, audio_stream),
+            "success": True
+        }
+    
+    async def _relay_audio(self, response_text, first_chunk, audio_stream):
+        """Forward TTS chunks as they arrive, filling the audio cache on completion"""
+        buffer = bytearray(first_chunk) if audio_stream is not None and self.audio_cache is not None else None
+        try:
+            if first_chunk:
+                yield first_chunk
+            if audio_stream is None:
+                return
+            async for chunk in audio_stream:
+                if buffer is not None:
+                    buffer += chunk
+                yield chunk
+        finally:
+            if audio_stream is not None:
+                await audio_stream.aclose()
+        
+        if buffer:
+            await self.audio_cache.aput(response_text, buffer)
+    
+    async def aload_scam_types(self):
+        """
+        Collect the distinct scam types stored under the ``scam:`` prefix
+        
+        Returns:
+            Sorted list of scam type names
+        """
+        keys = [key async for key in ar_binary.scan_iter(match="scam:*", count=500)]
+        if not keys:
+            return []
+        
+        pipe = ar_binary.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, "scam_type")
+        values = await pipe.execute()
+        
+        scam_types = {
+            value.decode('utf-8') if isinstance(value, bytes) else value
+            for value in values
+            if value
+        }
+        return sorted(scam_types)
+    
+    async def awarm_audio_cache(self):
+        """
+        Pre-render the warning audio for every scam type in the knowledge base
+        
+        Returns:
+            Number of clips synthesized (clips already cached are skipped)
+        """
+        if self.audio_cache is None:
+            return 0
+        
+        texts = [self._scam_warning_text(scam_type) for scam_type in await self.aload_scam_types()]
+        texts.append(self._general_warning_text())
+        
+        rendered = 0
+        for text in texts:
+            if await self.audio_cache.acontains(text):
+                continue
+            try:
+                audio_bytes = await self.tts_client.synthesize(text)
+            except Exception as e:
+                print(f"Error pre-rendering warning audio: {e}")
+                continue
+            await self.audio_cache.aput(text, audio_bytes)
+            rendered += 1
+        
+        print(f"Audio cache warm-up rendered {rendered} of {len(texts)} warning clips")
+        return rendered
+    
+    async def aload_keyword_phrases(self):
+        """
+        Load the weighted prefilter phrases stored in the knowledge base
+        
+        Keeps the current phrases when the hash is empty or Redis is unreachable.
+        
+        Returns:
+            Number of phrases loaded
+        """
+        try:
+            phrases = parse_phrase_weights(await ar_binary.hgetall(KEYWORDS_KEY))
+        except Exception as e:
+            print(f"Error loading prefilter phrases: {e}")
+            return 0
+        if phrases:
+            self.prefilter.set_phrases(phrases)
+        return len(phrases)
+    
+    async def astart(self):
+        """Start background components that need a running event loop"""
+        await self.aload_keyword_phrases()
+        if self.local_index is not None:
+            await self.local_index.astart()
+    
+    async def aclose(self):
+        """Release async network clients and the embedding executor"""
+        if self.local_index is not None:
+            await self.local_index.astop()
+        await self.embedding_batcher.aclose()
+        await self.tts_client.aclose()
+        await ar_binary.close()
+        self.encode_executor.shutdown(wait=False)
+    
     def process_fraud_detection(self, conversation_text):
         """
         Complete pipeline: Retrieve context from Redis -> Generate agent response
@@ -264,18 +993,18 @@ If you're unsure, hang up and verify the caller's identity through official chan
             Dictionary with response text, audio, and context used
         """
         # Retrieve relevant scam cases from Redis
-        redis_context = self.get_redis_context(conversation_text, top_k=3)
+        retrieval = self.retrieve(conversation_text, top_k=3)
         
         # Generate agent response with context
-        agent_response = self.generate_response(conversation_text, redis_context)
+        agent_response = self.generate_response(conversation_text, retrieval)
         
         return {
             "response": agent_response,
-            "context_used": redis_context,
+            "context_used": retrieval.format(),
             "conversation": conversation_text
         }
     
-    def add_scam_case(self, case_id, scam_type, description, summary):
+    def add_scam_case(self, case_id, scam_type, description, summary, category=None, language=None, region=None):
         """
         Add a new scam case to Redis knowledge base
         
@@ -284,11 +1013,16 @@ If you're unsure, hang up and verify the caller's identity through official chan
             scam_type: Type of scam (e.g., "Grandparent Scam")
             description: Full description of the scam
             summary: Brief summary
+            category: Category tag for filtering (defaults to the scam type)
+            language: Optional language tag (e.g. "en")
+            region: Optional region tag (e.g. "us")
         """
         try:
+            self.ensure_index()
+            
             # Generate embedding from text
-            text_to_embed = f"{scam_type}: {summary} {description}"
-            embedding = self.embedding_model.encode(text_to_embed)
+            text_to_embed = scam_case_text(scam_type, summary, description)
+            embedding = self.encode(text_to_embed)
             
             # Convert to bytes
             embedding_bytes = embedding.astype(np.float32).tobytes()
@@ -296,12 +1030,12 @@ If you're unsure, hang up and verify the caller's identity through official chan
             # Store in Redis
             # Use binary connection to store all fields including binary embedding
             key = f"scam:{case_id}"
-            r_binary.hset(key, mapping={
-                "scam_type": scam_type.encode('utf-8'),
-                "description": description.encode('utf-8'),
-                "summary": summary.encode('utf-8'),
-                "embedding": embedding_bytes
-            })
+            r_binary.hset(key, mapping=scam_case_fields(
+                scam_type, summary, description, embedding_bytes, (category, language, region)
+            ))
+            
+            # Let local index mirrors pick up the change
+            r_binary.incr(self.index_version_key)
             
             print(f"Added scam case '{case_id}' to Redis")
             return True
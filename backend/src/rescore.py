@@ -0,0 +1,428 @@
+"""
+Offline re-scoring of archived call transcripts
+
+Re-runs windowed retrieval scoring over stored transcripts, e.g. after new
+scam patterns were added to the knowledge base. Inputs are a directory
+tree of ``transcription.txt`` files and ``transcription.jsonl`` segment
+logs (one call per directory, as written by LiveTranscriber) or a JSONL
+archive with one call per line (``id`` and ``transcript``/``text``).
+
+Windows are embedded in batches on a process pool that loads one model per
+worker, searched with pipelined KNN queries and written incrementally to
+JSONL or Parquet (a directory of part files, needs pyarrow). Calls already
+in the output are skipped, so an interrupted run is resumed by running the
+same command again.
+
+Usage:
+    python rescore.py /archive/calls --output rescored.jsonl --workers 4
+    python rescore.py calls.jsonl --output rescored.parquet --filter language=en
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from detection import build_detection
+from embeddings import create_embedding_backend
+from windowed_scoring import WindowedRiskScore, count_windows, merge_results, sliding_windows
+
+TRANSCRIPT_FILES = ("transcription.txt", "transcription.jsonl")
+
+
+def _read_segment_log(path):
+    """Text of a transcription.jsonl segment log (a torn last line is ignored)"""
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                texts.append(json.loads(line)["text"])
+            except (ValueError, KeyError):
+                continue
+    return " ".join(texts)
+
+
+def iter_transcripts(path):
+    """
+    Stream archived calls from a directory tree or a JSONL archive
+
+    In a directory, each folder holding ``transcription.txt`` or
+    ``transcription.jsonl`` is one call (the text file wins when both exist),
+    identified by its path relative to ``path``.
+
+    Yields:
+        Tuples of (call id, source path, transcript text)
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            name = next((name for name in TRANSCRIPT_FILES if name in files), None)
+            if name is None:
+                continue
+            source = os.path.join(root, name)
+            call_id = os.path.relpath(root, path)
+            if name.endswith(".jsonl"):
+                yield call_id, source, _read_segment_log(source)
+            else:
+                with open(source, encoding="utf-8") as f:
+                    yield call_id, source, f.read()
+        return
+
+    if os.path.basename(path) == "transcription.jsonl":
+        yield os.path.dirname(os.path.abspath(path)), path, _read_segment_log(path)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            call_id = record.get("id") or record.get("call_id") or f"line-{number}"
+            text = record.get("transcript") or record.get("text") or record.get("conversation") or ""
+            yield str(call_id), path, text
+
+
+# ------------------------------------------------------------ worker processes
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    """Load one embedding model per worker process"""
+    global _worker_model
+    if threads:
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[name] = str(threads)
+    _worker_model = create_embedding_backend(model_name).load()
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+def _embed_batch(texts, batch_size):
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+# ------------------------------------------------------------------- outputs
+
+class JsonlOutput:
+    """Appends one JSON record per call"""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            # Drop a line torn by an interrupted write
+            with open(path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def done_ids(self):
+        done = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if not record.get("error"):
+                    done.add(record["id"])
+        return done
+
+    def write(self, records):
+        self._file.writelines(json.dumps(record) + "\n" for record in records)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """Writes buffered records as numbered part files in a directory"""
+
+    def __init__(self, path, rows_per_part=5000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("source", pa.string()),
+            ("scam_detected", pa.bool_()),
+            ("risk_score", pa.int64()),
+            ("pattern", pa.string()),
+            ("windows", pa.int64()),
+            ("truncated", pa.bool_()),
+            ("matches", pa.list_(pa.struct([("id", pa.string()), ("scam_type", pa.string()), ("score", pa.float64())]))),
+            ("kb_version", pa.string()),
+            ("error", pa.string()),
+        ])
+        os.makedirs(path, exist_ok=True)
+        self._parts = sorted(name for name in os.listdir(path) if name.endswith(".parquet"))
+        self._buffer = []
+
+    def done_ids(self):
+        done = set()
+        for name in self._parts:
+            table = self.pq.read_table(os.path.join(self.path, name), columns=["id", "error"])
+            for call_id, error in zip(table.column("id").to_pylist(), table.column("error").to_pylist()):
+                if not error:
+                    done.add(call_id)
+        return done
+
+    def write(self, records):
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.rows_per_part:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        name = f"part-{len(self._parts):05d}.parquet"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        self.pq.write_table(self.pa.Table.from_pylist(self._buffer, schema=self.schema), tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        self._parts.append(name)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def open_output(path):
+    if path.endswith(".parquet"):
+        return ParquetOutput(path)
+    return JsonlOutput(path)
+
+
+# ------------------------------------------------------------------- scoring
+
+def _batches(documents, windows_per_batch, max_windows=None):
+    """Group (call id, source, text) into batches of about ``windows_per_batch`` windows"""
+    batch = []
+    windows = 0
+    for call_id, source, text in documents:
+        # Every window by default: archived calls are scored end to end, not just their tail
+        call_windows = sliding_windows(text, max_windows=max_windows)
+        skipped = count_windows(text) - len(call_windows) if max_windows is not None else 0
+        batch.append((call_id, source, text, call_windows, skipped))
+        windows += len(call_windows)
+        if windows >= windows_per_batch:
+            yield batch
+            batch = []
+            windows = 0
+    if batch:
+        yield batch
+
+
+async def _index_version(integration):
+    """Knowledge base version the calls are scored against (None if unknown)"""
+    import loading_redis
+    try:
+        version = await loading_redis.ar_bulk.get(integration.index_version_key)
+    except Exception as e:
+        print(f"Error reading index version: {e}")
+        return None
+    return version.decode("utf-8") if version else None
+
+
+def _record(call_id, source, text, windows, skipped, results, top_k, kb_version):
+    score = WindowedRiskScore()
+    score.update(results)
+    score.windows_skipped = skipped
+    retrieval = merge_results(results, top_k)
+    detection = build_detection(text, retrieval, "", include_context=False, risk=score)
+    return {
+        "id": call_id,
+        "source": source,
+        "scam_detected": detection["scam_detected"],
+        "risk_score": detection["risk_score"],
+        "pattern": detection["pattern"],
+        "windows": len(windows),
+        "truncated": detection["truncated"],
+        "matches": [{"id": match.id, "scam_type": match.scam_type, "score": match.score} for match in retrieval],
+        "kb_version": kb_version,
+        "error": retrieval.error,
+    }
+
+
+async def rescore(
+    integration,
+    documents,
+    output,
+    workers=None,
+    threads_per_worker=1,
+    windows_per_batch=256,
+    max_windows=None,
+    encode_batch_size=64,
+    top_k=3,
+    threshold=None,
+    filters=None,
+    report_every=5.0,
+):
+    """
+    Score archived calls and write one record per call
+
+    Up to two batches per worker are in flight, so the KNN searches and
+    writes of finished batches overlap with embedding on the pool. Searches
+    use the long-timeout bulk connection and bypass the request-path circuit
+    breaker, so a slow batch cannot trip it for live traffic.
+
+    Args:
+        integration: ElevenLabsRedisIntegration used for the searches
+        documents: Iterable of (call id, source, text), see iter_transcripts
+        output: JsonlOutput or ParquetOutput
+        workers: Embedding processes (default: CPU count)
+        threads_per_worker: Torch/ONNX threads in each worker
+        windows_per_batch: Windows embedded per pool task
+        max_windows: Cap on windows per call (first plus most recent); None
+            scores every window, capped calls are marked ``truncated``
+        encode_batch_size: Batch size passed to the model
+        top_k: Matches kept per call
+        threshold: Minimum similarity (defaults to RETRIEVAL_MIN_SIMILARITY)
+        filters: Optional tag filters (category, language, region)
+        report_every: Seconds between progress lines
+
+    Returns:
+        Dictionary with counts and throughput
+    """
+    import loading_redis
+    from reasoning import RETRIEVAL_MIN_SIMILARITY
+
+    threshold = RETRIEVAL_MIN_SIMILARITY if threshold is None else threshold
+    workers = workers or os.cpu_count() or 1
+    done = output.done_ids()
+    kb_version = await _index_version(integration)
+    loop = asyncio.get_running_loop()
+
+    scored = 0
+    skipped = 0
+    failed = 0
+    started = time.perf_counter()
+    last_report = started
+
+    def pending_documents():
+        nonlocal skipped
+        for call_id, source, text in documents:
+            if call_id in done:
+                skipped += 1
+                continue
+            yield call_id, source, text
+
+    async def score_batch(pool, batch):
+        texts = [window for _, _, _, windows, _ in batch for window in windows]
+        embeddings = await loop.run_in_executor(pool, _embed_batch, texts, encode_batch_size) if texts else []
+        results = await integration.asearch_many(
+            list(embeddings), top_k=top_k, threshold=threshold, filters=filters,
+            redis_client=loading_redis.ar_bulk, breaker=None,
+        )
+        records = []
+        offset = 0
+        for call_id, source, text, windows, skipped in batch:
+            records.append(_record(
+                call_id, source, text, windows, skipped, results[offset:offset + len(windows)], top_k, kb_version
+            ))
+            offset += len(windows)
+        return records
+
+    def collect(finished):
+        nonlocal scored, failed, last_report
+        for task in finished:
+            records = task.result()
+            output.write(records)
+            scored += len(records)
+            failed += sum(1 for record in records if record["error"])
+        now = time.perf_counter()
+        if now - last_report >= report_every:
+            last_report = now
+            print(f"Scored {scored} calls ({skipped} already done, {failed} failed) - {scored / (now - started):.1f} docs/sec")
+
+    # spawn: workers must not inherit the parent's Redis connections or threads
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(integration.embedding_model_name, threads_per_worker),
+        ) as pool:
+            in_flight = set()
+            for batch in _batches(pending_documents(), windows_per_batch, max_windows):
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    collect(finished)
+                in_flight.add(asyncio.ensure_future(score_batch(pool, batch)))
+            if in_flight:
+                finished, _ = await asyncio.wait(in_flight)
+                collect(finished)
+    finally:
+        # Keep what was scored so far; the rest is picked up on the next run
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "scored": scored,
+        "skipped": skipped,
+        "failed": failed,
+        "kb_version": kb_version,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(scored / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def _parse_filters(values):
+    filters = {}
+    for value in values or []:
+        field, _, tag = value.partition("=")
+        filters.setdefault(field, []).append(tag)
+    return filters or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived call transcripts against the knowledge base")
+    parser.add_argument("path", help="directory of transcription.txt/.jsonl files or a JSONL archive")
+    parser.add_argument("--output", required=True, help="results file (.jsonl) or directory (.parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: CPU count)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--windows-per-batch", type=int, default=256, help="windows embedded per pool task")
+    parser.add_argument("--max-windows", type=int, default=None, help="cap on windows per call (default: every window)")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="embedding batch size")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=None, help="minimum similarity (default RETRIEVAL_MIN_SIMILARITY)")
+    parser.add_argument("--filter", action="append", help="tag filter, e.g. language=en (repeatable)")
+    args = parser.parse_args()
+
+    from reasoning import ElevenLabsRedisIntegration
+
+    async def run():
+        integration = ElevenLabsRedisIntegration()
+        try:
+            return await rescore(
+                integration,
+                iter_transcripts(args.path),
+                open_output(args.output),
+                workers=args.workers,
+                threads_per_worker=args.threads_per_worker,
+                windows_per_batch=args.windows_per_batch,
+                max_windows=args.max_windows,
+                encode_batch_size=args.encode_batch_size,
+                top_k=args.top_k,
+                threshold=args.threshold,
+                filters=_parse_filters(args.filter),
+            )
+        finally:
+            await integration.aclose()
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
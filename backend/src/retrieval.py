@@ -0,0 +1,159 @@
+"""
+Typed results for scam-pattern retrieval
+"""
+import re
+from dataclasses import dataclass
+
+NO_MATCH_CONTEXT = "No similar scam cases found above the similarity threshold."
+
+# Text fields returned with every match unless a projection is requested
+MATCH_FIELDS = ("scam_type", "summary", "description")
+
+# TAG fields that retrieval can pre-filter on
+FILTER_FIELDS = ("category", "language", "region")
+
+_TAG_SPECIAL = re.compile(r"([,.<>{}\[\]\"':;!@#$%^&*()\-+=~|/\\ ])")
+
+
+def _decode(value):
+    # Handle both string and bytes responses
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def similarity_from_distance(distance):
+    """Cosine similarity (clamped to 0-1) from a COSINE metric distance"""
+    return min(1.0, max(0.0, 1.0 - float(distance)))
+
+
+def escape_tag(value):
+    """Escape a value for use inside a RediSearch TAG query"""
+    return _TAG_SPECIAL.sub(r"\\\1", str(value).strip())
+
+
+def normalize_filters(filters):
+    """
+    Drop empty entries and unknown fields from a filter mapping
+    
+    Args:
+        filters: Mapping of tag field -> value or list of accepted values
+    
+    Returns:
+        Dict of field -> list of lowercase values, or None if nothing filters
+    """
+    if not filters:
+        return None
+    normalized = {}
+    for field in FILTER_FIELDS:
+        values = filters.get(field)
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        values = [str(value).strip().lower() for value in values if str(value).strip()]
+        if values:
+            normalized[field] = values
+    return normalized or None
+
+
+def tag_filter_query(filters):
+    """
+    Render normalized filters as a RediSearch pre-filter expression
+    
+    Returns:
+        Query string such as ``@category:{irs} @language:{en|es}``, or "*"
+    """
+    if not filters:
+        return "*"
+    return " ".join(
+        f"@{field}:{{{'|'.join(escape_tag(value) for value in values)}}}"
+        for field, values in filters.items()
+    )
+
+
+@dataclass(slots=True)
+class ScamMatch:
+    """
+    A single scam case returned by the vector search
+    
+    ``score`` is the cosine similarity (0-1, higher is more similar), not the
+    raw COSINE distance RediSearch returns.
+    """
+    id: str
+    scam_type: str
+    summary: str
+    description: str
+    score: float
+
+    @classmethod
+    def from_doc(cls, doc, key_prefix="scam:"):
+        """Build a match from a RediSearch result document (fields may be projected out)"""
+        doc_id = _decode(doc.id)
+        if doc_id.startswith(key_prefix):
+            doc_id = doc_id[len(key_prefix):]
+        return cls(
+            id=doc_id,
+            scam_type=_decode(getattr(doc, "scam_type", "")),
+            summary=_decode(getattr(doc, "summary", "")),
+            description=_decode(getattr(doc, "description", "")),
+            score=similarity_from_distance(doc.distance),
+        )
+
+    def format(self):
+        """Render the match as a context block"""
+        return (
+            f"Scam Type: {self.scam_type}\n"
+            f"Summary: {self.summary}\n"
+            f"Description: {self.description}\n"
+            f"Similarity Score: {self.score:.2f}"
+        )
+
+
+class RetrievalResult:
+    """
+    Ordered matches for a query, best match first
+    
+    The context string sent to clients is only built when ``format`` is called.
+    """
+    __slots__ = ("matches", "error", "_formatted")
+
+    def __init__(self, matches=None, error=None):
+        """
+        Args:
+            matches: List of ScamMatch, best match first
+            error: Error message if retrieval failed
+        """
+        self.matches = matches or []
+        self.error = error
+        self._formatted = None
+
+    def __bool__(self):
+        return bool(self.matches)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __iter__(self):
+        return iter(self.matches)
+
+    @property
+    def top(self):
+        """Best match, or None"""
+        return self.matches[0] if self.matches else None
+
+    def format(self):
+        """
+        Format the matches as the context string returned to clients
+        
+        Returns:
+            Formatted context string with relevant scam cases
+        """
+        if self._formatted is None:
+            if self.error is not None:
+                self._formatted = ""
+            elif self.matches:
+                self._formatted = "\n\n---\n\n".join(match.format() for match in self.matches)
+            else:
+                self._formatted = NO_MATCH_CONTEXT
+        return self._formatted
+
+    __str__ = format
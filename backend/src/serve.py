@@ -0,0 +1,87 @@
+"""
+Run the API with several uvicorn workers sharing one embedding process
+
+The embedding server is started first and loads the model once; every API
+worker is started with EMBEDDING_BACKEND=remote and talks to it over a Unix
+socket, so memory no longer grows with the number of workers.
+
+Call sessions (``/api/sessions``, ``/ws/calls``) live in each worker's
+memory, and workers sharing one port get connections from the kernel, not
+by session: a session created on one worker is a 404 on the others. More
+than one worker is therefore refused unless ``--stateless-only`` confirms
+that only the stateless endpoints (``/api/analyze``, ``/api/analyze-batch``,
+...) are used. For session traffic, run one single-worker instance per port
+behind a load balancer that routes each session id to the same instance.
+
+Usage:
+    python serve.py --workers 1 --port 5000
+    python serve.py --workers 4 --port 5000 --stateless-only
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import uvicorn
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_for_socket(path, process, timeout):
+    """Block until the embedding server accepts connections"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Embedding server exited during startup")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Embedding server did not start within {timeout} seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker API with a shared embedding process")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/fraud-embedding.sock"))
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--stateless-only",
+        action="store_true",
+        default=os.getenv("SERVE_STATELESS_ONLY", "false").lower() in ("1", "true", "yes"),
+        help="allow several workers; call sessions are per worker and break without sticky routing",
+    )
+    args = parser.parse_args()
+    
+    if args.workers > 1 and not args.stateless_only:
+        parser.error(
+            "call sessions are kept in each worker's memory, so --workers > 1 breaks "
+            "/api/sessions and /ws/calls; pass --stateless-only if only the stateless "
+            "endpoints are used, or run single-worker instances behind sticky routing"
+        )
+    
+    # The embedding server keeps the configured local backend (torch or ONNX)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "embedding_server.py"), "--socket", args.socket],
+        cwd=HERE,
+        env=os.environ.copy(),
+    )
+    try:
+        wait_for_socket(args.socket, server, args.startup_timeout)
+        
+        os.environ["EMBEDDING_BACKEND"] = "remote"
+        os.environ["EMBEDDING_SERVER_SOCKET"] = args.socket
+        uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers, app_dir=HERE)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
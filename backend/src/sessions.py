@@ -0,0 +1,198 @@
+"""
+Server-side rolling state for live calls
+
+Each call session keeps per-window embeddings and a running aggregate vector
+so that appending an utterance only embeds the current (bounded) window
+instead of the whole transcript.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from windowed_scoring import WindowedRiskScore
+
+
+class CallSession:
+    """Rolling embedding state for a single call"""
+
+    def __init__(self, session_id, window_words=120, decay=0.9, overlap_words=30, filters=None):
+        """
+        Args:
+            session_id: Unique identifier for the session
+            window_words: Maximum number of words per embedded window
+            decay: Weight applied to older windows in the aggregate vector
+            overlap_words: Words carried from a closed window into the next one,
+                so phrases spanning a window boundary are still embedded whole
+            filters: Tag filters (category, language, region) for every search in the call
+        """
+        self.session_id = session_id
+        self.window_words = window_words
+        self.decay = decay
+        self.overlap_words = min(overlap_words, window_words // 2)
+        self.filters = filters
+        self.lock = asyncio.Lock()
+        
+        self.window_embeddings = []  # Frozen embeddings of closed windows
+        self.aggregate = None        # Decay-weighted sum of closed windows
+        self.open_words = []         # Words of the window currently being filled
+        self.open_embedding = None
+        self.open_embedded_words = 0  # Words of the open window covered by open_embedding
+        self.open_result = None       # Latest retrieval for the open window
+        self.risk = WindowedRiskScore()  # Monotone call-level risk over all windows
+        
+        self.turns = 0
+        self.last_search_turn = None  # Turn that last ran the semantic stage
+        self.last_matches = None      # RetrievalResult of the latest turn
+        self.last_result = None
+        self.matched_phrases = []
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+
+    def stale_window_text(self, text):
+        """
+        Text of the open window if appending ``text`` would close it before
+        all of its words were embedded (turns skipped by the prefilter)
+        
+        Returns:
+            Window text to embed before appending, or None
+        """
+        words = len(text.split())
+        closing = self.open_words and len(self.open_words) + words > self.window_words
+        if closing and self.open_embedded_words < len(self.open_words):
+            return " ".join(self.open_words)
+        return None
+
+    @property
+    def turns_since_search(self):
+        return None if self.last_search_turn is None else self.turns - self.last_search_turn
+
+    def mark_searched(self):
+        self.last_search_turn = self.turns
+
+    def append(self, text):
+        """
+        Append an utterance and return the window text that needs embedding
+        
+        When the utterance does not fit in the open window, the open window is
+        closed (its last embedding is frozen into the aggregate and its last
+        matches into the risk score) and a new one is started with the tail
+        of the old window followed by the utterance.
+        
+        Args:
+            text: New utterance text
+        
+        Returns:
+            Text of the open window to embed
+        """
+        words = text.split()
+        if self.open_words and len(self.open_words) + len(words) > self.window_words:
+            self._close_window()
+        self.open_words.extend(words)
+        self.turns += 1
+        return " ".join(self.open_words)
+
+    def _close_window(self):
+        if self.open_embedding is not None:
+            embedding = np.asarray(self.open_embedding, dtype=np.float32)
+            self.window_embeddings.append(embedding)
+            if self.aggregate is None:
+                self.aggregate = embedding.copy()
+            else:
+                self.aggregate = self.aggregate * self.decay + embedding
+        if self.open_result is not None:
+            # The window is final now: its matches count towards corroboration
+            self.risk.update([self.open_result])
+        self.open_words = self.open_words[-self.overlap_words:] if self.overlap_words else []
+        self.open_embedding = None
+        self.open_embedded_words = 0
+        self.open_result = None
+
+    def update_open_embedding(self, embedding):
+        """Store the embedding of the current open window"""
+        self.open_embedding = np.asarray(embedding, dtype=np.float32)
+        self.open_embedded_words = len(self.open_words)
+
+    def query_vector(self):
+        """
+        Combine the aggregate and the open window into a normalized query vector
+        
+        Returns:
+            float32 numpy array, or None if nothing has been embedded yet
+        """
+        if self.aggregate is None:
+            vector = self.open_embedding
+        elif self.open_embedding is None:
+            vector = self.aggregate
+        else:
+            vector = self.aggregate * self.decay + self.open_embedding
+        
+        if vector is None:
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def add_matched_phrases(self, phrases):
+        """Merge newly matched phrases into the session, preserving order"""
+        for phrase in phrases:
+            if phrase not in self.matched_phrases:
+                self.matched_phrases.append(phrase)
+
+
+class SessionStore:
+    """In-process session registry with idle TTL eviction"""
+
+    def __init__(self, ttl_seconds=None, max_sessions=None):
+        """
+        Args:
+            ttl_seconds: Idle time after which a session is evicted
+            max_sessions: Maximum number of live sessions (oldest idle evicted first)
+        """
+        self.ttl_seconds = ttl_seconds or int(os.getenv("SESSION_TTL_SECONDS", 900))
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+        # Ordered by last access, least recently used first
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def evict_expired(self):
+        """Drop sessions that have been idle longer than the TTL"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    def create(self, **session_kwargs):
+        """Create and register a new session"""
+        self.evict_expired()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+        
+        session_id = uuid.uuid4().hex
+        session = CallSession(session_id, **session_kwargs)
+        self._sessions[session_id] = session
+        return session
+
+    def get(self, session_id):
+        """
+        Look up a session and mark it as recently used
+        
+        Returns:
+            The session, or None if unknown or expired
+        """
+        self.evict_expired()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id):
+        """Remove a session, returning it if it existed"""
+        return self._sessions.pop(session_id, None)
@@ -0,0 +1,118 @@
+# audio_format.py
+import io
+import struct
+from dataclasses import dataclass
+import numpy as np
+import soundfile as sf
+
+
+@dataclass
+class CaptureFormat:
+    """
+    Capture and upload format for speech recognition.
+
+    Speech models only need 16 kHz mono 16-bit PCM, which is ~5.5x smaller
+    than 44.1 kHz float32 and ~11x smaller than float64.
+    """
+    samplerate: int = 16000
+    channels: int = 1
+    dtype: str = "int16"
+    encoding: str = "wav"  # "wav", "flac" or "opus" (Ogg/Opus)
+
+    @property
+    def bytes_per_frame(self):
+        return np.dtype(self.dtype).itemsize * self.channels
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file object over an existing buffer (no copy on construction)."""
+
+    def __init__(self, buffer, name):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, target):
+        n = min(len(target), len(self._view) - self._position)
+        target[:n] = self._view[self._position:self._position + n]
+        self._position += n
+        return n
+
+
+def wav_header(num_frames, fmt):
+    """44-byte RIFF header for 16-bit PCM audio."""
+    data_size = num_frames * fmt.bytes_per_frame
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, fmt.channels, fmt.samplerate,
+        fmt.samplerate * fmt.bytes_per_frame, fmt.bytes_per_frame, 16,
+        b"data", data_size,
+    )
+
+
+def allocate_wav(num_frames, fmt):
+    """
+    Allocate a complete WAV upload body and expose its sample region.
+
+    Callers fill the returned sample view in place (e.g. with
+    ``AudioRingBuffer.read_into``), so audio goes from the capture buffer to
+    the upload body with a single copy.
+
+    Returns:
+        tuple: (file-like body, writable int16 array of shape num_frames x channels)
+    """
+    header = wav_header(num_frames, fmt)
+    body = bytearray(len(header) + num_frames * fmt.bytes_per_frame)
+    body[:len(header)] = header
+    samples = np.frombuffer(body, dtype=np.int16, offset=len(header)).reshape(num_frames, fmt.channels)
+    return BufferReader(body, "chunk.wav"), samples
+
+
+def encode_chunk(samples, fmt):
+    """
+    Encode captured samples in the configured upload format.
+
+    Args:
+        samples (np.ndarray): Audio frames (n x channels, or 1-D for mono).
+        fmt (CaptureFormat): Target format.
+
+    Returns:
+        File-like object ready to upload.
+    """
+    samples = samples.reshape(len(samples), -1)
+    if fmt.encoding == "wav" and fmt.dtype == "int16":
+        body, view = allocate_wav(len(samples), fmt)
+        view[:] = samples
+        return body
+
+    buffer = io.BytesIO()
+    if fmt.encoding == "flac":
+        sf.write(buffer, samples, fmt.samplerate, format="FLAC", subtype="PCM_16")
+        buffer.name = "chunk.flac"
+    elif fmt.encoding == "opus":
+        # Opus supports 8/12/16/24/48 kHz
+        sf.write(buffer, samples, fmt.samplerate, format="OGG", subtype="OPUS")
+        buffer.name = "chunk.ogg"
+    else:
+        sf.write(buffer, samples, fmt.samplerate, format="WAV", subtype="PCM_16")
+        buffer.name = "chunk.wav"
+    buffer.seek(0)
+    return buffer
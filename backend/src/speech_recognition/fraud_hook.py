@@ -0,0 +1,124 @@
+# fraud_hook.py
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+class FraudAnalysisHook:
+    """
+    Pushes finalized transcript segments into the fraud detection API.
+
+    Segments are posted to a call session from a background thread so the
+    transcription pipeline never waits on the network. The session is kept
+    across transient failures (timeouts, 5xx, connection errors) so the
+    call's windowed risk survives them; only a 404 (expired session) starts
+    a new one.
+    """
+
+    def __init__(self, api_url=None, on_result=None, timeout=10, retries=1, error_interval=30.0):
+        """
+        Args:
+            api_url (str): Base URL of the detection API.
+            on_result (callable): Called with each analysis response (defaults to printing alerts).
+            timeout (float): HTTP timeout in seconds.
+            retries (int): Extra attempts for a segment after a transient failure.
+            error_interval (float): Minimum seconds between printed failure messages.
+        """
+        self.api_url = (api_url or os.getenv("FRAUD_API_URL", "http://localhost:5000")).rstrip("/")
+        self.on_result = on_result or self._print_alert
+        self.timeout = timeout
+        self.retries = retries
+        self.error_interval = error_interval
+        self.session_id = None
+        self.failed = 0
+        self._suppressed = 0
+        self._last_error = None
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def __call__(self, segment):
+        """Queue a segment (dict with a "text" key) for analysis."""
+        if segment.get("text"):
+            self._queue.put(segment)
+
+    def _post(self, path, payload=None, method="POST"):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            f"{self.api_url}{path}",
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    def _analyze(self, segment):
+        if self.session_id is None:
+            self.session_id = self._post("/api/sessions")["session_id"]
+        try:
+            return self._post(
+                f"/api/sessions/{self.session_id}/utterances",
+                {"text": segment["text"], "include_context": False},
+            )
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+            # Session expired on the server; start a new one for this segment
+            self.session_id = None
+            self.session_id = self._post("/api/sessions")["session_id"]
+            return self._post(
+                f"/api/sessions/{self.session_id}/utterances",
+                {"text": segment["text"], "include_context": False},
+            )
+
+    def _report_error(self, error):
+        """Print failures at most once per ``error_interval`` seconds."""
+        self.failed += 1
+        now = time.monotonic()
+        if self._last_error is not None and now - self._last_error < self.error_interval:
+            self._suppressed += 1
+            return
+        suppressed = f" ({self._suppressed} more since last report)" if self._suppressed else ""
+        print(f"⚠️ Fraud analysis failed: {error}{suppressed}")
+        self._last_error = now
+        self._suppressed = 0
+
+    def _run(self):
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                break
+            result = None
+            for attempt in range(self.retries + 1):
+                try:
+                    result = self._analyze(segment)
+                    break
+                except Exception as e:
+                    # Transient failure: keep the session, retry, then skip the segment
+                    if attempt == self.retries:
+                        self._report_error(e)
+                    else:
+                        time.sleep(min(1.0, self.timeout))
+            if result is not None:
+                self.on_result(result)
+
+    @staticmethod
+    def _print_alert(result):
+        if result.get("scam_detected"):
+            print(f"🚨 Possible scam: {result.get('pattern')} (risk {result.get('risk_score')})")
+
+    def close(self):
+        """Flush pending segments and close the call session."""
+        self._queue.put(None)
+        self._worker.join(timeout=self.timeout)
+        if self.session_id is not None:
+            try:
+                self._post(f"/api/sessions/{self.session_id}", method="DELETE")
+            except Exception:
+                pass
+            self.session_id = None
@@ -1,14 +1,66 @@
 # listener.py
+import numpy as np
 import sounddevice as sd
 import soundfile as sf
 from io import BytesIO
+from ring_buffer import AudioRingBuffer
+from audio_format import CaptureFormat, encode_chunk
 
-def record_chunk(duration=1, samplerate=44100, channels=1):
-    """Record a short chunk of audio and return as in-memory WAV."""
-    audio = sd.rec(int(duration * samplerate), samplerate=samplerate, channels=channels)
-    sd.wait()
 
+def to_wav(audio, samplerate):
+    """Encode a numpy audio array as an in-memory WAV."""
     buffer = BytesIO()
     sf.write(buffer, audio, samplerate, format='WAV')
     buffer.seek(0)
     return buffer
+
+
+def record_chunk(duration=1, samplerate=16000, channels=1, capture_format=None):
+    """Record a short chunk of audio and return it encoded for upload (16 kHz int16 WAV by default)."""
+    fmt = capture_format or CaptureFormat(samplerate=samplerate, channels=channels)
+    audio = sd.rec(int(duration * fmt.samplerate), samplerate=fmt.samplerate,
+                   channels=fmt.channels, dtype=fmt.dtype)
+    sd.wait()
+
+    return encode_chunk(audio, fmt)
+
+
+class StreamingListener:
+    """Callback-driven microphone capture into a ring buffer."""
+
+    def __init__(self, capture_format=None, buffer_seconds=60, blocksize=0):
+        """
+        Args:
+            capture_format (CaptureFormat): Sample rate, channels and dtype to capture.
+            buffer_seconds (float): Audio history kept in the ring buffer.
+            blocksize (int): Frames per callback (0 lets the driver choose).
+        """
+        self.format = capture_format or CaptureFormat()
+        self.samplerate = self.format.samplerate
+        self.channels = self.format.channels
+        self.buffer = AudioRingBuffer(
+            int(buffer_seconds * self.samplerate),
+            channels=self.channels,
+            dtype=np.dtype(self.format.dtype),
+        )
+        self.overflows = 0
+        self._stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype=self.format.dtype,
+            blocksize=blocksize,
+            callback=self._callback,
+        )
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.buffer.write(indata)
+
+    def start(self):
+        self._stream.start()
+
+    def stop(self):
+        self._stream.stop()
+        self._stream.close()
+        self.buffer.close()
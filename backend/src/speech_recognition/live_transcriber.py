@@ -1,68 +1,242 @@
 # listener_transcriber.py
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from config import get_elevenlabs_client
-from listener import record_chunk
+from listener import StreamingListener
+from audio_format import CaptureFormat, allocate_wav, encode_chunk
 from transcription import transcribe_audio, parse_transcription
+from transcript_log import SegmentLog, WordArrays
+from vad import UtteranceSegmenter
 
 class LiveTranscriber:
-    def __init__(self, chunk_duration=10, flush_interval=20):
+    def __init__(self, chunk_duration=10, flush_interval=20, overlap=1.5,
+                 max_workers=2, capture_format=None, on_segment=None, segmentation="fixed",
+                 log_path="transcription.jsonl", fsync="interval"):
         """
         Initialize the live transcriber.
 
+        Audio is captured continuously into a ring buffer while overlapping
+        chunks are transcribed concurrently, so nothing is lost while a chunk
+        is in flight.
+
         Args:
-            chunk_duration (int): Duration of audio chunks to record in seconds.
+            chunk_duration (int): Duration of audio chunks to transcribe in seconds.
             flush_interval (int): Interval (in seconds) to flush/save transcription.
+            overlap (float): Seconds shared by consecutive chunks, so words cut at
+                a chunk boundary are transcribed whole by the next chunk.
+            max_workers (int): Chunks transcribed concurrently.
+            capture_format (CaptureFormat): Capture/upload format (16 kHz mono
+                int16 WAV by default; FLAC or Opus for smaller uploads).
+            on_segment (callable): Called with each finalized segment
+                (dict with "text", "start", "end", "words"), e.g. FraudAnalysisHook.
+            segmentation (str): "fixed" for overlapping fixed-length chunks, or
+                "vad" to send only variable-length utterances detected locally
+                (silence is dropped and analysis fires at the end of each utterance).
+            log_path (str): Append-only JSONL segment log (None keeps segments in memory only).
+            fsync (str): Log durability: "always", "interval" (every flush_interval) or "never".
         """
+        if segmentation not in ("fixed", "vad"):
+            raise ValueError("segmentation must be 'fixed' or 'vad'")
+        if overlap >= chunk_duration:
+            raise ValueError("overlap must be shorter than chunk_duration")
+
         self.client = get_elevenlabs_client()
         self.chunk_duration = chunk_duration
         self.flush_interval = flush_interval
-        self.full_transcription = ""
+        self.overlap = overlap
+        self.max_workers = max_workers
+        self.capture_format = capture_format or CaptureFormat()
+        self.samplerate = self.capture_format.samplerate
+        self.on_segment = on_segment
+        self.segmentation = segmentation
+        self.segmenter = None
+        self.log = SegmentLog(log_path, fsync=fsync, fsync_interval=flush_interval)
         self.listening = False
         self.last_flush_time = time.time()
 
+        # Words starting before this time (seconds since capture start) were already emitted
+        self._emitted_until = 0.0
+        # Next frame of the ring buffer that has not been submitted for transcription
+        self._read_position = 0
+
     def start(self):
         """Start listening and transcribing audio."""
         self.listening = True
         print("🎤 Listening... (press Ctrl+C to stop)")
 
-        try:
-            while self.listening:
-                # Record a chunk
-                audio_chunk = record_chunk(duration=self.chunk_duration)
-
-                # Send chunk to ElevenLabs for transcription
-                raw = transcribe_audio(self.client, audio_chunk)
-                parsed = parse_transcription(raw)
-
-                # Get the text
-                text = parsed["text"].strip()
-                if text:
-                    print(f"You said: {text}")
-                    self.full_transcription += text + " "  # append to full log
-
-                # Check if it's time to flush
-                current_time = time.time()
-                if current_time - self.last_flush_time >= self.flush_interval:
-                    self.flush_transcription()
-                    self.last_flush_time = current_time
+        # Keep enough history for every chunk that can be queued or in flight
+        buffer_seconds = (self.chunk_duration + self.overlap) * (self.max_workers + 2)
+        listener = StreamingListener(self.capture_format, buffer_seconds=buffer_seconds)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcribe")
+        pending = deque()  # (future, chunk_start, emit_until) in capture order
 
+        listener.start()
+
+        try:
+            if self.segmentation == "vad":
+                self._run_vad(listener, executor, pending)
+            else:
+                self._run_fixed(listener, executor, pending)
         except KeyboardInterrupt:
+            pass
+        finally:
+            listener.stop()
             self.stop()
+            # Drain before closing the log so in-flight chunks and the tail are kept
+            self._submit_tail(listener, executor, pending)
+            self._finalize_ready(pending, wait=True)
+            executor.shutdown()
+            if self.segmenter is not None:
+                print(f"🔇 VAD stats: {self.segmenter.stats(self.chunk_duration, self.capture_format.bytes_per_frame)}")
+            self._save()
+
+    def _wait_for(self, listener, pending, frame_index):
+        """Wait until audio is available while finalizing chunks that are done."""
+        while not listener.buffer.wait_until(frame_index, timeout=0.2):
+            self._finalize_ready(pending)
+            if not self.listening:
+                return False
+        return self.listening
+
+    def _run_fixed(self, listener, executor, pending):
+        """Transcribe overlapping fixed-length chunks."""
+        chunk_frames = int(self.chunk_duration * self.samplerate)
+        step_frames = int((self.chunk_duration - self.overlap) * self.samplerate)
+        self._read_position = 0
+
+        while self._wait_for(listener, pending, self._read_position + chunk_frames):
+            body = self._read_chunk(listener, self._read_position, chunk_frames)
+            start_time = self._read_position / self.samplerate
+            # Words in the second half of the overlap are left to the next chunk
+            emit_until = start_time + self.chunk_duration - self.overlap / 2
+            future = executor.submit(transcribe_audio, self.client, body)
+            pending.append((future, start_time, emit_until))
+            self._read_position += step_frames
+
+            self._finalize_ready(pending)
+            self._maybe_flush()
+
+    def _read_chunk(self, listener, start, count):
+        """Read frames from the ring buffer straight into an upload body."""
+        fmt = self.capture_format
+        if fmt.encoding == "wav" and fmt.dtype == "int16":
+            body, samples = allocate_wav(count, fmt)
+            listener.buffer.read_into(start, count, samples)
+            return body
+        return encode_chunk(listener.buffer.read(start, count), fmt)
+
+    def _run_vad(self, listener, executor, pending):
+        """Transcribe only the utterances found by voice-activity detection."""
+        self.segmenter = UtteranceSegmenter(self.samplerate, max_utterance_s=self.chunk_duration)
+        block_frames = int(0.1 * self.samplerate)
+        self._read_position = 0
+
+        while self._wait_for(listener, pending, self._read_position + block_frames):
+            available = listener.buffer.frames_written - self._read_position
+            audio = listener.buffer.read(self._read_position, available)
+            self._read_position += available
+
+            for utterance in self.segmenter.feed(audio[:, 0]):
+                self._submit_utterance(executor, pending, utterance)
+
+            self._finalize_ready(pending)
+            self._maybe_flush()
+
+    def _submit_utterance(self, executor, pending, utterance):
+        start_sample, samples = utterance
+        start_time = start_sample / self.samplerate
+        end_time = start_time + len(samples) / self.samplerate
+        future = executor.submit(transcribe_audio, self.client, encode_chunk(samples, self.capture_format))
+        # Utterances do not overlap, so every word inside one is new
+        pending.append((future, start_time, end_time + 1e-3))
+
+    def _submit_tail(self, listener, executor, pending):
+        """Transcribe the audio captured after the last submitted chunk."""
+        position = self._read_position
+        if self.segmenter is not None:
+            tail = listener.buffer.read(position, listener.buffer.frames_written - position)
+            utterances = self.segmenter.feed(tail[:, 0]) if len(tail) else []
+            last = self.segmenter.flush()
+            if last is not None:
+                utterances.append(last)
+            for utterance in utterances:
+                self._submit_utterance(executor, pending, utterance)
+            return
+
+        count = listener.buffer.frames_written - position
+        if count > 0:
+            future = executor.submit(transcribe_audio, self.client, self._read_chunk(listener, position, count))
+            pending.append((future, position / self.samplerate, float("inf")))
+
+    def _finalize_ready(self, pending, wait=False):
+        """Emit completed chunks in capture order (later chunks wait for earlier ones)."""
+        while pending and (wait or pending[0][0].done()):
+            future, start_time, emit_until = pending.popleft()
+            try:
+                parsed = parse_transcription(future.result())
+            except Exception as e:
+                print(f"⚠️ Transcription failed: {e}")
+                self._emitted_until = max(self._emitted_until, emit_until)
+                continue
+            self._emit(parsed, start_time, emit_until)
+
+    def _emit(self, parsed, start_time, emit_until):
+        """De-duplicate the overlap by word timestamps and emit the new words."""
+        chunk_words = parsed["words"]
+        words = WordArrays()
+        for i, start in enumerate(chunk_words.starts):
+            if self._emitted_until <= start_time + start < emit_until:
+                words.extend(chunk_words, start_time, i, i + 1)
+        self._emitted_until = max(self._emitted_until, emit_until)
+
+        text = words.text()
+        if not text:
+            return
+
+        print(f"You said: {text}")
+        start, end = words.starts[0], words.ends[-1]
+        self.log.append(text, start, end, words)
+
+        if self.on_segment is not None:
+            self.on_segment({
+                "text": text,
+                "start": start,
+                "end": end,
+                "words": words,
+            })
+
+    def _maybe_flush(self):
+        # Check if it's time to flush
+        current_time = time.time()
+        if current_time - self.last_flush_time >= self.flush_interval:
+            self.flush_transcription()
+            self.last_flush_time = current_time
 
     def flush_transcription(self):
-        """Save the current transcription to a file without stopping."""
-        if self.full_transcription.strip():
-            with open("transcription.txt", "w") as f:
-                f.write(self.full_transcription.strip())
-            print(f"💾 Flushed transcription to transcription.txt (so far)")
+        """Make the segments logged so far durable without stopping."""
+        if len(self.log):
+            self.log.sync()
 
     def stop(self):
-        """Stop listening and save final transcription."""
+        """Stop listening; start() drains pending chunks and saves the transcription."""
+        if not self.listening:
+            return
         self.listening = False
         print("\n🛑 Stopped listening.")
-        self.flush_transcription()
-        print("💾 Full transcription saved to transcription.txt")
+
+    def _save(self):
+        """Close the segment log and write the plain-text export (once, at the end of the call)."""
+        self.log.close()
+        if len(self.log):
+            with open("transcription.txt", "w") as f:
+                f.write(self.log.text())
+            print("💾 Full transcription saved to transcription.txt")
 
     def get_transcription(self):
         """Return the full transcription as a string."""
-        return self.full_transcription.strip()
+        return self.log.text()
+
+    def get_tail(self, seconds):
+        """Return the segments from the last ``seconds`` of the call."""
+        return self.log.tail(seconds)
@@ -0,0 +1,103 @@
+# ring_buffer.py
+import threading
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size circular buffer of audio samples addressed by absolute sample index.
+
+    The capture callback writes into it from the audio thread while
+    transcription reads overlapping windows out of it, so recording never
+    stops while a chunk is being transcribed.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        """
+        Args:
+            capacity (int): Number of frames kept in the buffer.
+            channels (int): Number of audio channels.
+            dtype: Sample dtype.
+        """
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._written = 0  # total frames ever written
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def frames_written(self):
+        return self._written
+
+    def write(self, frames):
+        """Append frames (shape: n x channels); oldest frames are overwritten."""
+        n = len(frames)
+        if n > self.capacity:
+            frames = frames[-self.capacity:]
+        with self._cond:
+            start = (self._written + n - len(frames)) % self.capacity
+            end = start + len(frames)
+            if end <= self.capacity:
+                self._data[start:end] = frames
+            else:
+                split = self.capacity - start
+                self._data[start:] = frames[:split]
+                self._data[:end - self.capacity] = frames[split:]
+            self._written += n
+            self._cond.notify_all()
+
+    def read(self, start, count):
+        """
+        Copy frames [start, start + count) by absolute index.
+
+        Raises:
+            ValueError: If part of the range has already been overwritten.
+        """
+        with self._cond:
+            end = min(start + count, self._written)
+            if start < self._written - self.capacity:
+                raise ValueError("Requested audio has already been overwritten")
+            if end <= start:
+                return self._data[:0].copy()
+            first = start % self.capacity
+            last = first + (end - start)
+            if last <= self.capacity:
+                return self._data[first:last].copy()
+            return np.concatenate((self._data[first:], self._data[:last - self.capacity]))
+
+    def read_into(self, start, count, out):
+        """
+        Copy frames [start, start + count) into ``out`` (count x channels) without
+        intermediate arrays.
+
+        Returns:
+            int: Number of frames copied.
+        """
+        with self._cond:
+            end = min(start + count, self._written)
+            if start < self._written - self.capacity:
+                raise ValueError("Requested audio has already been overwritten")
+            n = max(0, end - start)
+            first = start % self.capacity
+            split = min(n, self.capacity - first)
+            out[:split] = self._data[first:first + split]
+            out[split:n] = self._data[:n - split]
+            return n
+
+    def wait_until(self, frame_index, timeout=None):
+        """
+        Block until at least ``frame_index`` frames have been written or the buffer is closed.
+
+        Returns:
+            bool: True if the frames are available.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._written >= frame_index or self._closed, timeout)
+            return self._written >= frame_index
+
+    def close(self):
+        """Wake up any reader waiting for more audio."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
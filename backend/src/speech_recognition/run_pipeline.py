@@ -1,19 +1,43 @@
 # run_transcriber.py
+import os
 from live_transcriber import LiveTranscriber
+from fraud_hook import FraudAnalysisHook
+from audio_format import CaptureFormat
 
 def main():
+    # Push each finalized segment into fraud analysis when an API is configured
+    hook = FraudAnalysisHook() if os.getenv("FRAUD_API_URL") else None
+
     # Initialize the transcriber
     # chunk_duration: seconds per audio chunk
+    # overlap: seconds shared by consecutive chunks
     # flush_interval: seconds per flush
-    transcriber = LiveTranscriber(chunk_duration=10, flush_interval=20)
+    # segmentation: "fixed" chunks, or "vad" to send only detected utterances
+    # capture_format: 16 kHz mono int16, uploaded as wav, flac or opus
+    capture_format = CaptureFormat(
+        samplerate=int(os.getenv("TRANSCRIBE_SAMPLERATE", 16000)),
+        encoding=os.getenv("TRANSCRIBE_ENCODING", "wav"),
+    )
+    transcriber = LiveTranscriber(
+        chunk_duration=10,
+        overlap=1.5,
+        flush_interval=20,
+        capture_format=capture_format,
+        on_segment=hook,
+        segmentation=os.getenv("TRANSCRIBE_SEGMENTATION", "vad"),
+        fsync=os.getenv("TRANSCRIPT_FSYNC", "interval"),
+    )
     
     # Start listening and transcribing
     transcriber.start()
 
+    if hook is not None:
+        hook.close()
+
     # After stopping, you can get the full transcription in memory
     full_text = transcriber.get_transcription()
     print("\nFull transcription collected:")
     print(full_text)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,174 @@
+# transcript_log.py
+import json
+import os
+import time
+import uuid
+from array import array
+from bisect import bisect_left
+
+
+class WordArrays:
+    """
+    Column-oriented word records.
+
+    Start/end times and speaker ids live in typed arrays (8 + 8 + 4 bytes per
+    word) instead of one dict per word; speaker and type labels are interned.
+    """
+
+    __slots__ = ("texts", "starts", "ends", "speakers", "types", "_labels", "_label_ids")
+
+    def __init__(self):
+        self.texts = []
+        self.starts = array("d")
+        self.ends = array("d")
+        self.speakers = array("i")
+        self.types = array("b")
+        self._labels = []
+        self._label_ids = {}
+
+    def _label(self, value):
+        if value is None:
+            return -1
+        label_id = self._label_ids.get(value)
+        if label_id is None:
+            label_id = self._label_ids[value] = len(self._labels)
+            self._labels.append(value)
+        return label_id
+
+    def append(self, text, start, end, speaker=None, word_type=None):
+        self.texts.append(text)
+        self.starts.append(start if start is not None else 0.0)
+        self.ends.append(end if end is not None else 0.0)
+        self.speakers.append(self._label(speaker))
+        self.types.append(self._label(word_type))
+
+    def extend(self, other, offset=0.0, first=0, last=None):
+        """Append words [first, last) of another WordArrays, shifting times by ``offset``."""
+        last = len(other) if last is None else last
+        for i in range(first, last):
+            self.append(other.texts[i], other.starts[i] + offset, other.ends[i] + offset,
+                        other.speaker(i), other.word_type(i))
+
+    def speaker(self, i):
+        label_id = self.speakers[i]
+        return self._labels[label_id] if label_id >= 0 else None
+
+    def word_type(self, i):
+        label_id = self.types[i]
+        return self._labels[label_id] if label_id >= 0 else None
+
+    def text(self, first=0, last=None):
+        return "".join(self.texts[first:last]).strip()
+
+    def to_dicts(self, first=0, last=None):
+        """Materialize words as dicts (for JSON output only)."""
+        last = len(self) if last is None else last
+        return [
+            {
+                "text": self.texts[i],
+                "start": self.starts[i],
+                "end": self.ends[i],
+                "type": self.word_type(i),
+                "speaker": self.speaker(i),
+            }
+            for i in range(first, last)
+        ]
+
+    def __len__(self):
+        return len(self.texts)
+
+
+class SegmentLog:
+    """
+    Append-only transcript: segments in memory plus a JSONL file on disk.
+
+    The file holds one call: it is truncated when the log is opened and
+    starts with a header line (``call_id``, ``started_at``), then each
+    finalized segment is written as one JSON line, so nothing is rewritten
+    during the call. ``fsync`` controls durability: "always" fsyncs every
+    segment, "interval" at most every ``fsync_interval`` seconds, "never"
+    leaves it to the OS.
+    """
+
+    def __init__(self, path="transcription.jsonl", fsync="interval", fsync_interval=5.0, call_id=None):
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError("fsync must be 'always', 'interval' or 'never'")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.words = WordArrays()
+        self.texts = []
+        self.starts = array("d")
+        self.ends = array("d")
+        self.word_offsets = array("l", [0])  # segment i owns words [offsets[i], offsets[i + 1])
+        self.call_id = call_id or uuid.uuid4().hex
+        self._file = None
+        if path:
+            # Segment times restart at 0 for every call, so calls never share a file
+            self._file = open(path, "w", encoding="utf-8")
+            self._file.write(json.dumps({"call_id": self.call_id, "started_at": time.time()}) + "\n")
+        self._last_sync = time.monotonic()
+
+    def append(self, text, start, end, words=None):
+        """
+        Record a finalized segment.
+
+        Args:
+            text (str): Segment text.
+            start (float): Start time in seconds since capture start.
+            end (float): End time in seconds since capture start.
+            words (WordArrays): Word records of the segment (absolute times).
+        """
+        self.texts.append(text)
+        self.starts.append(start)
+        self.ends.append(end)
+        if words is not None:
+            self.words.extend(words)
+        self.word_offsets.append(len(self.words))
+
+        if self._file is not None:
+            self._file.write(json.dumps({"text": text, "start": start, "end": end}) + "\n")
+            if self.fsync == "always" or (
+                self.fsync == "interval" and time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self.sync()
+
+    def sync(self):
+        """Flush buffered lines and fsync the log file."""
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def tail(self, seconds):
+        """
+        Segments that end within the last ``seconds`` of the transcript.
+
+        Returns:
+            list: Dicts with "text", "start" and "end".
+        """
+        if not self.texts:
+            return []
+        first = bisect_left(self.ends, self.ends[-1] - seconds)
+        return [
+            {"text": self.texts[i], "start": self.starts[i], "end": self.ends[i]}
+            for i in range(first, len(self.texts))
+        ]
+
+    def tail_text(self, seconds):
+        """Text of the last ``seconds`` of the transcript."""
+        return " ".join(segment["text"] for segment in self.tail(seconds))
+
+    def text(self):
+        return " ".join(self.texts)
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return len(self.texts)
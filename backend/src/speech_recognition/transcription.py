@@ -1,4 +1,5 @@
 # transcription.py
+from transcript_log import WordArrays
 
 def transcribe_audio(client, audio_buffer):
     """
@@ -17,27 +18,20 @@ def transcribe_audio(client, audio_buffer):
 def parse_transcription(response):
     """
     Normalize ElevenLabs transcription object into a structured Python dict.
-    Returns both full text and word-level info with speaker IDs.
+    Returns both full text and word-level info with speaker IDs; words are
+    stored column-wise in a WordArrays rather than one dict per word.
     """
-    full_text = ""
-    words_data = []
+    words = WordArrays()
 
     if hasattr(response, "words") and response.words:
         for w in response.words:
-            words_data.append({
-                "text": w.text,
-                "start": w.start,
-                "end": w.end,
-                "type": w.type,
-                "speaker": w.speaker_id
-            })
-            full_text += w.text
+            words.append(w.text, w.start, w.end, w.speaker_id, w.type)
 
     parsed = {
-        "text": full_text.strip(),         # Full text of the transcription
+        "text": words.text(),         # Full text of the transcription
         "language_code": getattr(response, "language_code", None),
         "language_probability": getattr(response, "language_probability", None),
-        "words": words_data
+        "words": words
     }
 
     return parsed
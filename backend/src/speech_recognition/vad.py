@@ -0,0 +1,182 @@
+# vad.py
+from collections import deque
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detection from short-term energy and zero-crossing rate.
+
+    CPU-only and dependency-free. The speech threshold adapts to the
+    background level: frames that are not speech update a running noise floor.
+    """
+
+    def __init__(self, samplerate, frame_ms=30, min_energy_db=-50.0, snr_db=9.0,
+                 max_zcr=0.35, noise_adapt=0.05):
+        """
+        Args:
+            samplerate (int): Sample rate of the audio.
+            frame_ms (int): Analysis frame length in milliseconds.
+            min_energy_db (float): Absolute floor below which a frame is always silence (dBFS).
+            snr_db (float): How far above the noise floor a frame must be to count as speech.
+            max_zcr (float): Zero-crossing rate above which a frame is treated as noise (hiss).
+            noise_adapt (float): Smoothing factor for the noise floor estimate.
+        """
+        self.frame_length = max(1, int(samplerate * frame_ms / 1000))
+        self.min_energy_db = min_energy_db
+        self.snr_db = snr_db
+        self.max_zcr = max_zcr
+        self.noise_adapt = noise_adapt
+        self.noise_floor_db = min_energy_db
+
+    def frame_speech(self, frames):
+        """
+        Classify a 2D array of frames (n_frames x frame_length).
+
+        Float frames are expected in [-1, 1]; integer PCM is scaled to full range.
+
+        Returns:
+            np.ndarray: Boolean speech flag per frame.
+        """
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        if np.issubdtype(frames.dtype, np.integer):
+            rms /= float(np.iinfo(frames.dtype).max) + 1
+        energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        flags = np.empty(len(frames), dtype=bool)
+        for i, (db, rate) in enumerate(zip(energy_db, zcr)):
+            threshold = max(self.min_energy_db, self.noise_floor_db + self.snr_db)
+            speech = db > threshold and rate < self.max_zcr
+            if not speech:
+                self.noise_floor_db += self.noise_adapt * (db - self.noise_floor_db)
+            flags[i] = speech
+        return flags
+
+
+class UtteranceSegmenter:
+    """
+    Groups speech frames into variable-length utterances and drops silence.
+
+    An utterance ends after ``min_silence_ms`` of non-speech (or at
+    ``max_utterance_s``); utterances shorter than ``min_speech_ms`` of speech
+    are discarded as clicks.
+    """
+
+    def __init__(self, samplerate, vad=None, min_speech_ms=250, min_silence_ms=600,
+                 pre_roll_ms=200, max_utterance_s=15):
+        self.samplerate = samplerate
+        self.vad = vad or EnergyVAD(samplerate)
+        self.frame_length = self.vad.frame_length
+        self.min_speech_frames = self._frames(min_speech_ms)
+        self.min_silence_frames = self._frames(min_silence_ms)
+        self.pre_roll_frames = self._frames(pre_roll_ms)
+        self.max_utterance_frames = self._frames(max_utterance_s * 1000)
+
+        self._remainder = None
+        self._position = 0           # absolute sample index of the next frame
+        self._pre_roll = deque(maxlen=self.pre_roll_frames)  # recent silent frames kept for utterance onsets
+        self._current = []           # frames of the utterance being collected
+        self._current_start = None
+        self._speech_frames = 0
+        self._silence_run = 0
+
+        # Stats
+        self.total_samples = 0
+        self.speech_samples = 0
+        self.utterances = 0
+        self.discarded = 0
+
+    def _frames(self, ms):
+        return max(1, int(ms * self.samplerate / 1000 / self.frame_length))
+
+    def feed(self, samples):
+        """
+        Feed mono samples (float32 or int16; utterances keep the input dtype).
+
+        Returns:
+            list: Completed utterances as (start_sample, samples) tuples.
+        """
+        samples = np.asarray(samples).reshape(-1)
+        if self._remainder is not None and len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        n_frames = len(samples) // self.frame_length
+        self._remainder = samples[n_frames * self.frame_length:]
+        if n_frames == 0:
+            return []
+
+        frames = samples[:n_frames * self.frame_length].reshape(n_frames, self.frame_length)
+        flags = self.vad.frame_speech(frames)
+        self.total_samples += n_frames * self.frame_length
+
+        completed = []
+        for frame, speech in zip(frames, flags):
+            start = self._position
+            self._position += self.frame_length
+
+            if self._current_start is None:
+                if speech:
+                    self._current_start = start - len(self._pre_roll) * self.frame_length
+                    self._current = list(self._pre_roll) + [frame]
+                    self._pre_roll.clear()
+                    self._speech_frames = 1
+                    self._silence_run = 0
+                else:
+                    self._pre_roll.append(frame)
+                continue
+
+            self._current.append(frame)
+            if speech:
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            if self._silence_run >= self.min_silence_frames or len(self._current) >= self.max_utterance_frames:
+                utterance = self._close()
+                if utterance is not None:
+                    completed.append(utterance)
+        return completed
+
+    def _close(self):
+        # Trailing silence beyond the hangover is not sent
+        frames = self._current[:len(self._current) - max(0, self._silence_run - 2)]
+        start = self._current_start
+        keep = self._speech_frames >= self.min_speech_frames
+        self._current = []
+        self._current_start = None
+        self._speech_frames = 0
+        self._silence_run = 0
+        if not keep:
+            self.discarded += 1
+            return None
+        samples = np.concatenate(frames)
+        self.utterances += 1
+        self.speech_samples += len(samples)
+        return start, samples
+
+    def flush(self):
+        """Close the utterance in progress, if any."""
+        if self._current_start is None:
+            return None
+        return self._close()
+
+    def stats(self, chunk_duration=10, bytes_per_sample=2):
+        """
+        Savings compared with fixed-length chunking.
+
+        Args:
+            chunk_duration (float): Chunk length the fixed pipeline would use.
+            bytes_per_sample (int): Bytes per uploaded sample.
+        """
+        total_seconds = self.total_samples / self.samplerate
+        fixed_calls = int(np.ceil(total_seconds / chunk_duration)) if total_seconds else 0
+        return {
+            "audio_seconds": round(total_seconds, 1),
+            "speech_seconds": round(self.speech_samples / self.samplerate, 1),
+            "utterances": self.utterances,
+            "discarded_blips": self.discarded,
+            "bytes_saved": (self.total_samples - self.speech_samples) * bytes_per_sample,
+            "calls_saved": max(0, fixed_calls - self.utterances),
+        }
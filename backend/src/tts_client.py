@@ -0,0 +1,91 @@
+import os
+import time
+import httpx
+import dotenv
+import metrics
+
+dotenv.load_dotenv()
+
+ELEVENLABS_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io")
+
+
+class AsyncTTSClient:
+    """Non-blocking ElevenLabs text-to-speech client built on httpx"""
+
+    def __init__(self, api_key, voice_id, model_id, base_url=None, timeout=30.0):
+        self.api_key = api_key
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.base_url = (base_url or ELEVENLABS_API_URL).rstrip("/")
+        self.timeout = timeout
+        self._client = None
+
+    def _get_client(self):
+        # Created lazily so the client binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def stream(self, text):
+        """
+        Stream synthesized audio for the given text
+
+        Args:
+            text: Text to synthesize
+
+        Yields:
+            Audio chunks (bytes) as they arrive from the TTS service
+        """
+        url = f"{self.base_url}/v1/text-to-speech/{self.voice_id}/stream"
+        payload = {"text": text}
+        if self.model_id:
+            payload["model_id"] = self.model_id
+
+        started = time.perf_counter()
+        first_byte = True
+        in_flight = metrics.tts_in_flight.labels()
+        in_flight.inc()
+        try:
+            async with self._get_client().stream(
+                "POST",
+                url,
+                json=payload,
+                headers={"xi-api-key": self.api_key or "", "accept": "audio/mpeg"},
+            ) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    if chunk:
+                        if first_byte:
+                            first_byte = False
+                            metrics.observe("tts_first_byte", time.perf_counter() - started)
+                        yield chunk
+            metrics.observe("tts_total", time.perf_counter() - started)
+        except Exception:
+            metrics.record_error("tts")
+            raise
+        finally:
+            in_flight.dec()
+
+    async def synthesize(self, text):
+        """
+        Synthesize the full clip for the given text
+
+        Args:
+            text: Text to synthesize
+
+        Returns:
+            Audio as a bytearray (bytes-like, filled without per-chunk copies)
+        """
+        audio = bytearray()
+        async for chunk in self.stream(text):
+            audio += chunk
+        return audio
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
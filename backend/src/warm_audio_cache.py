@@ -0,0 +1,18 @@
+"""
+Pre-render the warning audio for every scam type in the Redis knowledge base
+"""
+import asyncio
+from reasoning import ElevenLabsRedisIntegration
+
+
+async def main():
+    integration = ElevenLabsRedisIntegration()
+    try:
+        rendered = await integration.awarm_audio_cache()
+        print(f"Rendered {rendered} new warning clips")
+    finally:
+        await integration.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
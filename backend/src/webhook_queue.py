@@ -0,0 +1,408 @@
+"""
+Bounded, durable queue and worker pool behind the transcript webhook
+
+``RedisStreamQueue`` keeps webhook payloads in a Redis Stream read through a
+consumer group, so accepted work survives restarts and messages whose worker
+died are claimed again after ``claim_idle_ms`` (at-least-once delivery).
+``MemoryQueue`` is an in-process stand-in with the same interface for local
+runs without Redis (bounded, but not durable across restarts).
+
+Every payload carries an idempotency key; a key seen within the TTL is not
+queued again and its status/result can be looked up.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+
+class QueueFull(Exception):
+    """Raised when the queue is at capacity and the caller should retry later"""
+
+
+@dataclass(slots=True)
+class QueuedMessage:
+    id: str
+    key: str
+    payload: dict
+    enqueued_at: float
+    attempts: int = 0
+    claimed_at: float = field(default_factory=time.monotonic)
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class RedisStreamQueue:
+    """Redis Streams queue with a consumer group"""
+
+    def __init__(
+        self,
+        redis_client,
+        stream="webhook:transcripts",
+        group="webhook-workers",
+        consumer=None,
+        max_depth=None,
+        claim_idle_ms=None,
+        idempotency_ttl=None,
+    ):
+        """
+        Args:
+            redis_client: Async Redis client
+            stream: Stream key holding queued payloads
+            group: Consumer group shared by every API process
+            consumer: Name of this consumer (defaults to host and pid)
+            max_depth: Queued + in-flight messages before enqueue is refused
+            claim_idle_ms: Idle time after which an unacknowledged message is redelivered
+            idempotency_ttl: Seconds an idempotency key (and its result) is remembered
+        """
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{os.uname().nodename}-{os.getpid()}"
+        self.max_depth = max_depth or int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", 1000))
+        self.claim_idle_ms = claim_idle_ms or int(os.getenv("WEBHOOK_CLAIM_IDLE_MS", 30000))
+        self.idempotency_ttl = idempotency_ttl or int(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", 86400))
+        self.attempts_key = f"{stream}:attempts"
+        self.dead_letter_stream = f"{stream}:dead"
+
+    def _status_key(self, key):
+        return f"{self.stream}:status:{key}"
+
+    async def setup(self):
+        """Create the consumer group (and stream) if needed"""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def enqueue(self, payload, key):
+        """
+        Queue a payload unless its idempotency key was already accepted
+
+        Returns:
+            Tuple of (status, message id); status is "queued" or the stored
+            status of the duplicate ("queued", "done" or "failed")
+
+        Raises:
+            QueueFull: The queue is at ``max_depth``
+        """
+        status_key = self._status_key(key)
+        if not await self.redis.set(status_key, "queued", nx=True, ex=self.idempotency_ttl):
+            return _decode(await self.redis.get(status_key)) or "queued", None
+
+        try:
+            if await self.redis.xlen(self.stream) >= self.max_depth:
+                raise QueueFull()
+            message_id = await self.redis.xadd(self.stream, {
+                "key": key,
+                "payload": json.dumps(payload),
+                "enqueued_at": repr(time.time()),
+            })
+        except BaseException:
+            # Not queued (full, Redis error or cancelled): forget the key so the
+            # sender's retry is accepted instead of being reported as a duplicate
+            try:
+                await self.redis.delete(status_key)
+            except Exception as e:
+                print(f"Error releasing idempotency key {key}: {e}")
+            raise
+        return "queued", _decode(message_id)
+
+    def _message(self, message_id, fields):
+        fields = {_decode(name): value for name, value in fields.items()}
+        return QueuedMessage(
+            id=_decode(message_id),
+            key=_decode(fields.get("key", b"")),
+            payload=json.loads(fields.get("payload") or "{}"),
+            enqueued_at=float(fields.get("enqueued_at") or time.time()),
+        )
+
+    async def read(self, count, block_ms=500):
+        """Read up to ``count`` new messages for this consumer"""
+        replies = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        messages = []
+        for _, entries in replies or []:
+            for message_id, fields in entries:
+                if fields:
+                    messages.append(self._message(message_id, fields))
+        return messages
+
+    async def claim_stale(self, count):
+        """Take over messages left unacknowledged by a crashed or stuck worker"""
+        reply = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms, start_id="0-0", count=count
+        )
+        messages = []
+        for message_id, fields in reply[1] if reply else []:
+            if not fields:
+                # Trimmed or deleted while pending
+                await self.redis.xack(self.stream, self.group, message_id)
+                continue
+            message = self._message(message_id, fields)
+            attempts = await self.redis.hget(self.attempts_key, message.id)
+            message.attempts = int(attempts or 0)
+            messages.append(message)
+        return messages
+
+    async def ack(self, message, result=None):
+        """Mark a message processed and remember its result under the idempotency key"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, message.id)
+        pipe.xdel(self.stream, message.id)
+        pipe.hdel(self.attempts_key, message.id)
+        pipe.set(self._status_key(message.key), "done", ex=self.idempotency_ttl)
+        if result is not None:
+            pipe.set(f"{self._status_key(message.key)}:result", json.dumps(result), ex=self.idempotency_ttl)
+        await pipe.execute()
+
+    async def nack(self, message):
+        """
+        Record a failed attempt; the message stays pending and is redelivered
+        after ``claim_idle_ms``
+
+        Returns:
+            Number of failed attempts so far
+        """
+        message.attempts = await self.redis.hincrby(self.attempts_key, message.id, 1)
+        return message.attempts
+
+    async def dead_letter(self, message, error):
+        """Move a message that keeps failing out of the queue"""
+        await self.redis.xadd(self.dead_letter_stream, {
+            "key": message.key,
+            "payload": json.dumps(message.payload),
+            "error": error,
+        }, maxlen=10000, approximate=True)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, message.id)
+        pipe.xdel(self.stream, message.id)
+        pipe.hdel(self.attempts_key, message.id)
+        pipe.set(self._status_key(message.key), "failed", ex=self.idempotency_ttl)
+        await pipe.execute()
+
+    async def status(self, key):
+        """Status and result stored for an idempotency key"""
+        status, result = await self.redis.mget(self._status_key(key), f"{self._status_key(key)}:result")
+        if status is None:
+            return None
+        return {"status": _decode(status), "result": json.loads(result) if result else None}
+
+    async def stats(self):
+        """Queue depth, in-flight count and age of the oldest outstanding message"""
+        depth = await self.redis.xlen(self.stream)
+        pending = await self.redis.xpending(self.stream, self.group)
+        oldest = await self.redis.xrange(self.stream, count=1)
+        lag = 0.0
+        if oldest:
+            lag = max(0.0, time.time() - int(_decode(oldest[0][0]).split("-")[0]) / 1000)
+        return {
+            "backend": "redis",
+            "depth": depth,
+            "in_flight": pending.get("pending", 0) if isinstance(pending, dict) else 0,
+            "max_depth": self.max_depth,
+            "lag_seconds": round(lag, 3),
+        }
+
+
+class MemoryQueue:
+    """In-process stand-in for RedisStreamQueue (bounded, not durable)"""
+
+    def __init__(self, max_depth=None, claim_idle_ms=None, idempotency_ttl=None):
+        self.max_depth = max_depth or int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", 1000))
+        self.claim_idle_ms = claim_idle_ms or int(os.getenv("WEBHOOK_CLAIM_IDLE_MS", 30000))
+        self.idempotency_ttl = idempotency_ttl or int(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", 86400))
+        self._queue = None
+        self._in_flight = {}
+        self._statuses = {}  # key -> (expires_at, status, result)
+        self._next_id = 0
+
+    async def setup(self):
+        # Created here so the queue binds to the running event loop
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+
+    def _status(self, key):
+        entry = self._statuses.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._statuses[key]
+            return None
+        return entry
+
+    def _set_status(self, key, status, result=None):
+        self._statuses[key] = (time.monotonic() + self.idempotency_ttl, status, result)
+
+    async def enqueue(self, payload, key):
+        entry = self._status(key)
+        if entry is not None:
+            return entry[1], None
+        if self._queue.qsize() + len(self._in_flight) >= self.max_depth:
+            raise QueueFull()
+
+        self._next_id += 1
+        message = QueuedMessage(id=str(self._next_id), key=key, payload=payload, enqueued_at=time.time())
+        self._queue.put_nowait(message)
+        self._set_status(key, "queued")
+        return "queued", message.id
+
+    async def read(self, count, block_ms=500):
+        messages = []
+        try:
+            messages.append(await asyncio.wait_for(self._queue.get(), timeout=block_ms / 1000))
+        except asyncio.TimeoutError:
+            return []
+        while len(messages) < count and not self._queue.empty():
+            messages.append(self._queue.get_nowait())
+        for message in messages:
+            message.claimed_at = time.monotonic()
+            self._in_flight[message.id] = message
+        return messages
+
+    async def claim_stale(self, count):
+        cutoff = time.monotonic() - self.claim_idle_ms / 1000
+        stale = [message for message in self._in_flight.values() if message.claimed_at < cutoff][:count]
+        for message in stale:
+            message.claimed_at = time.monotonic()
+        return stale
+
+    async def ack(self, message, result=None):
+        self._in_flight.pop(message.id, None)
+        self._set_status(message.key, "done", result)
+
+    async def nack(self, message):
+        message.attempts += 1
+        return message.attempts
+
+    async def dead_letter(self, message, error):
+        self._in_flight.pop(message.id, None)
+        self._set_status(message.key, "failed", {"error": error})
+
+    async def status(self, key):
+        entry = self._status(key)
+        if entry is None:
+            return None
+        return {"status": entry[1], "result": entry[2]}
+
+    async def stats(self):
+        waiting = list(self._queue._queue) + list(self._in_flight.values())
+        oldest = min((message.enqueued_at for message in waiting), default=None)
+        return {
+            "backend": "memory",
+            "depth": len(waiting),
+            "in_flight": len(self._in_flight),
+            "max_depth": self.max_depth,
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+        }
+
+
+class WebhookWorkerPool:
+    """Fixed number of concurrent handlers fed from a queue"""
+
+    def __init__(self, queue, handler, concurrency=None, max_attempts=None, block_ms=500, claim_interval=None):
+        """
+        Args:
+            queue: RedisStreamQueue or MemoryQueue
+            handler: Coroutine ``handler(payload)`` returning a JSON-serializable result
+            concurrency: Messages processed at the same time
+            max_attempts: Failed attempts before a message is dead-lettered
+            block_ms: How long a read waits for new messages
+            claim_interval: Seconds between checks for stale messages
+        """
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency or int(os.getenv("WEBHOOK_WORKERS", 4))
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+        self.block_ms = block_ms
+        self.claim_interval = claim_interval or max(1.0, queue.claim_idle_ms / 2000)
+        self._tasks = set()
+        self._dispatcher = None
+
+        self.processed = 0
+        self.failed = 0
+        self.redelivered = 0
+        self.dead_lettered = 0
+        self.total_seconds = 0.0
+
+    async def start(self):
+        await self.queue.setup()
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop reading; unfinished messages stay pending and are redelivered later"""
+        tasks = [task for task in (self._dispatcher, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    async def _dispatch_loop(self):
+        last_claim = 0.0
+        while True:
+            free = self.concurrency - len(self._tasks)
+            if free <= 0:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                messages = []
+                if time.monotonic() - last_claim >= self.claim_interval:
+                    last_claim = time.monotonic()
+                    messages = await self.queue.claim_stale(free)
+                    self.redelivered += len(messages)
+                if not messages:
+                    messages = await self.queue.read(free, self.block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reading webhook queue: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            for message in messages:
+                task = asyncio.get_running_loop().create_task(self._process(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, message):
+        started = time.perf_counter()
+        try:
+            result = await self.handler(message.payload)
+        except Exception as e:
+            self.failed += 1
+            print(f"Error processing webhook message {message.id}: {e}")
+            try:
+                if await self.queue.nack(message) >= self.max_attempts:
+                    await self.queue.dead_letter(message, str(e))
+                    self.dead_lettered += 1
+            except Exception as queue_error:
+                print(f"Error recording webhook failure: {queue_error}")
+            return
+
+        try:
+            await self.queue.ack(message, result)
+        except Exception as e:
+            # Not acknowledged: the message will be redelivered and processed again
+            print(f"Error acknowledging webhook message {message.id}: {e}")
+            return
+        self.processed += 1
+        self.total_seconds += time.perf_counter() - started
+
+    async def stats(self):
+        try:
+            queue_stats = await self.queue.stats()
+        except Exception as e:
+            queue_stats = {"error": str(e)}
+        return {
+            "queue": queue_stats,
+            "workers": self.concurrency,
+            "busy": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "redelivered": self.redelivered,
+            "dead_lettered": self.dead_lettered,
+            "avg_processing_ms": round(self.total_seconds / self.processed * 1000, 2) if self.processed else 0.0,
+        }
@@ -0,0 +1,159 @@
+"""
+Windowed, multi-vector risk scoring for long conversations
+
+all-MiniLM-L6-v2 truncates its input at 256 tokens, so a single embedding of
+a long call only sees its beginning. Conversations are instead split into
+overlapping word windows, every window is searched on its own and the
+per-window matches are aggregated into one risk score per call.
+"""
+import os
+
+from retrieval import RetrievalResult
+
+SCORING_WINDOW_WORDS = int(os.getenv("SCORING_WINDOW_WORDS", 150))    # stays under 256 tokens
+SCORING_WINDOW_STRIDE = int(os.getenv("SCORING_WINDOW_STRIDE", 100))  # words between window starts
+SCORING_MAX_WINDOWS = int(os.getenv("SCORING_MAX_WINDOWS", 16))       # per request
+
+
+def _window_starts(word_count, window_words, stride):
+    if word_count <= window_words:
+        return [0] if word_count else []
+    starts = list(range(0, word_count - window_words + 1, stride))
+    if starts[-1] + window_words < word_count:
+        starts.append(word_count - window_words)
+    return starts
+
+
+def count_windows(text, window_words=None, stride=None):
+    """Number of windows ``sliding_windows`` produces for text without a cap"""
+    window_words = window_words or SCORING_WINDOW_WORDS
+    stride = min(stride or SCORING_WINDOW_STRIDE, window_words)
+    return len(_window_starts(len(text.split()), window_words, stride))
+
+
+def sliding_windows(text, window_words=None, stride=None, max_windows=SCORING_MAX_WINDOWS):
+    """
+    Split text into overlapping word windows
+
+    When the text needs more than ``max_windows`` windows, the first window
+    and the most recent ones are kept, so the cost per request stays bounded
+    while an opening pitch still counts as the call grows.
+
+    Args:
+        text: Conversation text
+        window_words: Words per window
+        stride: Words between consecutive window starts
+        max_windows: Maximum number of windows returned; None for every window
+
+    Returns:
+        List of window texts in conversation order
+    """
+    window_words = window_words or SCORING_WINDOW_WORDS
+    stride = min(stride or SCORING_WINDOW_STRIDE, window_words)
+
+    words = text.split()
+    starts = _window_starts(len(words), window_words, stride)
+    if max_windows is not None and len(starts) > max_windows:
+        starts = starts[:1] + starts[len(starts) - max_windows + 1:] if max_windows > 1 else starts[:1]
+    return [" ".join(words[start:start + window_words]) for start in starts]
+
+
+def merge_results(results, top_k=3):
+    """
+    Merge per-window retrievals into one result, best score per case
+
+    Args:
+        results: RetrievalResult per window
+        top_k: Number of matches to keep
+
+    Returns:
+        RetrievalResult with the best distinct matches across windows
+    """
+    best = {}
+    errors = []
+    for result in results:
+        if result.error is not None:
+            errors.append(result.error)
+        for match in result:
+            current = best.get(match.id)
+            if current is None or match.score > current.score:
+                best[match.id] = match
+
+    if not best and errors:
+        return RetrievalResult(error=errors[0])
+    matches = sorted(best.values(), key=lambda match: match.score, reverse=True)
+    return RetrievalResult(matches[:top_k])
+
+
+class WindowedRiskScore:
+    """
+    Running risk for a call, aggregated over scored windows
+
+    Each scam type keeps its peak window score (max aggregation) and a
+    decay-weighted support sum, so several windows matching the same pattern
+    raise the score above any single one. The reported risk is a ratchet: it
+    never decreases over the call.
+    """
+
+    def __init__(self, decay=None, corroboration=None):
+        """
+        Args:
+            decay: Weight applied to earlier windows in the support sum
+            corroboration: Share of the support from other windows added to the peak
+        """
+        self.decay = decay if decay is not None else float(os.getenv("SCORING_DECAY", 0.8))
+        self.corroboration = corroboration if corroboration is not None else float(os.getenv("SCORING_CORROBORATION", 0.1))
+        self.peaks = {}
+        self.support = {}
+        self.risk = 0.0
+        self.pattern = None
+        self.windows_scored = 0
+        self.windows_skipped = 0  # windows left out by a max_windows cap
+
+    def update(self, results, provisional=False):
+        """
+        Fold per-window retrievals into the running score
+
+        Args:
+            results: RetrievalResult per newly scored window, in order
+            provisional: The window is still growing (open session window);
+                it raises the peak but is only added to the support once final
+
+        Returns:
+            Tuple of (risk in 0-1, detected pattern or None)
+        """
+        for result in results:
+            if not provisional:
+                self.windows_scored += 1
+                for scam_type in self.support:
+                    self.support[scam_type] *= self.decay
+
+            # Best score per scam type within this window
+            window_scores = {}
+            for match in result:
+                if match.score > window_scores.get(match.scam_type, float("-inf")):
+                    window_scores[match.scam_type] = match.score
+
+            for scam_type, score in window_scores.items():
+                self.peaks[scam_type] = max(self.peaks.get(scam_type, score), score)
+                support = self.support.get(scam_type, 0.0)
+                if provisional:
+                    support *= self.decay
+                support += score
+                if not provisional:
+                    self.support[scam_type] = support
+
+                corroborated = max(0.0, support - score)
+                combined = min(1.0, self.peaks[scam_type] + self.corroboration * corroborated)
+                if combined > self.risk or self.pattern is None:
+                    self.risk = max(self.risk, combined)
+                    self.pattern = scam_type
+        return self.risk, self.pattern
+
+    def stats(self):
+        return {
+            "risk": round(self.risk, 4),
+            "pattern": self.pattern,
+            "windows_scored": self.windows_scored,
+            "windows_skipped": self.windows_skipped,
+        }
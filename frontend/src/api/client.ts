@@ -6,13 +6,37 @@ export interface AnalyzeResponse {
   pattern: string;
   matched_phrases: string[];
   response_text: string;
-  context_used: string;
+  context_used?: string;
+}
+
+export interface SessionAnalyzeResponse extends AnalyzeResponse {
+  session_id: string;
+  turn: number;
+}
+
+export type AnalysisUpdate = Pick<
+  AnalyzeResponse,
+  'scam_detected' | 'risk_score' | 'pattern' | 'matched_phrases'
+>;
+
+export interface LiveAnalysisUpdate extends AnalysisUpdate {
+  type: 'update';
+  turn: number;
+  semantic_stage: boolean;
+  alert: boolean;
+  response_text?: string;
+}
+
+export interface LiveAnalysisChannel {
+  /** Returns false when the channel is not open, so the caller can fall back to HTTP */
+  sendUtterance: (text: string) => boolean;
+  close: () => void;
 }
 
 export interface PostCallAnalysisResponse {
   explanation: string;
   audio_base64: string | null;
-  context_used: string;
+  context_used?: string;
   pattern: string;
   confidence: number;
   success: boolean;
@@ -25,7 +49,7 @@ export async function analyzeConversation(conversation: string): Promise<Analyze
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ conversation }),
+      body: JSON.stringify({ conversation, include_context: false }),
     });
 
     if (!response.ok) {
@@ -39,6 +63,103 @@ export async function analyzeConversation(conversation: string): Promise<Analyze
   }
 }
 
+export async function createSession(): Promise<string> {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/sessions`, {
+      method: 'POST',
+    });
+
+    if (!response.ok) {
+      throw new Error(`API error: ${response.statusText}`);
+    }
+
+    const data = await response.json();
+    return data.session_id;
+  } catch (error) {
+    console.error('Error creating session:', error);
+    throw error;
+  }
+}
+
+export async function appendUtterance(
+  sessionId: string,
+  text: string
+): Promise<SessionAnalyzeResponse> {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/sessions/${sessionId}/utterances`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ text, include_context: false }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`API error: ${response.statusText}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Error appending utterance:', error);
+    throw error;
+  }
+}
+
+/**
+ * Open a live analysis channel for one call. Utterances are sent as small
+ * frames; the server pushes an update only when the risk score, pattern or
+ * matched phrases change. Pass the id from createSession to share the call
+ * session with the HTTP API.
+ */
+export function openLiveAnalysis(handlers: {
+  sessionId?: string;
+  onUpdate: (update: LiveAnalysisUpdate) => void;
+  onClose?: () => void;
+}): LiveAnalysisChannel {
+  const query = handlers.sessionId ? `?session_id=${encodeURIComponent(handlers.sessionId)}` : '';
+  const url = `${API_BASE_URL.replace(/^http/, 'ws')}/ws/calls${query}`;
+  const socket = new WebSocket(url);
+
+  socket.onmessage = (event) => {
+    try {
+      const message = JSON.parse(event.data);
+      if (message.type === 'update') {
+        handlers.onUpdate(message);
+      } else if (message.type === 'heartbeat') {
+        // Answer so the server knows this client is still alive
+        socket.send(JSON.stringify({ type: 'ping' }));
+      } else if (message.type === 'error') {
+        console.error('Live analysis error:', message.message);
+      }
+    } catch (error) {
+      console.error('Error handling live analysis message:', error);
+    }
+  };
+
+  socket.onclose = () => handlers.onClose?.();
+
+  return {
+    sendUtterance: (text: string) => {
+      if (socket.readyState !== WebSocket.OPEN) {
+        return false;
+      }
+      socket.send(JSON.stringify({ type: 'utterance', text }));
+      return true;
+    },
+    close: () => socket.close(),
+  };
+}
+
+export async function closeSession(sessionId: string): Promise<void> {
+  try {
+    await fetch(`${API_BASE_URL}/api/sessions/${sessionId}`, {
+      method: 'DELETE',
+    });
+  } catch (error) {
+    console.error('Error closing session:', error);
+  }
+}
+
 export async function getPostCallAnalysis(
   conversation: string,
   pattern: string,
@@ -1,7 +1,15 @@
 import { useState, useRef, useEffect } from 'react';
 import { Phone, PhoneOff, Shield, Activity, Volume2, VolumeX, Pause, Play } from 'lucide-react';
 import { scamPatterns } from '../data/scamPatterns';
-import { analyzeConversation } from '../api/client';
+import {
+  analyzeConversation,
+  appendUtterance,
+  closeSession,
+  createSession,
+  openLiveAnalysis,
+  AnalysisUpdate,
+  LiveAnalysisChannel,
+} from '../api/client';
 
 interface CallScreenProps {
   onCallEnd: (scamData: any) => void;
@@ -26,6 +34,8 @@ export function CallScreen({ onCallEnd }: CallScreenProps) {
   const transcriptRef = useRef<HTMLDivElement>(null);
   const callTimerRef = useRef<any>(null);
   const demoTimerRef = useRef<any>(null);
+  const sessionIdRef = useRef<string | null>(null);
+  const liveChannelRef = useRef<LiveAnalysisChannel | null>(null);
 
   // Initialize Speech Recognition
   useEffect(() => {
@@ -108,6 +118,30 @@ export function CallScreen({ onCallEnd }: CallScreenProps) {
     };
   }, [isCallActive, isOnHold]);
 
+  // Apply a detection result from the live channel or the HTTP API
+  const applyAnalysis = (result: AnalysisUpdate) => {
+    // Update risk score
+    if (result.risk_score > 0) {
+      setRiskScore(result.risk_score);
+    }
+
+    // Update scam detection status; functional updates so that results pushed
+    // over the live channel do not act on stale state
+    if (result.scam_detected) {
+      setScamDetected(true);
+      setDetectedPattern((prev: any) => {
+        if (prev) return prev;
+        // Find matching pattern from local patterns or use the detected pattern name
+        const localPattern = scamPatterns.find(p =>
+          p.name.toLowerCase().includes(result.pattern.toLowerCase()) ||
+          result.pattern.toLowerCase().includes(p.name.toLowerCase())
+        );
+        return localPattern || { name: result.pattern, keywords: [], phrases: [] };
+      });
+      setMatchedPhrases(prev => [...new Set([...prev, ...result.matched_phrases])]);
+    }
+  };
+
   // Backend API: Analyze conversation using RAG
   const analyzeForScam = async (text: string) => {
     // Update conversation history
@@ -116,29 +150,18 @@ export function CallScreen({ onCallEnd }: CallScreenProps) {
       : text;
     setConversationHistory(updatedHistory);
 
-    try {
-      // Call backend API for analysis
-      const result = await analyzeConversation(updatedHistory);
-      
-      // Update risk score
-      if (result.risk_score > 0) {
-        setRiskScore(result.risk_score);
-      }
+    // Live channel: the server pushes an update when the risk changes
+    if (liveChannelRef.current?.sendUtterance(text)) {
+      return;
+    }
 
-      // Update scam detection status
-      if (result.scam_detected && !scamDetected) {
-        setScamDetected(true);
-        // Find matching pattern from local patterns or use the detected pattern name
-        const localPattern = scamPatterns.find(p => 
-          p.name.toLowerCase().includes(result.pattern.toLowerCase()) ||
-          result.pattern.toLowerCase().includes(p.name.toLowerCase())
-        );
-        setDetectedPattern(localPattern || { name: result.pattern, keywords: [], phrases: [] });
-        setMatchedPhrases(result.matched_phrases);
-      } else if (result.scam_detected) {
-        // Update matched phrases if already detected
-        setMatchedPhrases(prev => [...new Set([...prev, ...result.matched_phrases])]);
-      }
+    try {
+      // Call backend API for analysis: only the new utterance is sent when a
+      // server-side call session is open
+      const result = sessionIdRef.current
+        ? await appendUtterance(sessionIdRef.current, text)
+        : await analyzeConversation(updatedHistory);
+      applyAnalysis(result);
     } catch (error) {
       console.error('Error analyzing conversation:', error);
       // Fallback to local pattern matching if API fails
@@ -194,6 +217,32 @@ export function CallScreen({ onCallEnd }: CallScreenProps) {
     setErrorMessage('');
     setConversationHistory('');
 
+    // The live channel attaches to the call session, so if it drops the
+    // remaining utterances continue on the same session over HTTP
+    const openChannel = (sessionId?: string) => {
+      const channel = openLiveAnalysis({
+        sessionId,
+        onUpdate: applyAnalysis,
+        onClose: () => {
+          if (liveChannelRef.current === channel) {
+            liveChannelRef.current = null;
+          }
+        },
+      });
+      liveChannelRef.current = channel;
+    };
+
+    sessionIdRef.current = null;
+    createSession()
+      .then((sessionId) => {
+        sessionIdRef.current = sessionId;
+        openChannel(sessionId);
+      })
+      .catch(() => {
+        // Fall back to full-history analysis
+        openChannel();
+      });
+
     if (recognitionRef.current) {
       try {
         recognitionRef.current.start();
@@ -216,6 +265,16 @@ export function CallScreen({ onCallEnd }: CallScreenProps) {
       clearInterval(callTimerRef.current);
     }
 
+    if (liveChannelRef.current) {
+      liveChannelRef.current.close();
+      liveChannelRef.current = null;
+    }
+
+    if (sessionIdRef.current) {
+      closeSession(sessionIdRef.current);
+      sessionIdRef.current = null;
+    }
+
     if (scamDetected && detectedPattern) {
       onCallEnd({
         pattern: detectedPattern.name,